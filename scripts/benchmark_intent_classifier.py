@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""Benchmark of the intention scoring on the test split of labelled examples: accuracy and latency of
+llm_configs of config_server.yaml, e.g. the local classifier against the LLMs.
+
+The intentions are read from a CSV with id, label and description columns (misc/non_llm/intentions.csv),
+the examples from a CSV with intention id, split and text columns (misc/non_llm/intentions_examples.csv).
+
+Usage: python scripts/benchmark_intent_classifier.py ./runtime local1 scaleway1 openai1
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.backend.backend.server_config import ServerConfig
+from src.backend.text_analysis.base_models import FIELD_NAME_SCORINGS, Intention
+from src.backend.text_analysis.llm_local import load_examples
+from src.backend.text_analysis.llm_registry import LlmRegistry
+from src.backend.text_analysis.text_analyzer import TextAnalysisConfig, TextAnalyzer
+from src.common.case_model import CaseModel
+from src.common.constants import KEY_ANALYSIS_RESULT
+
+SYSTEM_PROMPT_PREFIX = (
+    "La préfecture reçoit des messages de demandeurs étrangers, en rapport avec le séjour ou l'asile."
+)
+
+
+def load_intentions(filename: str, encoding: str) -> list[Intention]:
+    with open(filename, encoding=encoding, newline="") as f:
+        rows = list(csv.reader(f))
+    return [
+        Intention(id=row[0], label=row[1], description=row[2])
+        for row in rows[1:]
+        if len(row) >= 3
+    ]
+
+
+def get_best_intention_id(analysis_result: dict) -> str | None:
+    scorings = analysis_result.get(FIELD_NAME_SCORINGS, [])
+    if not scorings:
+        return None
+    return max(scorings, key=lambda scoring: scoring["score"])["intention_id"]
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("runtime_directory")
+    parser.add_argument("llm_config_ids", nargs="+")
+    parser.add_argument("--intentions", default="misc/non_llm/intentions.csv")
+    parser.add_argument("--intentions-encoding", default="latin-1")
+    parser.add_argument("--examples", default="misc/non_llm/intentions_examples.csv")
+    parser.add_argument("--split", default="test")
+    args = parser.parse_args()
+
+    server_config = ServerConfig.load_from_yaml_file(
+        args.runtime_directory + "/config_server.yaml",
+    )
+    llm_configs = {
+        llm_config.id: llm_config for llm_config in server_config.llm_configs
+    }
+    examples = load_examples(args.examples, args.split)
+
+    with tempfile.TemporaryDirectory() as runtime_directory:
+        text_analyzer = TextAnalyzer(
+            runtime_directory=runtime_directory,
+            app_id="benchmark",
+            locale="fr",
+            case_model=CaseModel(case_fields=[]),
+            text_analysis_config=TextAnalysisConfig(
+                system_prompt_prefix=SYSTEM_PROMPT_PREFIX,
+                definitions=[],
+                intentions=load_intentions(args.intentions, args.intentions_encoding),
+            ),
+            llm_registry=LlmRegistry(llm_configs),
+        )
+
+        print(f"{len(examples)} examples ({args.split} split of {args.examples})")
+        print(
+            f"{'llm_config':<20}{'accuracy':>10}{'errors':>8}"
+            f"{'mean':>10}{'p50':>10}{'p95':>10}",
+        )
+        for llm_config_id in args.llm_config_ids:
+            llm_config = llm_configs[llm_config_id]
+            # The training or the client setup is not measured
+            text_analyzer.llm_registry.get(llm_config)
+
+            correct = errors = 0
+            latencies: list[float] = []
+            for intention_id, text in examples:
+                before = time.perf_counter()
+                try:
+                    response = text_analyzer.analyze(
+                        locale="fr",
+                        llm_config=llm_config,
+                        field_values={},
+                        text=text,
+                        read_from_cache=False,
+                    )
+                except Exception as e:
+                    errors += 1
+                    print(f"  {llm_config_id}: {type(e).__name__}: {e!s:.200}")
+                    continue
+                latencies.append(time.perf_counter() - before)
+                if get_best_intention_id(response[KEY_ANALYSIS_RESULT]) == intention_id:
+                    correct += 1
+
+            if not latencies:
+                print(f"{llm_config_id:<20}{'-':>10}{errors:>8}")
+                continue
+            print(
+                f"{llm_config_id:<20}{correct / len(examples):>10.1%}{errors:>8}"
+                f"{sum(latencies) / len(latencies) * 1000:>8.1f}ms"
+                f"{percentile(latencies, 50) * 1000:>8.1f}ms"
+                f"{percentile(latencies, 95) * 1000:>8.1f}ms",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Import the analysis cache JSON files (runtime/cache/cache_{app_id}_{locale}_{cache_key}.json) into the
+cache backend configured in config_server.yaml (analysis_cache, SQLite by default).
+
+The JSON files are left in place unless --delete is given, which only deletes the files imported (not
+those that could not be read). Importing twice is harmless: the entries are replaced.
+Files named after the former 6-character hash codes are not imported, their entries being no longer
+served.
+
+Usage: python scripts/migrate_analysis_cache.py ./runtime [--delete]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.backend.backend.server_config import ServerConfig
+from src.backend.text_analysis.analysis_cache import build_analysis_cache, import_json_files
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("runtime_directory")
+    parser.add_argument("--delete", action="store_true", help="Delete the imported JSON files")
+    args = parser.parse_args()
+
+    server_config = ServerConfig.load_from_yaml_file(
+        args.runtime_directory + "/config_server.yaml",
+    )
+    if server_config.analysis_cache.backend == "json_files":
+        print("The analysis cache is configured with the json_files backend: nothing to migrate")
+        return
+
+    cache_directory = args.runtime_directory + "/cache"
+    analysis_cache = build_analysis_cache(
+        args.runtime_directory,
+        server_config.analysis_cache,
+    )
+    try:
+        # Straight into the persistent tier, the memory one being of no use to this process
+        imported = import_json_files(cache_directory, analysis_cache.persistent)
+    finally:
+        analysis_cache.close()
+    print(f"{len(imported)} entries imported from {cache_directory}")
+
+    if args.delete:
+        for path in imported:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 import importlib
-from typing import TYPE_CHECKING, Any, NoReturn, cast
+from typing import TYPE_CHECKING, Any, AsyncIterator, NoReturn, cast
 
 from pydantic import BaseModel
 
 from src.backend.backend.localized_app import LocalizedApp
 from src.backend.backend.paths import get_app_def_filename
 from src.backend.backend.server_config import ServerConfig
+from src.backend.backend.usage_statistics import UsageStatistics
 from src.backend.decision.decision_odm.decision_odm import CaseHandlingDecisionEngineODM
+from src.backend.text_analysis.analysis_cache import AnalysisCache, build_analysis_cache
+from src.backend.text_analysis.failover import HealthScores
+from src.backend.text_analysis.llm_registry import LlmRegistry
+from src.backend.text_analysis.rate_limiter import LlmLimiters
+from src.backend.text_analysis.retry_policy import CircuitBreakers
 from src.common.config import Config, SupportedLocale, load_config_from_workbook
 from src.common.server_api import (
+    AnalyzeBatchItem,
     CaseHandlingDecisionInput,
     CaseHandlingDecisionOutput,
     CaseHandlingDetailedResponse,
@@ -58,6 +65,11 @@ class App(ServerApi):
         self,
         runtime_directory: str,
         app_id: str,
+        usage_statistics: UsageStatistics | None = None,
+        circuit_breakers: CircuitBreakers | None = None,
+        health_scores: HealthScores | None = None,
+        analysis_cache: AnalysisCache | None = None,
+        llm_limiters: LlmLimiters | None = None,
     ) -> None:
         self.runtime_directory = runtime_directory
         self.app_id: str = app_id
@@ -68,6 +80,26 @@ class App(ServerApi):
         self.llm_configs: dict[str, LlmConfig] = {
             llm_config.id: llm_config for llm_config in server_config.llm_configs
         }
+        # Pooled LLM clients shared by all the locales of the app, rate limiters shared by all the apps
+        self.llm_registry: LlmRegistry = LlmRegistry(self.llm_configs, llm_limiters)
+        # Shared by all the apps of the server when provided
+        self.usage_statistics: UsageStatistics = (
+            usage_statistics
+            if usage_statistics is not None
+            else UsageStatistics(server_config.llm_costs)
+        )
+        self.circuit_breakers: CircuitBreakers = (
+            circuit_breakers if circuit_breakers is not None else CircuitBreakers()
+        )
+        self.failover_chain: list[str] = server_config.get_failover_chain(app_id)
+        self.health_scores: HealthScores = (
+            health_scores if health_scores is not None else HealthScores()
+        )
+        self.analysis_cache: AnalysisCache = (
+            analysis_cache
+            if analysis_cache is not None
+            else build_analysis_cache(runtime_directory, server_config.analysis_cache)
+        )
 
         app_def_filename = get_app_def_filename(runtime_directory, app_id)
         app_def: AppDef = load_app_def_from_workbook(app_def_filename)
@@ -103,6 +135,21 @@ class App(ServerApi):
                 decision_engine = cls()
             self.decision_engines[decision_engine_config.id] = decision_engine
 
+    def close(self) -> None:
+        self.llm_registry.close()
+
+    def get_analysis_configuration(self) -> list[Any]:
+        """:return: What the analysis results of the app depend on, to tell on reload whether the ones
+        cached in memory can be kept
+        """
+        return [
+            self.llm_configs,
+            [
+                (locale, localized_app.case_model, localized_app.text_analysis_config)
+                for locale, localized_app in self.localized_apps.items()
+            ],
+        ]
+
     def decide(
         self,
         decision_engine_config_id: str,
@@ -125,6 +172,15 @@ class App(ServerApi):
             msg,
         )
 
+    def get_usage_statistics(self, app_id: str | None = None) -> list[dict[str, Any]]:
+        return self.usage_statistics.get_usage_statistics(self.app_id)
+
+    def get_circuit_breakers(self) -> list[dict[str, Any]]:
+        return self.circuit_breakers.get_states()
+
+    def get_analysis_cache_statistics(self) -> list[dict[str, Any]]:
+        return self.analysis_cache.get_statistics()
+
     def get_locales(self, app_id: str) -> list[SupportedLocale]:
         return self.locales
 
@@ -166,6 +222,41 @@ class App(ServerApi):
             llm_config_id,
         )
 
+    async def analyze_async(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> dict[str, Any]:
+        return await self.localized_apps[locale].analyze_async(
+            app_id,
+            locale,
+            field_values,
+            text,
+            read_from_cache,
+            llm_config_id,
+        )
+
+    async def analyze_batch(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        items: list[AnalyzeBatchItem],
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> AsyncIterator[dict[str, Any]]:
+        async for item_result in self.localized_apps[locale].analyze_batch(
+            app_id,
+            locale,
+            items,
+            read_from_cache,
+            llm_config_id,
+        ):
+            yield item_result
+
     def save_text_analysis_cache(
         self,
         app_id: str,
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import importlib
 import json
 import time
-from typing import TYPE_CHECKING, Any, cast
+from typing import TYPE_CHECKING, Any, AsyncIterator, cast
 
 from pydantic import BaseModel, ValidationError
 
-from src.backend.backend.paths import get_app_def_filename, get_cache_file_path
+from src.backend.backend.paths import get_app_def_filename
 from src.backend.distribution.distribution_email.distribution_email import (
     CaseHandlingDistributionEngineEmail,
 )
@@ -15,6 +16,13 @@ from src.backend.distribution.distribution_email.distribution_email_config impor
     DistributionEmailConfig,
     load_email_config_from_workbook,
 )
+from src.backend.text_analysis.retry_policy import (
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    get_retry_delay,
+    is_provider_failure,
+    is_transient,
+)
 from src.backend.text_analysis.text_analyzer import (
     TextAnalysisConfig,
     TextAnalyzer,
@@ -26,8 +34,15 @@ from src.common.case_model import (
     load_case_model_config_from_workbook,
 )
 from src.common.config import Config, SupportedLocale, load_config_from_workbook
+from src.common.constants import (
+    KEY_ANALYSIS_RESULT,
+    KEY_CACHE_KEY,
+    KEY_HASH_CODE,
+    KEY_STATISTICS,
+)
 from src.common.logging import print_blue, print_red
 from src.common.server_api import (
+    AnalyzeBatchItem,
     CaseHandlingDecisionInput,
     CaseHandlingDecisionOutput,
     CaseHandlingDetailedResponse,
@@ -39,6 +54,7 @@ from src.common.server_api import (
 if TYPE_CHECKING:
     from src.backend.backend.app import App
     from src.backend.distribution.distribution import CaseHandlingDistributionEngine
+    from src.backend.text_analysis.failover import HealthScore
     from src.backend.text_analysis.llm import LlmConfig
 
 
@@ -169,7 +185,12 @@ class LocalizedApp(ServerApi):
             locale,
             case_model,
             self.text_analysis_config,
+            parent_app.llm_registry,
+            parent_app.usage_statistics,
+            parent_app.analysis_cache,
         )
+        # Compile the system prompt templates now rather than on the first analyses
+        self.text_analyzer.warm_up(parent_app.llm_configs.values())
 
     # API implementation
 
@@ -179,6 +200,15 @@ class LocalizedApp(ServerApi):
     def get_app_ids(self) -> list[str]:
         pass
 
+    def get_usage_statistics(self, app_id: str | None = None) -> list[dict[str, Any]]:
+        pass
+
+    def get_circuit_breakers(self) -> list[dict[str, Any]]:
+        pass
+
+    def get_analysis_cache_statistics(self) -> list[dict[str, Any]]:
+        pass
+
     def get_locales(self, app_id: str) -> list[SupportedLocale]:
         pass
 
@@ -227,6 +257,7 @@ class LocalizedApp(ServerApi):
         )
         from src.common.constants import (
             KEY_ANALYSIS_RESULT,
+            KEY_CACHE_KEY,
             KEY_HASH_CODE,
             KEY_HIGHLIGHTED_TEXT_AND_FEATURES,
             KEY_MARKDOWN_TABLE,
@@ -271,6 +302,7 @@ class LocalizedApp(ServerApi):
             "Error Message": error_message_full,
             "Prompt tokens": "N/A",
             "Completion tokens": "N/A",
+            "Cached tokens": "N/A",
         }
 
         # Créer l'analysis_result minimal
@@ -278,6 +310,7 @@ class LocalizedApp(ServerApi):
             FIELD_NAME_SCORINGS: [intention_other],
             KEY_STATISTICS: statistics,
             KEY_HASH_CODE: None,
+            KEY_CACHE_KEY: None,
         }
 
         # Générer le markdown table en utilisant la fonction existante
@@ -293,32 +326,90 @@ class LocalizedApp(ServerApi):
             KEY_HIGHLIGHTED_TEXT_AND_FEATURES: "",
         }
 
-    def analyze(
+    def _get_retry_delay(
+        self,
+        llm_config: LlmConfig,
+        circuit_breaker: CircuitBreaker,
+        attempt: int,
+        deadline: float,
+        e: Exception,
+    ) -> float | None:
+        """:return: Le délai avant la prochaine tentative, None s'il faut renoncer à ce llm_config"""
+        error_code = f"{type(e).__name__}: {str(e)[:200]}"
+
+        if is_provider_failure(e):
+            circuit_breaker.record_failure()
+
+        if not is_transient(e):
+            print_red(f"❌ Erreur non transitoire, pas de nouvelle tentative: {error_code}")
+        elif attempt >= llm_config.max_attempts:
+            print_red(f"❌ Échec de l'analyse après {attempt} tentatives: {error_code}")
+        else:
+            retry_delay = get_retry_delay(llm_config, attempt, e)
+            if time.monotonic() + retry_delay <= deadline:
+                print_red(
+                    f"⚠️  Erreur lors de l'analyse (tentative {attempt}/{llm_config.max_attempts}): {error_code}",
+                )
+                print_blue(f"   Nouvelle tentative dans {retry_delay:.1f}s...")
+                return retry_delay
+            print_red(
+                f"❌ Délai de {llm_config.retry_deadline}s dépassé après {attempt} tentatives: {error_code}",
+            )
+
+        return None
+
+    def _get_failover_llm_configs(self, llm_config_id: str) -> list[LlmConfig]:
+        """:return: Les llm_configs à essayer dans l'ordre : celui demandé seul, ou, s'il fait partie de la
+        chaîne de failover de l'app, celui demandé et les entrées suivantes de la chaîne, en commençant
+        par la première en bonne santé
+        """
+        llm_configs: dict[str, LlmConfig] = self.parent_app.llm_configs
+        failover_chain: list[str] = self.parent_app.failover_chain
+        if llm_config_id not in failover_chain:
+            return [llm_configs[llm_config_id]]
+        return [
+            llm_configs[failover_llm_config_id]
+            for failover_llm_config_id in self.parent_app.health_scores.route(
+                failover_chain,
+                llm_config_id,
+            )
+        ]
+
+    def _check_circuit_breaker(
+        self,
+        llm_config: LlmConfig,
+        circuit_breaker: CircuitBreaker,
+    ) -> None:
+        if not circuit_breaker.allow_request():
+            msg = f"Circuit breaker open for {llm_config.llm}: the provider failed repeatedly"
+            print_red(f"⛔ {msg}")
+            raise CircuitBreakerOpenError(msg)
+
+    def _analyze_with_retries(
         self,
-        app_id: str,
         locale: SupportedLocale,
+        llm_config: LlmConfig,
         field_values: dict[str, Any],
         text: str,
         read_from_cache: bool,
-        llm_config_id: str,
     ) -> dict[str, Any]:
-        """Analyse le texte avec mécanisme de retry pour les erreurs temporaires.
+        """Analyse le texte avec un llm_config, selon sa politique de retry.
 
-        En cas d'erreur lors de l'analyse, réessaie jusqu'à 3 fois avec un délai de 2 secondes
-        entre chaque tentative. Si toutes les tentatives échouent, retourne une réponse minimale
-        avec uniquement l'intention "Autre"/"Other" et le code d'erreur dans les statistiques.
+        :raise Exception: La dernière erreur, si l'analyse échoue
         """
-        llm_configs: dict[str, LlmConfig] = self.parent_app.llm_configs
-        llm_config: LlmConfig = llm_configs[llm_config_id]
-
-        # Nombre maximum de tentatives
-        max_retries = 3
-        # Délai entre les tentatives en secondes
-        retry_delay = 2.0
-
-        for attempt in range(1, max_retries + 1):
+        circuit_breaker: CircuitBreaker = self.parent_app.circuit_breakers.get(
+            llm_config.llm,
+        )
+        health_score: HealthScore = self.parent_app.health_scores.get(llm_config.id)
+        deadline = time.monotonic() + llm_config.retry_deadline
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_circuit_breaker(llm_config, circuit_breaker)
+            before = time.monotonic()
             try:
-                return self.text_analyzer.analyze(
+                result = self.text_analyzer.analyze(
                     locale=locale,
                     llm_config=llm_config,
                     field_values=field_values,
@@ -326,25 +417,259 @@ class LocalizedApp(ServerApi):
                     read_from_cache=read_from_cache,
                 )
             except Exception as e:
-                if attempt < max_retries:
-                    # Erreur temporaire : on réessaie après un délai
-                    print_red(
-                        f"⚠️  Erreur lors de l'analyse (tentative {attempt}/{max_retries}): {type(e).__name__}: {str(e)[:200]}",
-                    )
-                    print_blue(f"   Nouvelle tentative dans {retry_delay}s...")
-                    time.sleep(retry_delay)
+                health_score.record_failure()
+                retry_delay = self._get_retry_delay(
+                    llm_config,
+                    circuit_breaker,
+                    attempt,
+                    deadline,
+                    e,
+                )
+                if retry_delay is None:
+                    raise
+                time.sleep(retry_delay)
+            else:
+                circuit_breaker.record_success()
+                health_score.record_success(time.monotonic() - before)
+                return result
+
+    async def _analyze_with_retries_async(
+        self,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+    ) -> dict[str, Any]:
+        """Version non bloquante de _analyze_with_retries()."""
+        circuit_breaker: CircuitBreaker = self.parent_app.circuit_breakers.get(
+            llm_config.llm,
+        )
+        health_score: HealthScore = self.parent_app.health_scores.get(llm_config.id)
+        deadline = time.monotonic() + llm_config.retry_deadline
+
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_circuit_breaker(llm_config, circuit_breaker)
+            before = time.monotonic()
+            try:
+                result = await self.text_analyzer.analyze_async(
+                    locale=locale,
+                    llm_config=llm_config,
+                    field_values=field_values,
+                    text=text,
+                    read_from_cache=read_from_cache,
+                )
+            except Exception as e:
+                health_score.record_failure()
+                retry_delay = self._get_retry_delay(
+                    llm_config,
+                    circuit_breaker,
+                    attempt,
+                    deadline,
+                    e,
+                )
+                if retry_delay is None:
+                    raise
+                await asyncio.sleep(retry_delay)
+            else:
+                circuit_breaker.record_success()
+                health_score.record_success(time.monotonic() - before)
+                return result
+
+    def _give_up(
+        self,
+        locale: SupportedLocale,
+        llm_configs: list[LlmConfig],
+        index: int,
+        e: Exception,
+    ) -> dict[str, Any] | None:
+        """:return: None pour passer au llm_config suivant de la chaîne de failover, sinon la réponse
+        minimale à retourner
+        """
+        if index + 1 < len(llm_configs):
+            print_blue(f"   Bascule sur le llm_config {llm_configs[index + 1].id}")
+            return None
+        print_blue("   Retour d'une réponse minimale avec l'intention 'Autre'")
+        return self._create_fallback_response(locale, llm_configs[index], e)
+
+    def _record_served_by(
+        self,
+        result: dict[str, Any],
+        llm_config_id: str,
+        llm_config: LlmConfig,
+    ) -> dict[str, Any]:
+        # "LLM config" est celui qui a servi la requête
+        if llm_config.id != llm_config_id:
+            result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]["Failover from"] = llm_config_id
+        return result
+
+    def analyze(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> dict[str, Any]:
+        """Analyse le texte avec mécanisme de retry pour les erreurs temporaires.
+
+        La politique de retry est celle du llm_config : jusqu'à max_attempts tentatives, séparées par un
+        délai exponentiel aléatoire (ou celui demandé par Retry-After), dans la limite de retry_deadline.
+        Les erreurs non transitoires (configuration, authentification, requête invalide) ne sont pas
+        retentées, et le disjoncteur du fournisseur évite d'appeler un LLM en panne. Si le llm_config
+        fait partie de la chaîne de failover de l'app, les autres entrées de la chaîne sont essayées à
+        leur tour. Si l'analyse échoue, retourne une réponse minimale avec uniquement l'intention
+        "Autre"/"Other" et le code d'erreur dans les statistiques.
+        """
+        llm_configs = self._get_failover_llm_configs(llm_config_id)
+        for index, llm_config in enumerate(llm_configs):
+            try:
+                result = self._analyze_with_retries(
+                    locale,
+                    llm_config,
+                    field_values,
+                    text,
+                    read_from_cache,
+                )
+            except Exception as e:
+                # On retourne une réponse minimale au lieu de propager l'exception
+                fallback_response = self._give_up(locale, llm_configs, index, e)
+                if fallback_response is None:
+                    continue
+                result = fallback_response
+            return self._record_served_by(result, llm_config_id, llm_config)
+        return None
+
+    async def analyze_async(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> dict[str, Any]:
+        """Version non bloquante de analyze() : même mécanisme de retry, de failover et de fallback,
+        mais l'appel au LLM et le délai entre les tentatives ne bloquent pas la boucle d'événements.
+        """
+        llm_configs = self._get_failover_llm_configs(llm_config_id)
+        for index, llm_config in enumerate(llm_configs):
+            try:
+                result = await self._analyze_with_retries_async(
+                    locale,
+                    llm_config,
+                    field_values,
+                    text,
+                    read_from_cache,
+                )
+            except Exception as e:
+                fallback_response = self._give_up(locale, llm_configs, index, e)
+                if fallback_response is None:
                     continue
-                else:
-                    # Dernière tentative échouée : on retourne une réponse minimale au lieu de propager l'exception
-                    error_code = f"{type(e).__name__}: {str(e)[:200]}"
+                result = fallback_response
+            return self._record_served_by(result, llm_config_id, llm_config)
+        return None
+
+    async def analyze_batch(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        items: list[AnalyzeBatchItem],
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Analyse les textes de façon concurrente, dans la limite de max_concurrency analyses en cours
+        pour le llm_config (limite partagée par tous les lots), et produit les résultats dans l'ordre
+        où ils se terminent. Une erreur sur un texte est rapportée pour ce texte uniquement.
+
+        Si llm_config peut grouper les textes (voir TextAnalyzer.can_pack()) et ne fait pas partie de
+        la chaîne de failover de l'app, les textes partageant le même prompt système sont regroupés et
+        notés par un seul appel au LLM. Les textes absents de la réponse groupée, ou dont le groupe a
+        échoué, sont ensuite analysés un par un, de façon concurrente.
+        """
+        llm_config: LlmConfig = self.parent_app.llm_configs[llm_config_id]
+        semaphore: asyncio.Semaphore = self.parent_app.llm_registry.get_semaphore(
+            llm_config,
+        )
+
+        async def analyze_item(index: int, item: AnalyzeBatchItem) -> dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.analyze_async(
+                        app_id,
+                        locale,
+                        dict(item.field_values),
+                        item.text,
+                        read_from_cache,
+                        llm_config_id,
+                    )
+                    return {"index": index, "result": result}
+                except Exception as e:
                     print_red(
-                        f"❌ Échec de l'analyse après {max_retries} tentatives: {error_code}",
+                        f"❌ Erreur lors de l'analyse du texte {index} du lot: {type(e).__name__}: {str(e)[:200]}",
+                    )
+                    return {
+                        "index": index,
+                        "error": {
+                            "error_type": type(e).__name__,
+                            "error_message": str(e),
+                        },
+                    }
+
+        texts: list[tuple[dict[str, Any], str]] = [
+            (dict(item.field_values), item.text) for item in items
+        ]
+
+        async def analyze_pack(pack: list[int]) -> list[dict[str, Any]]:
+            if len(pack) == 1:
+                return [await analyze_item(pack[0], items[pack[0]])]
+
+            async with semaphore:
+                try:
+                    results = await self.text_analyzer.analyze_packed_async(
+                        locale,
+                        llm_config,
+                        [texts[index] for index in pack],
+                        read_from_cache,
                     )
-                    print_blue(
-                        "   Retour d'une réponse minimale avec l'intention 'Autre'",
+                except Exception as e:
+                    print_red(
+                        f"⚠️  Échec de l'analyse groupée de {len(pack)} textes: {type(e).__name__}: {str(e)[:200]}",
                     )
-                    return self._create_fallback_response(locale, llm_config, e)
-        return None
+                    print_blue("   Analyse des textes un par un...")
+                    results = [None] * len(pack)
+
+            missing_results = await asyncio.gather(
+                *(
+                    analyze_item(index, items[index])
+                    for index, result in zip(pack, results)
+                    if result is None
+                ),
+            )
+            return [
+                {"index": index, "result": result}
+                for index, result in zip(pack, results)
+                if result is not None
+            ] + missing_results
+
+        packs: list[list[int]] = (
+            self.text_analyzer.plan_packs(llm_config, texts)
+            if self.text_analyzer.can_pack(llm_config)
+            and llm_config_id not in self.parent_app.failover_chain
+            else [[index] for index in range(len(items))]
+        )
+        tasks = [asyncio.create_task(analyze_pack(pack)) for pack in packs]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                for item_result in await next_completed:
+                    yield item_result
+        finally:
+            # The consumer stopped early (e.g. client disconnected): drop the pending analyses
+            for task in tasks:
+                task.cancel()
 
     def save_text_analysis_cache(
         self,
@@ -356,15 +681,19 @@ class LocalizedApp(ServerApi):
         print_blue(text_analysis_cache)
         text_analysis_cache_dict = json.loads(text_analysis_cache)
         print_blue()
-        hash_code = text_analysis_cache_dict["hash_code"]
-        cache_filename = get_cache_file_path(
-            self.runtime_directory,
+        cache_key = text_analysis_cache_dict.get(KEY_CACHE_KEY)
+        if not cache_key:
+            # Analysis made before the versioned cache keys, or not cacheable
+            print_red(
+                f"No cache key in analysis {text_analysis_cache_dict.get(KEY_HASH_CODE)} - Not cached",
+            )
+            return
+        self.text_analyzer.analysis_cache.put(
             self.app_id,
             self.locale,
-            hash_code,
+            cache_key,
+            text_analysis_cache_dict,
         )
-        with open(file=cache_filename, mode="w", encoding="utf-8") as f:
-            f.write(text_analysis_cache)
 
     @staticmethod
     def verbalize(list_verbalized_messages: list[Message], message_to_verbalize: str):
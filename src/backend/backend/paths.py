@@ -35,6 +35,14 @@ def get_cache_file_path(
     runtime_directory: str,
     app_id: str,
     locale: SupportedLocale,
-    hash_code: str,
+    cache_key: str,
 ) -> str:
-    return f"{runtime_directory}/cache/cache_{app_id}_{locale}_{hash_code}.json"
+    return f"{runtime_directory}/cache/cache_{app_id}_{locale}_{cache_key}.json"
+
+
+def get_self_training_file_path(
+    runtime_directory: str,
+    app_id: str,
+    locale: SupportedLocale,
+) -> str:
+    return f"{runtime_directory}/self_training/examples_{app_id}_{locale}.csv"
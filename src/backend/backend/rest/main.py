@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import inspect
+import json
 import os
 import sys
 import traceback
@@ -10,7 +11,7 @@ from typing import TYPE_CHECKING, Any
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from src.backend.backend.trusted_services_server import TrustedServicesServer
@@ -18,7 +19,11 @@ from src.backend.ruleflow.ruleflow_api import router as ruleflow_router
 from src.common.case_model import CaseModel
 from src.common.constants import API_ROUTE_V2
 from src.common.config import SupportedLocale
-from src.common.server_api import CaseHandlingDetailedResponse, CaseHandlingRequest
+from src.common.server_api import (
+    AnalyzeBatchItem,
+    CaseHandlingDetailedResponse,
+    CaseHandlingRequest,
+)
 from src.common.logging import print_red
 
 if TYPE_CHECKING:
@@ -32,6 +37,12 @@ class AnalyzeRequest(BaseModel):
     llm_config_id: str
 
 
+class AnalyzeBatchRequest(BaseModel):
+    items: list[AnalyzeBatchItem]
+    read_from_cache: bool
+    llm_config_id: str
+
+
 def log_function_call() -> None:
     frame = inspect.currentframe().f_back
     args_info = inspect.getargvalues(frame)
@@ -147,6 +158,36 @@ async def get_app_ids() -> list[str]:
     return app.server_api.get_app_ids()
 
 
+@app.get(
+    API_ROUTE_V2 + "/usage_statistics",
+    summary="Get the LLM token usage and cost, per app, locale and llm_config",
+    tags=["System"],
+)
+async def get_usage_statistics(app_id: str | None = None) -> list[dict[str, Any]]:
+    log_function_call()
+    return app.server_api.get_usage_statistics(app_id)
+
+
+@app.get(
+    API_ROUTE_V2 + "/circuit_breakers",
+    summary="Get the state of the circuit breaker of each LLM provider",
+    tags=["System"],
+)
+async def get_circuit_breakers() -> list[dict[str, Any]]:
+    log_function_call()
+    return app.server_api.get_circuit_breakers()
+
+
+@app.get(
+    API_ROUTE_V2 + "/analysis_cache_statistics",
+    summary="Get the hit and miss counters of each tier of the analysis cache",
+    tags=["System"],
+)
+async def get_analysis_cache_statistics() -> list[dict[str, Any]]:
+    log_function_call()
+    return app.server_api.get_analysis_cache_statistics()
+
+
 @app.get(
     API_ROUTE_V2 + "/apps/{app_id}/locales",
     response_model=list[str],
@@ -215,7 +256,7 @@ async def get_case_model(app_id: str, locale: SupportedLocale) -> CaseModel:
 async def analyze(app_id: str, locale: SupportedLocale, request: AnalyzeRequest):
     log_function_call()
     try:
-        return app.server_api.analyze(
+        return await app.server_api.analyze_async(
             app_id=app_id,
             locale=locale,
             field_values=request.field_values,
@@ -240,6 +281,39 @@ async def analyze(app_id: str, locale: SupportedLocale, request: AnalyzeRequest)
         )
 
 
+@app.post(
+    API_ROUTE_V2 + "/apps/{app_id}/{locale}/analyze_batch",
+    summary="Analyze several texts concurrently, streaming one NDJSON line per text in completion order",
+    tags=["Analysis and Processing"],
+)
+async def analyze_batch(
+    app_id: str,
+    locale: SupportedLocale,
+    request: AnalyzeBatchRequest,
+):
+    log_function_call()
+    if request.llm_config_id not in app.server_api.get_llm_config_ids(app_id):
+        return JSONResponse(
+            status_code=404,
+            content={
+                "error": "Not Found",
+                "error_message": f"Unknown app '{app_id}' or llm_config '{request.llm_config_id}'",
+            },
+        )
+
+    async def ndjson_lines():
+        async for item_result in app.server_api.analyze_batch(
+            app_id=app_id,
+            locale=locale,
+            items=request.items,
+            read_from_cache=request.read_from_cache,
+            llm_config_id=request.llm_config_id,
+        ):
+            yield json.dumps(item_result, default=str) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @app.post(
     API_ROUTE_V2 + "/apps/{app_id}/{locale}/save_text_analysis_cache",
     tags=["Analysis and Processing"],
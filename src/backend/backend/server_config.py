@@ -1,13 +1,39 @@
 from __future__ import annotations
 
-import yaml
-from pydantic import BaseModel
-
-from src.backend.text_analysis.llm import LlmConfig
+import yaml
+from pydantic import BaseModel
+
+from src.backend.backend.usage_statistics import LlmCost
+from src.backend.text_analysis.analysis_cache import AnalysisCacheConfig
+from src.backend.text_analysis.llm import LlmConfig
+
+
+class FailoverChain(BaseModel):
+    app_id: str
+    # Tried in this order, skipping the unhealthy ones, by the analyses requested on any of them
+    llm_config_ids: list[str]
 
 
 class ServerConfig(BaseModel):
     llm_configs: list[LlmConfig]
+    llm_costs: list[LlmCost] = []
+    failover_chains: list[FailoverChain] = []
+    analysis_cache: AnalysisCacheConfig = AnalysisCacheConfig()
+    # Seconds between two retrainings of the self-training pre-routers, None to never retrain them
+    self_training_interval: float | None = None
+
+    def get_failover_chain(self, app_id: str) -> list[str]:
+        """:return: The ids of the llm_configs the analyses of the app fail over to, [] if none"""
+        llm_config_ids = {llm_config.id for llm_config in self.llm_configs}
+        for failover_chain in self.failover_chains:
+            if failover_chain.app_id != app_id:
+                continue
+            for llm_config_id in failover_chain.llm_config_ids:
+                if llm_config_id not in llm_config_ids:
+                    msg = f"Unknown llm_config in the failover chain of {app_id}: {llm_config_id}"
+                    raise ValueError(msg)
+            return failover_chain.llm_config_ids
+        return []
 
     @staticmethod
     def load_from_yaml_file(path: str) -> ServerConfig:
@@ -4,18 +4,33 @@ import logging
 import os
 import re
 import sys
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterator
 
 from src.backend.backend.app import App
+from src.backend.backend.server_config import ServerConfig
+from src.backend.backend.usage_statistics import UsageStatistics
+from src.backend.text_analysis.analysis_cache import (
+    AnalysisCache,
+    AnalysisCacheConfig,
+    build_analysis_cache,
+)
+from src.backend.text_analysis.failover import HealthScores
+from src.backend.text_analysis.rate_limiter import LlmLimiters
+from src.backend.text_analysis.retry_policy import CircuitBreakers
+from src.backend.text_analysis.self_training import SelfTrainer
 from src.common.logging import print_red, print_yellow
 from src.common.server_api import (
+    AnalyzeBatchItem,
     CaseHandlingDetailedResponse,
     CaseHandlingRequest,
     ServerApi,
 )
 
 if TYPE_CHECKING:
+    from src.backend.text_analysis.text_analyzer import TextAnalyzer
     from src.common.case_model import CaseModel
     from src.common.config import SupportedLocale
 
@@ -121,6 +136,49 @@ class AppValidator:
         print_yellow(warning_msg)
 
 
+class AppsGeneration:
+    """The apps loaded by one reload_apps, with the analysis cache they use.
+
+    Once replaced by the next reload_apps, the apps (and the analysis cache if it was replaced too) are only
+    closed when the last request using them is over, so that no request in flight loses its pooled LLM
+    clients or its cache connection.
+    """
+
+    def __init__(self, apps: dict[str, App], analysis_cache: AnalysisCache | None) -> None:
+        self.apps = apps
+        self.analysis_cache = analysis_cache
+        self.requests = 0
+        self.retired = False
+        self.close_analysis_cache = False
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.requests -= 1
+            drained = self.retired and self.requests == 0
+        if drained:
+            self._close()
+
+    def retire(self, close_analysis_cache: bool) -> None:
+        """Close the apps, and the analysis cache if close_analysis_cache, once no request uses them."""
+        with self._lock:
+            self.retired = True
+            self.close_analysis_cache = close_analysis_cache
+            drained = self.requests == 0
+        if drained:
+            self._close()
+
+    def _close(self) -> None:
+        for app in self.apps.values():
+            app.close()
+        if self.close_analysis_cache and self.analysis_cache is not None:
+            self.analysis_cache.close()
+
+
 class TrustedServicesServer(ServerApi):
 
     def __init__(self, runtime_directory: str) -> None:
@@ -139,20 +197,76 @@ class TrustedServicesServer(ServerApi):
         validation_mode = os.getenv("APP_VALIDATION_MODE", "strict")
         self.validator = AppValidator(validation_mode)
 
+        # LLM usage totals, kept across reload_apps
+        self.usage_statistics = UsageStatistics()
+        # Per LLM provider, also kept across reload_apps
+        self.circuit_breakers = CircuitBreakers()
+        # Per llm_config, also kept across reload_apps
+        self.health_scores = HealthScores()
+        # Retrains the pre-routers of the apps found in self.apps at each run
+        self.self_trainer = SelfTrainer(self._get_text_analyzers)
+        # Per llm_config, shared by all the apps and kept across reload_apps
+        self.llm_limiters = LlmLimiters()
+        # Rebuilt by reload_apps only if its configuration changed
+        self.analysis_cache_config: AnalysisCacheConfig | None = None
+        self.analysis_cache: AnalysisCache | None = None
+
         self.apps: dict[str, App] = {}  # To be ovedrriden in reload_apps
+        # Swapped with self.apps by reload_apps, under the lock so that a request never uses a retired one
+        self._generation = AppsGeneration(self.apps, self.analysis_cache)
+        self._generation_lock = threading.Lock()
         self.reload_apps()
 
     def reload_apps(self) -> None:
         apps_subdirectory = Path(self.runtime_directory + "/apps")
         app_ids = sorted([p.name for p in apps_subdirectory.iterdir() if p.is_dir()])
 
-        self.apps: dict[str, App] = {
+        previous_apps: dict[str, App] = self.apps
+
+        server_config = ServerConfig.load_from_yaml_file(
+            self.runtime_directory + "/config_server.yaml",
+        )
+        self.usage_statistics.set_llm_costs(server_config.llm_costs)
+        previous_analysis_cache: AnalysisCache | None = self.analysis_cache
+        if server_config.analysis_cache != self.analysis_cache_config:
+            self.analysis_cache_config = server_config.analysis_cache
+            self.analysis_cache = build_analysis_cache(
+                self.runtime_directory,
+                server_config.analysis_cache,
+            )
+
+        apps: dict[str, App] = {
             app_id: App(
                 self.runtime_directory,
                 app_id,
+                self.usage_statistics,
+                self.circuit_breakers,
+                self.health_scores,
+                self.analysis_cache,
+                self.llm_limiters,
             )
             for app_id in app_ids
         }
+        with self._generation_lock:
+            previous_generation = self._generation
+            self.apps = apps
+            self._generation = AppsGeneration(apps, self.analysis_cache)
+
+        # Release the pooled LLM connections of the apps that were replaced, and the connection of the
+        # analysis cache if it was replaced too, once the requests in flight are over
+        previous_generation.retire(
+            close_analysis_cache=previous_analysis_cache is not self.analysis_cache,
+        )
+        # Forget the analyses kept in memory for the apps whose configuration changed
+        for app_id, previous_app in previous_apps.items():
+            app = self.apps.get(app_id)
+            if (
+                app is None
+                or app.get_analysis_configuration() != previous_app.get_analysis_configuration()
+            ):
+                self.analysis_cache.invalidate(app_id)
+
+        self.self_trainer.schedule(server_config.self_training_interval)
 
         # Validate loaded applications
         self.validator.validate_apps(self.apps)
@@ -209,9 +323,36 @@ class TrustedServicesServer(ServerApi):
                     e,
                 )
 
+    @contextmanager
+    def _use_app(self, app_id: str) -> Iterator[App]:
+        """:return: The app, not to be closed by a reload_apps until the request is over"""
+        with self._generation_lock:
+            generation = self._generation
+            generation.acquire()
+        try:
+            yield generation.apps[app_id]
+        finally:
+            generation.release()
+
+    def _get_text_analyzers(self) -> list[TextAnalyzer]:
+        return [
+            localized_app.text_analyzer
+            for app in self.apps.values()
+            for localized_app in app.localized_apps.values()
+        ]
+
     def get_app_ids(self) -> list[str]:
         return list(self.apps.keys())
 
+    def get_usage_statistics(self, app_id: str | None = None) -> list[dict[str, Any]]:
+        return self.usage_statistics.get_usage_statistics(app_id)
+
+    def get_circuit_breakers(self) -> list[dict[str, Any]]:
+        return self.circuit_breakers.get_states()
+
+    def get_analysis_cache_statistics(self) -> list[dict[str, Any]]:
+        return self.analysis_cache.get_statistics()
+
     def get_locales(self, app_id: str) -> list[SupportedLocale]:
         app: App = self.apps.get(app_id, None)
         if app is None:
@@ -252,14 +393,52 @@ class TrustedServicesServer(ServerApi):
         read_from_cache: bool,
         llm_config_id: str,
     ) -> dict[str, Any]:
-        return self.apps[app_id].analyze(
-            app_id,
-            locale,
-            field_values,
-            text,
-            read_from_cache,
-            llm_config_id,
-        )
+        with self._use_app(app_id) as app:
+            return app.analyze(
+                app_id,
+                locale,
+                field_values,
+                text,
+                read_from_cache,
+                llm_config_id,
+            )
+
+    async def analyze_async(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> dict[str, Any]:
+        with self._use_app(app_id) as app:
+            return await app.analyze_async(
+                app_id,
+                locale,
+                field_values,
+                text,
+                read_from_cache,
+                llm_config_id,
+            )
+
+    async def analyze_batch(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        items: list[AnalyzeBatchItem],
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> AsyncIterator[dict[str, Any]]:
+        with self._use_app(app_id) as app:
+            async for item_result in app.analyze_batch(
+                app_id,
+                locale,
+                items,
+                read_from_cache,
+                llm_config_id,
+            ):
+                yield item_result
 
     def save_text_analysis_cache(
         self,
@@ -267,7 +446,8 @@ class TrustedServicesServer(ServerApi):
         locale: SupportedLocale,
         text_analysis_cache: str,
     ) -> None:
-        self.apps[app_id].save_text_analysis_cache(app_id, locale, text_analysis_cache)
+        with self._use_app(app_id) as app:
+            app.save_text_analysis_cache(app_id, locale, text_analysis_cache)
 
     def handle_case(
         self,
@@ -275,4 +455,5 @@ class TrustedServicesServer(ServerApi):
         locale: SupportedLocale,
         request: CaseHandlingRequest,
     ) -> CaseHandlingDetailedResponse:
-        return self.apps[app_id].handle_case(app_id, locale, request)
+        with self._use_app(app_id) as app:
+            return app.handle_case(app_id, locale, request)
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from src.backend.text_analysis.llm import LlmConfig, LlmUsage
+    from src.common.config import SupportedLocale
+
+
+class LlmCost(BaseModel):
+    """Price of a model, per million tokens."""
+
+    model: str
+    prompt_cost_per_million: float
+    completion_cost_per_million: float
+    cached_prompt_cost_per_million: float | None = None  # Defaults to prompt_cost_per_million
+    currency: str = "EUR"
+
+    def compute_cost(self, usage: LlmUsage) -> float:
+        prompt_tokens = usage.prompt_tokens or 0
+        cached_tokens = usage.cached_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        cached_prompt_cost_per_million = (
+            self.cached_prompt_cost_per_million
+            if self.cached_prompt_cost_per_million is not None
+            else self.prompt_cost_per_million
+        )
+        return (
+            (prompt_tokens - cached_tokens) * self.prompt_cost_per_million
+            + cached_tokens * cached_prompt_cost_per_million
+            + completion_tokens * self.completion_cost_per_million
+        ) / 1_000_000
+
+
+class UsageTotals(BaseModel):
+    analyses: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    response_time: float = 0.0  # Seconds, summed over the analyses
+    cost: float = 0.0
+    currency: str | None = None
+    # Cascade: analyses requested on this llm_config first sent to the cascade llm_config, and those escalated
+    cascade_analyses: int = 0
+    escalations: int = 0
+    # Pre-router: analyses requested on this llm_config first scored by the pre-router, those served without
+    # calling the LLM, and the bypasses checked by a shadow analysis with the LLM and those it agreed with
+    pre_routed_analyses: int = 0
+    bypasses: int = 0
+    shadow_analyses: int = 0
+    shadow_agreements: int = 0
+    # Near duplicates: analyses requested on this llm_config served the cached result of a similar text
+    near_duplicate_hits: int = 0
+
+
+class UsageStatistics:
+    """In-memory aggregation of the LLM usage per app, locale and llm_config.
+
+    Owned by the server so that the totals survive reload_apps.
+    """
+
+    def __init__(self, llm_costs: list[LlmCost] | None = None) -> None:
+        self.llm_costs: dict[str, LlmCost] = {}
+        self.set_llm_costs(llm_costs or [])
+        self._totals: dict[tuple[str, str, str], UsageTotals] = {}
+        self._lock = threading.Lock()
+
+    def set_llm_costs(self, llm_costs: list[LlmCost]) -> None:
+        self.llm_costs = {llm_cost.model: llm_cost for llm_cost in llm_costs}
+
+    def record(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        usage: LlmUsage,
+        seconds: float,
+    ) -> float | None:
+        """Add one LLM call to the totals.
+
+        :return: The cost of the call, None if the model has no entry in the cost table
+        """
+        llm_cost: LlmCost | None = self.llm_costs.get(llm_config.model)
+        cost: float | None = llm_cost.compute_cost(usage) if llm_cost else None
+
+        with self._lock:
+            totals = self._totals.setdefault(
+                (app_id, locale, llm_config.id),
+                UsageTotals(),
+            )
+            totals.analyses += 1
+            totals.prompt_tokens += usage.prompt_tokens or 0
+            totals.completion_tokens += usage.completion_tokens or 0
+            totals.cached_tokens += usage.cached_tokens or 0
+            totals.response_time += seconds
+            if cost is not None:
+                totals.cost += cost
+                totals.currency = llm_cost.currency
+
+        return cost
+
+    def record_cascade(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        escalated: bool,
+    ) -> None:
+        """Add one cascade analysis requested on llm_config to the totals."""
+        with self._lock:
+            totals = self._totals.setdefault(
+                (app_id, locale, llm_config.id),
+                UsageTotals(),
+            )
+            totals.cascade_analyses += 1
+            if escalated:
+                totals.escalations += 1
+
+    def record_pre_routing(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        bypassed: bool,
+    ) -> None:
+        """Add one analysis requested on llm_config and scored by the pre-router to the totals."""
+        with self._lock:
+            totals = self._totals.setdefault(
+                (app_id, locale, llm_config.id),
+                UsageTotals(),
+            )
+            totals.pre_routed_analyses += 1
+            if bypassed:
+                totals.bypasses += 1
+
+    def record_shadow(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        agreed: bool,
+    ) -> None:
+        """Add one shadow analysis of a bypass by llm_config to the totals."""
+        with self._lock:
+            totals = self._totals.setdefault(
+                (app_id, locale, llm_config.id),
+                UsageTotals(),
+            )
+            totals.shadow_analyses += 1
+            if agreed:
+                totals.shadow_agreements += 1
+
+    def record_near_duplicate(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+    ) -> None:
+        """Add one analysis served the cached result of a near duplicate to the totals."""
+        with self._lock:
+            totals = self._totals.setdefault(
+                (app_id, locale, llm_config.id),
+                UsageTotals(),
+            )
+            totals.near_duplicate_hits += 1
+
+    def get_usage_statistics(self, app_id: str | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "app_id": totals_app_id,
+                    "locale": locale,
+                    "llm_config_id": llm_config_id,
+                    **totals.model_dump(),
+                    "average_response_time": (
+                        totals.response_time / totals.analyses if totals.analyses else None
+                    ),
+                    "escalation_rate": (
+                        totals.escalations / totals.cascade_analyses
+                        if totals.cascade_analyses
+                        else None
+                    ),
+                    "bypass_rate": (
+                        totals.bypasses / totals.pre_routed_analyses
+                        if totals.pre_routed_analyses
+                        else None
+                    ),
+                    "shadow_agreement_rate": (
+                        totals.shadow_agreements / totals.shadow_analyses
+                        if totals.shadow_analyses
+                        else None
+                    ),
+                }
+                for (totals_app_id, locale, llm_config_id), totals in sorted(
+                    self._totals.items(),
+                )
+                if app_id is None or totals_app_id == app_id
+            ]
@@ -0,0 +1,483 @@
+"""Storage of the cached analysis results, looked up by app, locale and cache key.
+
+The cache key (see build_cache_key()) is a versioned digest of everything an analysis result depends on;
+the short hash code of the analyses is only a display alias.
+
+- "sqlite" (default): a single SQLite file in WAL mode, with indexed keys, an optional time to live and a
+  cap on the number of entries, the least recently used ones being evicted first
+- "json_files": the former layout, one JSON file per entry (see get_cache_file_path()), without expiry
+
+build_analysis_cache() puts a bounded in-process LRU tier in front of either backend (TieredAnalysisCache),
+so that the hot entries are served without reading the shared runtime volume.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from src.backend.backend.paths import get_cache_file_path
+from src.common.config import SupportedLocale
+from src.common.logging import print_red
+
+# To be incremented whenever the content of the cache keys changes: the former entries are then no longer
+# served, and age out through the TTL and the LRU eviction
+CACHE_KEY_VERSION = 4
+# The LlmConfig fields an analysis result depends on (not the id, nor the credentials or the timeouts)
+CACHE_KEY_LLM_CONFIG_FIELDS = (
+    "llm",
+    "model",
+    "temperature",
+    "response_format_type",
+    "prompt_format",
+    "prompt_layout",
+)
+
+# cache_{app_id}_{locale}_{cache_key}.json
+JSON_FILE_NAME_PATTERN = re.compile(
+    r"^cache_(?P<app_id>.+?)_(?P<locale>[a-z]{2})_(?P<cache_key>v\d+\.[A-Za-z0-9_-]+)\.json$",
+)
+
+
+def normalize_text_for_key(text: str) -> str:
+    """Same text for the cache whatever its Unicode compatibility forms, case or blanks."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def build_cache_key(payload: dict[str, Any]) -> str:
+    """:param payload: Everything the analysis result depends on, JSON-serializable
+    :return: "v{CACHE_KEY_VERSION}." followed by the URL-safe base64 SHA-256 of the payload
+    """
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(serialized.encode()).digest()
+    return f"v{CACHE_KEY_VERSION}." + base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+
+class AnalysisCacheConfig(BaseModel):
+    backend: Literal["sqlite", "json_files"] = "sqlite"
+    # Seconds after which an entry is no longer served, None to keep the entries forever
+    ttl: float | None = None
+    # Above this number of entries, the least recently read or written ones are evicted
+    max_entries: int | None = 100_000
+    # In-process LRU tier, capped in entries and in bytes of serialized results (0 to disable it)
+    memory_max_entries: int = 1_000
+    memory_max_bytes: int = 64 * 1024 * 1024
+
+
+class AnalysisCache(ABC):
+    # Name of the tier in the statistics
+    name: str
+
+    @abstractmethod
+    def get_entry(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        max_age: float | None = None,
+    ) -> tuple[dict[str, Any], float] | None:
+        """:return: The cached analysis result and when it was computed (time.time()), None if missing,
+        expired or older than max_age
+        """
+
+    def get(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        max_age: float | None = None,
+    ) -> dict[str, Any] | None:
+        """:param max_age: Seconds after which the entry is not served to this caller (see the app's
+        cache_ttl), on top of the TTL of the cache
+        :return: The cached analysis result, None if missing, expired or older than max_age
+        """
+        entry = self.get_entry(app_id, locale, cache_key, max_age)
+        return entry[0] if entry is not None else None
+
+    @abstractmethod
+    def put(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        analysis_result: dict[str, Any],
+        created_at: float | None = None,
+    ) -> None:
+        """Store an analysis result, replacing the previous one if any.
+
+        :param created_at: When the result was computed (time.time()), now if None
+        """
+
+    def invalidate(self, app_id: str) -> None:
+        """Forget the entries of an app kept in memory, if any."""
+
+    def get_statistics(self) -> list[dict[str, Any]]:
+        """:return: The hit and miss counters of each tier"""
+        return []
+
+    def close(self) -> None:
+        pass
+
+
+class JsonFilesAnalysisCache(AnalysisCache):
+    name = "json_files"
+
+    def __init__(self, runtime_directory: str) -> None:
+        self.runtime_directory = runtime_directory
+
+    def get_entry(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        max_age: float | None = None,
+    ) -> tuple[dict[str, Any], float] | None:
+        cache_filename = get_cache_file_path(
+            self.runtime_directory,
+            app_id,
+            locale,
+            cache_key,
+        )
+        if not os.path.exists(cache_filename):
+            return None
+        created_at = os.path.getmtime(cache_filename)
+        if max_age is not None and time.time() - created_at > max_age:
+            return None
+        with open(file=cache_filename, encoding="utf-8") as f:
+            return json.load(f), created_at
+
+    def put(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        analysis_result: dict[str, Any],
+        created_at: float | None = None,
+    ) -> None:
+        cache_filename = get_cache_file_path(
+            self.runtime_directory,
+            app_id,
+            locale,
+            cache_key,
+        )
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        # Written aside then renamed, so that a concurrent reader never sees a partial file
+        temp_filename = f"{cache_filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(file=temp_filename, mode="w", encoding="utf-8") as f:
+            json.dump(analysis_result, f, ensure_ascii=False, indent=4)
+        os.replace(temp_filename, cache_filename)
+
+
+class SqliteAnalysisCache(AnalysisCache):
+    """One SQLite file shared by all the apps; WAL mode lets the readers go on while an entry is written."""
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        filename: str,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+    ) -> None:
+        self.filename = filename
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(filename, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS analysis_results (
+                    app_id TEXT NOT NULL,
+                    locale TEXT NOT NULL,
+                    cache_key TEXT NOT NULL,
+                    analysis_result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (app_id, locale, cache_key)
+                )""",
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS analysis_results_accessed_at ON analysis_results (accessed_at)",
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS analysis_results_created_at ON analysis_results (created_at)",
+            )
+            # Kept up to date by put(), so that the eviction does not count the table at each write
+            (self._entries,) = self._connection.execute(
+                "SELECT COUNT(*) FROM analysis_results",
+            ).fetchone()
+
+    def get_entry(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        max_age: float | None = None,
+    ) -> tuple[dict[str, Any], float] | None:
+        now = time.time()
+        key = (app_id, locale, cache_key)
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT analysis_result, created_at FROM analysis_results"
+                " WHERE app_id = ? AND locale = ? AND cache_key = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            analysis_result, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._entries -= self._connection.execute(
+                    "DELETE FROM analysis_results WHERE app_id = ? AND locale = ? AND cache_key = ?",
+                    key,
+                ).rowcount
+                return None
+            if max_age is not None and now - created_at > max_age:
+                return None
+            self._connection.execute(
+                "UPDATE analysis_results SET accessed_at = ?"
+                " WHERE app_id = ? AND locale = ? AND cache_key = ?",
+                (now, *key),
+            )
+        return json.loads(analysis_result), created_at
+
+    def put(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        analysis_result: dict[str, Any],
+        created_at: float | None = None,
+    ) -> None:
+        now = time.time()
+        created_at = created_at if created_at is not None else now
+        value = json.dumps(analysis_result, ensure_ascii=False)
+        # One transaction: the entry and the evictions it causes are written together or not at all
+        with self._lock:
+            with self._connection:
+                replaced = self._connection.execute(
+                    "SELECT 1 FROM analysis_results WHERE app_id = ? AND locale = ? AND cache_key = ?",
+                    (app_id, locale, cache_key),
+                ).fetchone()
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO analysis_results VALUES (?, ?, ?, ?, ?, ?)",
+                    (app_id, locale, cache_key, value, created_at, created_at),
+                )
+                entries = self._entries + (0 if replaced else 1)
+                if self.ttl is not None:
+                    entries -= self._connection.execute(
+                        "DELETE FROM analysis_results WHERE created_at < ?",
+                        (now - self.ttl,),
+                    ).rowcount
+                if self.max_entries is not None and entries > self.max_entries:
+                    entries -= self._connection.execute(
+                        "DELETE FROM analysis_results WHERE rowid IN"
+                        " (SELECT rowid FROM analysis_results ORDER BY accessed_at LIMIT ?)",
+                        (entries - self.max_entries,),
+                    ).rowcount
+            # Only once the transaction is committed
+            self._entries = entries
+
+    def count(self) -> int:
+        with self._lock:
+            (entries,) = self._connection.execute(
+                "SELECT COUNT(*) FROM analysis_results",
+            ).fetchone()
+        return entries
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class TieredAnalysisCache(AnalysisCache):
+    """In-process LRU tier in front of a persistent backend, with hit and miss counters per tier.
+
+    The memory tier keeps the results serialized: their size is known, and each caller gets its own copy
+    to modify. Its entries need no invalidation when another process writes the persistent backend, since
+    a cache key always designates the same inputs; invalidate() frees those of an app whose configuration
+    was reloaded.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        persistent: AnalysisCache,
+        max_entries: int,
+        max_bytes: int,
+        ttl: float | None = None,
+    ) -> None:
+        self.persistent = persistent
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # The TTL of the persistent backend, also applied to the entries kept in memory
+        self.ttl = ttl
+        # (app_id, locale, cache_key) => analysis result serialized in UTF-8 JSON, created_at
+        self._entries: OrderedDict[tuple[str, str, str], tuple[bytes, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+
+    def _remove(self, key: tuple[str, str, str]) -> None:
+        value, _created_at = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _remember(
+        self,
+        key: tuple[str, str, str],
+        analysis_result: dict[str, Any],
+        created_at: float,
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        value = json.dumps(analysis_result, ensure_ascii=False).encode()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if len(value) > self.max_bytes:
+                return
+            self._entries[key] = (value, created_at)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def get_entry(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        max_age: float | None = None,
+    ) -> tuple[dict[str, Any], float] | None:
+        now = time.time()
+        key = (app_id, locale, cache_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is not None and (max_age is None or now - entry[1] <= max_age):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value, created_at = entry
+                return json.loads(value), created_at
+            self.misses += 1
+
+        persistent_entry = self.persistent.get_entry(app_id, locale, cache_key, max_age)
+        with self._lock:
+            if persistent_entry is None:
+                self.persistent_misses += 1
+                return None
+            self.persistent_hits += 1
+        analysis_result, created_at = persistent_entry
+        self._remember(key, analysis_result, created_at)
+        return persistent_entry
+
+    def put(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        cache_key: str,
+        analysis_result: dict[str, Any],
+        created_at: float | None = None,
+    ) -> None:
+        created_at = created_at if created_at is not None else time.time()
+        self.persistent.put(app_id, locale, cache_key, analysis_result, created_at)
+        self._remember((app_id, locale, cache_key), analysis_result, created_at)
+
+    def invalidate(self, app_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == app_id]:
+                self._remove(key)
+
+    def get_statistics(self) -> list[dict[str, Any]]:
+        def get_hit_rate(hits: int, misses: int) -> float | None:
+            return hits / (hits + misses) if hits + misses else None
+
+        with self._lock:
+            return [
+                {
+                    "tier": self.name,
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": get_hit_rate(self.hits, self.misses),
+                    "entries": len(self._entries),
+                    "bytes": self._bytes,
+                },
+                {
+                    "tier": self.persistent.name,
+                    "hits": self.persistent_hits,
+                    "misses": self.persistent_misses,
+                    "hit_rate": get_hit_rate(self.persistent_hits, self.persistent_misses),
+                },
+            ]
+
+    def close(self) -> None:
+        self.persistent.close()
+
+
+def build_analysis_cache(
+    runtime_directory: str,
+    analysis_cache_config: AnalysisCacheConfig,
+) -> TieredAnalysisCache:
+    persistent: AnalysisCache
+    if analysis_cache_config.backend == "json_files":
+        persistent = JsonFilesAnalysisCache(runtime_directory)
+    else:
+        persistent = SqliteAnalysisCache(
+            f"{runtime_directory}/cache/analysis_cache.sqlite3",
+            analysis_cache_config.ttl,
+            analysis_cache_config.max_entries,
+        )
+    return TieredAnalysisCache(
+        persistent,
+        analysis_cache_config.memory_max_entries,
+        analysis_cache_config.memory_max_bytes,
+        analysis_cache_config.ttl if analysis_cache_config.backend == "sqlite" else None,
+    )
+
+
+def import_json_files(cache_directory: str, analysis_cache: AnalysisCache) -> list[str]:
+    """Copy the cache_{app_id}_{locale}_{cache_key}.json files of a directory into another cache backend,
+    dated by their modification time.
+
+    :return: The paths of the files imported, those that could not be read being skipped
+    """
+    imported: list[str] = []
+    for file_name in sorted(os.listdir(cache_directory)):
+        match = JSON_FILE_NAME_PATTERN.match(file_name)
+        if match is None:
+            continue
+        path = os.path.join(cache_directory, file_name)
+        try:
+            with open(file=path, encoding="utf-8") as f:
+                analysis_result = json.load(f)
+        except (OSError, ValueError) as e:
+            print_red(f"Skipping {path}: {e!s}")
+            continue
+        analysis_cache.put(
+            match["app_id"],
+            match["locale"],
+            match["cache_key"],
+            analysis_result,
+            created_at=os.path.getmtime(path),
+        )
+        imported.append(path)
+    return imported
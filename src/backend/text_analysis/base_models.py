@@ -17,6 +17,10 @@ class Intention(BaseModel):
     id: str = Field(..., description="Unique ID of the intention")
     label: str = Field(..., description="Label of the intention")
     description: str = Field(..., description="Natural-language description")
+    pre_router_min_score: int | None = Field(
+        default=None,
+        description="Pre-router score from which the LLM is not called, None to always call it",
+    )
 
 
 class Feature(BaseModel):
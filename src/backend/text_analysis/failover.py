@@ -0,0 +1,128 @@
+"""Rolling health and latency scores of the llm_configs, used to route the analyses of an app along its
+failover chain (see ServerConfig.failover_chains).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+# Weight of the latest call in the rolling scores
+SCORE_SMOOTHING = 0.2
+# An llm_config whose health score is below this threshold is skipped while a healthier one is available
+HEALTHY_THRESHOLD = 0.5
+# The failures are forgotten over time, so that a skipped llm_config gets traffic again once the
+# incident is likely over: half of the missing health is recovered every HEALTH_HALF_LIFE seconds
+HEALTH_HALF_LIFE = 30.0
+
+
+class HealthScore:
+    """Rolling success rate and latency of the calls to one llm_config."""
+
+    def __init__(self, llm_config_id: str) -> None:
+        self.llm_config_id = llm_config_id
+        self.health = 1.0  # Exponentially weighted success rate, as of updated_at
+        self.latency: float | None = None  # Exponentially weighted latency of the successful calls
+        self.updated_at = time.monotonic()
+        self.successes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _get_health(self, now: float) -> float:
+        recovery = 0.5 ** ((now - self.updated_at) / HEALTH_HALF_LIFE)
+        return 1.0 - (1.0 - self.health) * recovery
+
+    def get_health(self) -> float:
+        with self._lock:
+            return self._get_health(time.monotonic())
+
+    def is_healthy(self) -> bool:
+        return self.get_health() >= HEALTHY_THRESHOLD
+
+    def _record(self, success: float) -> None:
+        now = time.monotonic()
+        self.health = (1 - SCORE_SMOOTHING) * self._get_health(now) + SCORE_SMOOTHING * success
+        self.updated_at = now
+
+    def record_success(self, seconds: float) -> None:
+        with self._lock:
+            self._record(1.0)
+            self.latency = (
+                seconds
+                if self.latency is None
+                else (1 - SCORE_SMOOTHING) * self.latency + SCORE_SMOOTHING * seconds
+            )
+            self.successes += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._record(0.0)
+            self.failures += 1
+
+    def get_state(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "llm_config_id": self.llm_config_id,
+                "health": round(self._get_health(time.monotonic()), 3),
+                "latency": round(self.latency, 3) if self.latency is not None else None,
+                "successes": self.successes,
+                "failures": self.failures,
+            }
+
+
+class HealthScores:
+    """The health scores of the llm_configs, owned by the server so that they survive reload_apps."""
+
+    def __init__(self) -> None:
+        self._health_scores: dict[str, HealthScore] = {}
+        self._lock = threading.Lock()
+
+    def get(self, llm_config_id: str) -> HealthScore:
+        with self._lock:
+            health_score = self._health_scores.get(llm_config_id)
+            if health_score is None:
+                health_score = HealthScore(llm_config_id)
+                self._health_scores[llm_config_id] = health_score
+            return health_score
+
+    def route(self, llm_config_ids: list[str], llm_config_id: str) -> list[str]:
+        """Route a request for llm_config_id along the failover chain llm_config_ids: only llm_config_id
+        and the entries after it are tried.
+
+        :return: The llm_configs in the order they should be tried: the healthy ones in the chain order,
+        then the unhealthy ones, the healthiest and fastest first
+        :raise ValueError: If llm_config_id is not in the chain
+        """
+        if llm_config_id not in llm_config_ids:
+            msg = f"{llm_config_id} is not in the failover chain {llm_config_ids}"
+            raise ValueError(msg)
+        health_scores = [
+            self.get(failover_llm_config_id)
+            for failover_llm_config_id in llm_config_ids[llm_config_ids.index(llm_config_id) :]
+        ]
+        healthy = [
+            health_score.llm_config_id
+            for health_score in health_scores
+            if health_score.is_healthy()
+        ]
+        unhealthy = sorted(
+            (
+                health_score
+                for health_score in health_scores
+                if health_score.llm_config_id not in healthy
+            ),
+            key=lambda health_score: (
+                -health_score.get_health(),
+                health_score.latency if health_score.latency is not None else 0.0,
+            ),
+        )
+        return healthy + [health_score.llm_config_id for health_score in unhealthy]
+
+    def get_states(self) -> list[dict[str, Any]]:
+        with self._lock:
+            health_scores = sorted(
+                self._health_scores.values(),
+                key=lambda health_score: health_score.llm_config_id,
+            )
+        return [health_score.get_state() for health_score in health_scores]
@@ -0,0 +1,155 @@
+"""Local repair of the JSON returned by the LLMs, so that a slightly malformed response does not cost
+a whole new analysis.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import TYPE_CHECKING, Any
+
+from pydantic import ValidationError
+
+from src.common.logging import print_blue
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+CODE_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+NUMBER_PATTERN = re.compile(r"\s*(-?\d+(?:[.,]\d+)?)")
+
+# Each fix addresses one validation error, this bounds the work on hopeless responses
+MAX_FIXES = 50
+
+
+class LlmValidationError(ValueError):
+    """The LLM response does not match the response model, even after the local repairs."""
+
+    def __init__(self, msg: str, content: str, errors: str) -> None:
+        super().__init__(msg)
+        self.content = content  # The raw LLM response
+        self.errors = errors  # The validation errors, as reported to the LLM for a repair turn
+
+
+def strip_code_fences(content: str) -> str:
+    match = CODE_FENCE_PATTERN.match(content)
+    return match.group(1) if match else content
+
+
+def remove_trailing_commas(content: str) -> str:
+    return TRAILING_COMMA_PATTERN.sub(r"\1", content)
+
+
+def coerce_value(error_type: str, value: Any) -> tuple[bool, Any]:
+    """:return: Whether the value could be coerced to the expected type, and the coerced value"""
+    if error_type == "string_type" and isinstance(value, (int, float, bool)):
+        return True, str(value)
+    if error_type in (
+        "int_type",
+        "int_parsing",
+        "int_from_float",
+        "float_type",
+        "float_parsing",
+    ):
+        match = NUMBER_PATTERN.match(str(value))
+        if match and not isinstance(value, bool):
+            number = float(match.group(1).replace(",", "."))
+            return True, round(number) if error_type.startswith("int") else number
+    if error_type == "list_type" and isinstance(value, str):
+        return True, [value]
+    return False, None
+
+
+def get_container(data: Any, loc: tuple[Any, ...]) -> Any:
+    """:return: The dict or list holding the value at loc, None if loc does not lead anywhere"""
+    container = data
+    for key in loc[:-1]:
+        try:
+            container = container[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return container if isinstance(container, (dict, list)) else None
+
+
+def fix_one_error(
+    analysis_response_model: type[BaseModel],
+    data: dict[str, Any],
+    errors: list[dict[str, Any]],
+) -> bool:
+    """Fix the first fixable validation error: coerce the value, otherwise salvage the rest of the result
+    by nulling an optional field or dropping an invalid item of a list (e.g. one scoring).
+
+    :return: False if none of the errors can be fixed
+    """
+    for error in errors:
+        loc = tuple(error["loc"])
+        if not loc:
+            continue
+
+        container = get_container(data, loc)
+        if container is not None:
+            coerced, value = coerce_value(error["type"], error.get("input"))
+            if coerced:
+                container[loc[-1]] = value
+                return True
+
+        field = analysis_response_model.model_fields.get(loc[0])
+        if field is None:
+            continue
+        if not field.is_required():
+            print_blue(f"Salvaging the LLM response: {loc[0]} dropped ({error['msg']})")
+            data[loc[0]] = None
+            return True
+        if (
+            len(loc) >= 2
+            and isinstance(loc[1], int)
+            and isinstance(data.get(loc[0]), list)
+            and loc[1] < len(data[loc[0]])
+        ):
+            print_blue(
+                f"Salvaging the LLM response: {loc[0]}[{loc[1]}] dropped ({error['msg']})",
+            )
+            del data[loc[0]][loc[1]]
+            return True
+    return False
+
+
+def validate_json(
+    analysis_response_model: type[BaseModel],
+    content: str | None,
+) -> BaseModel:
+    """Validate the LLM response, repairing it locally if needed.
+
+    :raise LlmValidationError: If the response cannot be repaired
+    """
+    if content is None:
+        msg = "The LLM response is empty or null."
+        raise ValueError(msg)
+
+    try:
+        return analysis_response_model.model_validate_json(content)
+    except ValidationError:
+        pass
+
+    cleaned = remove_trailing_commas(strip_code_fences(content.strip()))
+    try:
+        data: Any = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        msg = f"LLM returned invalid JSON format: {e!s}"
+        raise LlmValidationError(msg, content, str(e)) from e
+
+    for _ in range(MAX_FIXES):
+        try:
+            return analysis_response_model.model_validate(data)
+        except ValidationError as e:
+            if not isinstance(data, dict) or not fix_one_error(
+                analysis_response_model,
+                data,
+                e.errors(),
+            ):
+                msg = f"LLM returned invalid JSON format: {e!s}"
+                raise LlmValidationError(msg, content, str(e)) from e
+
+    msg = f"LLM returned invalid JSON format: more than {MAX_FIXES} errors"
+    raise LlmValidationError(msg, content, msg)
@@ -1,25 +1,152 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import Any, Literal
 
+import httpx
 from pydantic import BaseModel
 
-# Important: Update TextAnalyzer.__init__ when adding a new subclass
+# Important: Update LlmRegistry.build_llm when adding a new subclass
+
+# Keeps a reference on the background tasks closing async clients until they complete
+_async_close_tasks: set[asyncio.Task] = set()
 
 
 class LlmConfig(BaseModel):
     id: str
-    llm: Literal["openai", "ollama", "scaleway"]
+    # "local": intention classifier trained from examples_filename, no network (see llm_local.py)
+    llm: Literal["openai", "ollama", "scaleway", "local"]
     model: str
-    response_format_type: Literal["json_object", "pydantic_model"]
+    # "json_schema": generation constrained by the JSON schema of the response model (strict structured output)
+    response_format_type: Literal["json_object", "json_schema", "pydantic_model"]
     prompt_format: Literal["markdown", "text"]
     temperature: float
+    # "static_prefix" keeps the system prompt identical across cases (case field values are appended
+    # at its end) so that the providers' automatic prompt prefix caching can hit
+    prompt_layout: Literal["inline", "static_prefix"] = "inline"
+    # "local" llm only: CSV of labelled examples (intention id, split, text), trained on its "train" split
+    examples_filename: str | None = None
+    # Maximum number of analyses of batches in flight at the same time on this llm_config, all the apps of
+    # the server together
+    max_concurrency: int = 8
+    # Batches only: up to pack_size texts scored in a single LLM call (1 = no packing), as long as the
+    # system prompt and the texts fit in an estimated max_pack_tokens
+    pack_size: int = 1
+    max_pack_tokens: int = 8000
+
+    # HTTP connection pool and timeouts of the long-lived client held by LlmRegistry
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+
+    # Retry policy of the analyses: exponential backoff with jitter between the attempts (seconds),
+    # within an overall deadline
+    max_attempts: int = 3
+    retry_initial_delay: float = 1.0
+    retry_max_delay: float = 8.0
+    retry_deadline: float = 60.0
+
+    # Client-side rate limiting of the calls to this llm_config (None = no limit): the calls beyond the
+    # budget wait in a FIFO queue of at most max_queue_size calls, the next ones are refused
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None  # Estimated prompt tokens
+    max_queue_size: int = 100
+
+    # Hedged requests (async analyses only): when a call has not returned after the hedge_percentile
+    # latency of the recent calls (hedge_delay seconds until enough calls are known), an identical call
+    # is fired on hedge_llm_config_id (default: this llm_config) and the first valid result wins, labelled,
+    # accounted and cached as the one of the llm_config that served it. The calls of the multi-call
+    # analysis modes are only hedged on this llm_config
+    hedge_percentile: float | None = None
+    hedge_delay: float = 10.0
+    hedge_llm_config_id: str | None = None
+
+
+class LlmConfigurationError(ValueError):
+    """An llm_config that cannot work (missing credentials, unsupported option): retrying is pointless."""
+
+
+CHARS_PER_TOKEN = 4  # Rough average for the supported languages
+
+
+def estimate_tokens(text: str) -> int:
+    """:return: A rough estimate of the number of tokens of a text, without calling any tokenizer"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class LlmUsage(BaseModel):
+    """Token usage reported by the provider for one call (None when not reported)."""
+
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    cached_tokens: int | None = None
+    # Ollama only, in seconds
+    prompt_eval_duration: float | None = None
+    eval_duration: float | None = None
+    # Time spent waiting for the client-side rate limiter before the call(s), in seconds
+    queue_wait: float | None = None
+    # Hedged requests: second calls fired, and those that returned first
+    hedges_fired: int | None = None
+    hedges_won: int | None = None
+
+    @staticmethod
+    def from_openai_completion(completion: Any) -> LlmUsage:
+        """:return: The usage of an OpenAI-compatible chat completion"""
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return LlmUsage()
+        prompt_tokens_details = getattr(usage, "prompt_tokens_details", None)
+        return LlmUsage(
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=getattr(prompt_tokens_details, "cached_tokens", None),
+        )
+
+    @staticmethod
+    def total(usages: list[LlmUsage]) -> LlmUsage:
+        """:return: The usage of several calls, e.g. the calls of a multi-call analysis"""
+
+        def add(values: list[Any]) -> Any:
+            values = [value for value in values if value is not None]
+            return sum(values) if values else None
+
+        return LlmUsage(
+            **{
+                name: add([getattr(usage, name) for usage in usages])
+                for name in LlmUsage.model_fields
+            },
+        )
+
+    def split(self, count: int) -> list[LlmUsage]:
+        """:return: count usages adding up to this one, e.g. to share a packed call between its texts"""
+
+        def share(name: str, value: Any, i: int) -> Any:
+            if value is None:
+                return None
+            if name in ("queue_wait", "hedges_fired", "hedges_won"):
+                return value  # Every text of the pack waited for the call, hedged or not
+            if isinstance(value, int):
+                return value // count + (1 if i < value % count else 0)
+            return value / count
+
+        return [
+            LlmUsage(
+                **{
+                    name: share(name, value, i)
+                    for name, value in self.model_dump().items()
+                },
+            )
+            for i in range(count)
+        ]
 
 
 class Llm(ABC):
     def __init__(self, llm_config: LlmConfig) -> None:
         self.client = None  # To be defined in the subclass
+        self.async_client = None  # To be defined in the subclass
         # self.text_analysis_config = text_analysis_config
         self.llm_config: LlmConfig = llm_config
 
@@ -27,13 +154,47 @@ class Llm(ABC):
     # def build_client(self, llm_config: LlmConfig) -> None:
     #     pass
 
+    def http_client_options(self) -> dict[str, Any]:
+        """:return: The httpx pool limits and timeouts configured for this llm_config"""
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.llm_config.max_connections,
+                max_keepalive_connections=self.llm_config.max_keepalive_connections,
+                keepalive_expiry=self.llm_config.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(
+                self.llm_config.timeout,
+                connect=self.llm_config.connect_timeout,
+            ),
+        }
+
+    def close(self) -> None:
+        """Release the pooled connections of the clients."""
+        if self.client is not None:
+            self.close_client()
+
+        if self.async_client is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # No event loop to close on: connections are dropped with the client
+            task = loop.create_task(self.aclose_async_client())
+            _async_close_tasks.add(task)
+            task.add_done_callback(_async_close_tasks.discard)
+
+    def close_client(self) -> None:
+        self.client.close()
+
+    async def aclose_async_client(self) -> None:
+        await self.async_client.close()
+
     @abstractmethod
     def call_llm_with_json_schema(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
+    ) -> tuple[BaseModel, LlmUsage]:
         pass
 
     @abstractmethod
@@ -42,5 +203,23 @@ class Llm(ABC):
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
+    ) -> tuple[BaseModel, LlmUsage]:
+        pass
+
+    @abstractmethod
+    async def call_llm_with_json_schema_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        pass
+
+    @abstractmethod
+    async def call_llm_with_pydantic_model_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
         pass
@@ -0,0 +1,221 @@
+"""Local intention classifier served through the Llm interface: character n-gram TF-IDF vectors compared
+to the centroid of the labelled examples of each intention, in NumPy.
+
+No network and no GPU: the scoring of a text takes a few milliseconds on a CPU. Only the intentions are
+scored, the case fields are left empty.
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from src.backend.text_analysis.base_models import FIELD_NAME_SCORINGS
+from src.backend.text_analysis.llm import (
+    Llm,
+    LlmConfig,
+    LlmConfigurationError,
+    LlmUsage,
+)
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+NGRAM_SIZES = (2, 3, 4, 5)
+# Sharpness of the softmax turning the cosine similarities into scores between 0 and 10
+SOFTMAX_TEMPERATURE = 0.05
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """:return: The text lowercased, without accents and with single spaces"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def extract_ngrams(text: str) -> Counter[str]:
+    """:return: The character n-grams of each word of the text, with the spaces around the words"""
+    ngrams: Counter[str] = Counter()
+    for word in normalize_text(text).split(" "):
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                ngrams[padded[i : i + n]] += 1
+    return ngrams
+
+
+def load_examples(filename: str, split: str = "train") -> list[tuple[str, str]]:
+    """:return: The (intention_id, text) examples of the split, from a CSV with intention id, split and
+    text columns (e.g. misc/non_llm/intentions_examples.csv)
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    return [
+        (row[0], row[2])
+        for row in rows[1:]
+        if len(row) >= 3 and row[1].strip() == split and row[2].strip()
+    ]
+
+
+class IntentClassifier:
+    """Nearest centroid classifier on character n-gram TF-IDF vectors."""
+
+    def __init__(self, examples: list[tuple[str, str]]) -> None:
+        if not examples:
+            msg = "No training examples for the local intention classifier"
+            raise LlmConfigurationError(msg)
+
+        documents = [extract_ngrams(text) for _intention_id, text in examples]
+        document_frequencies: Counter[str] = Counter()
+        for ngrams in documents:
+            document_frequencies.update(ngrams.keys())
+
+        self.vocabulary: dict[str, int] = {
+            ngram: index for index, ngram in enumerate(sorted(document_frequencies))
+        }
+        self.idf = np.array(
+            [
+                math.log((1 + len(documents)) / (1 + document_frequencies[ngram])) + 1
+                for ngram in sorted(document_frequencies)
+            ],
+            dtype=np.float32,
+        )
+
+        self.intention_ids: list[str] = sorted(
+            {intention_id for intention_id, _text in examples},
+        )
+        intention_indexes = {
+            intention_id: index for index, intention_id in enumerate(self.intention_ids)
+        }
+        centroids = np.zeros(
+            (len(self.intention_ids), len(self.vocabulary)),
+            dtype=np.float32,
+        )
+        for (intention_id, _text), ngrams in zip(examples, documents):
+            indexes, weights = self.vectorize(ngrams)
+            centroids[intention_indexes[intention_id], indexes] += weights
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.maximum(norms, 1e-12)
+
+    def vectorize(self, ngrams: Counter[str]) -> tuple[np.ndarray, np.ndarray]:
+        """:return: The sparse L2-normalized TF-IDF vector of the n-grams: indexes and weights"""
+        known = [
+            (self.vocabulary[ngram], count)
+            for ngram, count in ngrams.items()
+            if ngram in self.vocabulary
+        ]
+        if not known:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        indexes = np.array([index for index, _count in known], dtype=np.int64)
+        counts = np.array([count for _index, count in known], dtype=np.float32)
+        weights = (1 + np.log(counts)) * self.idf[indexes]
+        return indexes, weights / np.linalg.norm(weights)
+
+    def similarities(self, text: str) -> np.ndarray:
+        """:return: The cosine similarity of the text with each intention, in the order of intention_ids"""
+        indexes, weights = self.vectorize(extract_ngrams(text))
+        return self.centroids[:, indexes] @ weights
+
+    def score(self, text: str) -> list[tuple[str, int, float]]:
+        """:return: (intention_id, score between 0 and 10, similarity) for each intention"""
+        similarities = self.similarities(text)
+        exponentials = np.exp((similarities - similarities.max()) / SOFTMAX_TEMPERATURE)
+        probabilities = exponentials / exponentials.sum()
+        return [
+            (intention_id, round(10 * float(probability)), float(similarity))
+            for intention_id, probability, similarity in zip(
+                self.intention_ids,
+                probabilities,
+                similarities,
+            )
+        ]
+
+    def predict(self, text: str) -> str:
+        return self.intention_ids[int(np.argmax(self.similarities(text)))]
+
+
+class LlmLocal(Llm):
+    """The "local" llm: the classifier is trained from llm_config.examples_filename when the instance
+    is built, on the first analysis (see LlmRegistry.get()), unless an already trained one is given
+    (see self_training.py).
+    """
+
+    def __init__(
+        self,
+        llm_config: LlmConfig,
+        classifier: IntentClassifier | None = None,
+    ) -> None:
+        super().__init__(llm_config)
+        if classifier is not None:
+            self.classifier = classifier
+            return
+        if not llm_config.examples_filename:
+            msg = f"The local llm_config {llm_config.id} has no examples_filename"
+            raise LlmConfigurationError(msg)
+        try:
+            examples = load_examples(llm_config.examples_filename)
+        except OSError as e:
+            msg = f"Cannot read the examples of {llm_config.id}: {e!s}"
+            raise LlmConfigurationError(msg) from e
+        self.classifier = IntentClassifier(examples)
+
+    def analyze(
+        self,
+        analysis_response_model: type[BaseModel],
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        data = {}
+        if FIELD_NAME_SCORINGS in analysis_response_model.model_fields:
+            data[FIELD_NAME_SCORINGS] = [
+                {
+                    "intention_id": intention_id,
+                    "score": score,
+                    "justification": f"Similarity {similarity:.2f}",
+                }
+                for intention_id, score, similarity in self.classifier.score(text)
+            ]
+        return analysis_response_model.model_validate(data), LlmUsage()
+
+    # The system prompt is ignored: the intentions are those of the examples
+
+    def call_llm_with_json_schema(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        return self.analyze(analysis_response_model, text)
+
+    def call_llm_with_pydantic_model(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        return self.analyze(analysis_response_model, text)
+
+    # A few milliseconds of CPU: not worth a thread
+
+    async def call_llm_with_json_schema_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        return self.analyze(analysis_response_model, text)
+
+    async def call_llm_with_pydantic_model_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        return self.analyze(analysis_response_model, text)
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
+import httpx
 import ollama
 
-from src.backend.text_analysis.llm import Llm, LlmConfig
+from src.backend.text_analysis.json_repair import validate_json
+from src.backend.text_analysis.llm import (
+    Llm,
+    LlmConfig,
+    LlmConfigurationError,
+    LlmUsage,
+)
 
 if TYPE_CHECKING:
     from pydantic import BaseModel
@@ -16,40 +23,114 @@ class LlmOllama(Llm):
         self.build_client()
 
     def build_client(self) -> None:
-        self.client = None
+        # Host is read from OLLAMA_HOST, as with the module-level ollama.chat()
+        self.client = ollama.Client(**self.http_client_options())
+        self.async_client = ollama.AsyncClient(**self.http_client_options())
 
-    def call_llm_with_json_schema(
+    # The ollama clients neither expose close() nor accept an httpx client built by the caller: their httpx
+    # client is the private _client attribute. It is looked up defensively, so that an SDK upgrade renaming
+    # it leaves the pool to the garbage collector instead of failing the close of the registry
+
+    def close_client(self) -> None:
+        http_client = getattr(self.client, "_client", None)
+        if isinstance(http_client, httpx.Client):
+            http_client.close()
+
+    async def aclose_async_client(self) -> None:
+        http_client = getattr(self.async_client, "_client", None)
+        if isinstance(http_client, httpx.AsyncClient):
+            await http_client.aclose()
+
+    def json_schema_request(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
-        # Using Ollama to generate a completion in JSON format
-        response = ollama.chat(
-            model=self.llm_config.model,
-            messages=[
+    ) -> dict[str, Any]:
+        # Using Ollama to generate a completion in JSON format, constrained by the schema with "json_schema"
+        return {
+            "model": self.llm_config.model,
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": text},
             ],
-            options={"temperature": self.llm_config.temperature, "format": "json"},
-        )
+            "format": (
+                analysis_response_model.model_json_schema()
+                if self.llm_config.response_format_type == "json_schema"
+                else "json"
+            ),
+            "options": {"temperature": self.llm_config.temperature},
+        }
+
+    @staticmethod
+    def validate_content(
+        analysis_response_model: type[BaseModel],
+        response: Any,
+    ) -> BaseModel:
         content = response["message"]["content"]
         if content is None:
             msg = "The LLM response is empty or null."
             raise ValueError(msg)
 
-        # Remove first and last lines if first line contains "```json" and last line contains "```"
-        if content.startswith("```json") and content.endswith("```"):
-            content = content[8:-3].strip()
+        # Code fences around the JSON are removed by the local repairs
+        return validate_json(analysis_response_model, content)
 
-        return analysis_response_model.model_validate_json(content)
+    @staticmethod
+    def usage(response: Any) -> LlmUsage:
+        def seconds(nanoseconds: int | None) -> float | None:
+            return nanoseconds / 1_000_000_000 if nanoseconds is not None else None
+
+        return LlmUsage(
+            prompt_tokens=response.get("prompt_eval_count"),
+            completion_tokens=response.get("eval_count"),
+            prompt_eval_duration=seconds(response.get("prompt_eval_duration")),
+            eval_duration=seconds(response.get("eval_duration")),
+        )
+
+    def call_llm_with_json_schema(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        response = self.client.chat(
+            **self.json_schema_request(analysis_response_model, system_prompt, text),
+        )
+        return self.validate_content(analysis_response_model, response), self.usage(
+            response,
+        )
 
     def call_llm_with_pydantic_model(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
+    ) -> tuple[BaseModel, LlmUsage]:
         # Ollama doesn't manage output in Pydantic format
         msg = "Ollama doesn't manage structured output in Pydantic format"
-        raise ValueError(msg)
+        raise LlmConfigurationError(msg)
+
+    async def call_llm_with_json_schema_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        response = await self.async_client.chat(
+            **self.json_schema_request(analysis_response_model, system_prompt, text),
+        )
+        return self.validate_content(analysis_response_model, response), self.usage(
+            response,
+        )
+
+    async def call_llm_with_pydantic_model_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        return self.call_llm_with_pydantic_model(
+            analysis_response_model,
+            system_prompt,
+            text,
+        )
@@ -5,13 +5,58 @@ from typing import TYPE_CHECKING, Any
 
 import openai
 
-from src.backend.text_analysis.llm import Llm, LlmConfig
+from src.backend.text_analysis.json_repair import validate_json
+from src.backend.text_analysis.llm import (
+    Llm,
+    LlmConfig,
+    LlmConfigurationError,
+    LlmUsage,
+)
 
 if TYPE_CHECKING:
     from openai.types.chat.chat_completion import ChatCompletion
     from pydantic import BaseModel
 
 
+def to_strict_json_schema(schema: Any) -> Any:
+    """Make a JSON schema usable by strict structured outputs: every object lists all its properties as
+    required and forbids the other ones, and no property defaults to None.
+
+    :return: The schema, modified in place
+    """
+    if isinstance(schema, list):
+        for sub_schema in schema:
+            to_strict_json_schema(sub_schema)
+    elif isinstance(schema, dict):
+        if schema.get("type") == "object":
+            properties = schema.get("properties", {})
+            schema["required"] = list(properties)
+            schema["additionalProperties"] = False
+        if "default" in schema and schema["default"] is None:
+            del schema["default"]
+        for key in ("properties", "$defs"):
+            for sub_schema in schema.get(key, {}).values():
+                to_strict_json_schema(sub_schema)
+        for key in ("items", "anyOf", "allOf", "oneOf"):
+            if key in schema:
+                to_strict_json_schema(schema[key])
+    return schema
+
+
+def json_schema_response_format(
+    analysis_response_model: type[BaseModel],
+) -> dict[str, Any]:
+    """:return: The response_format of a strict json_schema structured output, for OpenAI-compatible APIs"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "schema": to_strict_json_schema(analysis_response_model.model_json_schema()),
+            "name": analysis_response_model.__name__,
+            "strict": True,
+        },
+    }
+
+
 class LlmOpenAI(Llm):
     def __init__(self, llm_config: LlmConfig) -> None:
         super().__init__(llm_config)
@@ -20,48 +65,98 @@ class LlmOpenAI(Llm):
     def build_client(self) -> None:
         if "OPENAI_API_KEY" not in os.environ:
             msg = "OPENAI_API_KEY environment variable is not set"
-            raise ValueError(msg)
+            raise LlmConfigurationError(msg)
 
+        http_client_options = self.http_client_options()
         self.client = openai.OpenAI(
             api_key=os.environ.get("OPENAI_API_KEY"),
             base_url="https://api.openai.com/v1",
+            timeout=http_client_options["timeout"],
+            # The retry policy is the only retry layer: the retries of the SDK would escape its deadline,
+            # its circuit breaker and the rate limiter
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(**http_client_options),
+        )
+        self.async_client = openai.AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url="https://api.openai.com/v1",
+            timeout=http_client_options["timeout"],
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(**http_client_options),
         )
 
-    def call_llm_with_json_schema(
+    def json_schema_request(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
-        completion: ChatCompletion = self.client.chat.completions.create(
-            # model=self.text_analysis_config.model,
-            model=self.llm_config.model,
-            response_format={"type": "json_object"},
-            # temperature=self.text_analysis_config.temperature,
-            temperature=self.llm_config.temperature,
-            messages=[
+    ) -> dict[str, Any]:
+        return {
+            # "model": self.text_analysis_config.model,
+            "model": self.llm_config.model,
+            "response_format": (
+                json_schema_response_format(analysis_response_model)
+                if self.llm_config.response_format_type == "json_schema"
+                else {"type": "json_object"}
+            ),
+            # "temperature": self.text_analysis_config.temperature,
+            "temperature": self.llm_config.temperature,
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": text},
             ],
-        )
+        }
 
+    def pydantic_model_request(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> dict[str, Any]:
+        return {
+            # "model": self.text_analysis_config.model,
+            "model": self.llm_config.model,
+            "response_format": analysis_response_model,
+            # "temperature": self.text_analysis_config.temperature,
+            "temperature": float(self.llm_config.temperature),
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text},
+            ],
+        }
+
+    @staticmethod
+    def validate_content(
+        analysis_response_model: type[BaseModel],
+        completion: ChatCompletion | Any,
+    ) -> BaseModel:
         content: str | None = completion.choices[0].message.content
 
         if content is None:
             msg = "The LLM response is empty or null."
             raise ValueError(msg)
-        # Ensure that content is a str, then encode it as bytes for model_validate_json
-        if isinstance(content, str):
-            return analysis_response_model.model_validate_json(content.encode("utf-8"))
-        else:
-            return analysis_response_model.model_validate_json(content)
+        return validate_json(analysis_response_model, content)
+
+    def call_llm_with_json_schema(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        completion: ChatCompletion = self.client.chat.completions.create(
+            **self.json_schema_request(analysis_response_model, system_prompt, text),
+        )
+        return (
+            self.validate_content(analysis_response_model, completion),
+            LlmUsage.from_openai_completion(completion),
+        )
 
     def call_llm_with_pydantic_model(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
+    ) -> tuple[BaseModel, LlmUsage]:
 
         # print("SYSTEM PROMPT:")
         # print(system_prompt)
@@ -70,24 +165,37 @@ class LlmOpenAI(Llm):
         # print("DONE")
 
         completion: Any = self.client.chat.completions.parse(
-            # model=self.text_analysis_config.model,
-            model=self.llm_config.model,
-            response_format=analysis_response_model,
-            # temperature=self.text_analysis_config.temperature,
-            temperature=float(self.llm_config.temperature),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text},
-            ],
+            **self.pydantic_model_request(analysis_response_model, system_prompt, text),
+        )
+        return (
+            self.validate_content(analysis_response_model, completion),
+            LlmUsage.from_openai_completion(completion),
         )
 
-        content = completion.choices[0].message.content
+    async def call_llm_with_json_schema_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        completion: ChatCompletion = await self.async_client.chat.completions.create(
+            **self.json_schema_request(analysis_response_model, system_prompt, text),
+        )
+        return (
+            self.validate_content(analysis_response_model, completion),
+            LlmUsage.from_openai_completion(completion),
+        )
 
-        if content is None:
-            msg = "The LLM response is empty or null."
-            raise ValueError(msg)
-        # Ensure that content is a str, then encode it as bytes for model_validate_json
-        if isinstance(content, str):
-            return analysis_response_model.model_validate_json(content.encode("utf-8"))
-        else:
-            return analysis_response_model.model_validate_json(content)
+    async def call_llm_with_pydantic_model_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        completion: Any = await self.async_client.chat.completions.parse(
+            **self.pydantic_model_request(analysis_response_model, system_prompt, text),
+        )
+        return (
+            self.validate_content(analysis_response_model, completion),
+            LlmUsage.from_openai_completion(completion),
+        )
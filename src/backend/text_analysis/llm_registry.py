@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+
+from src.backend.text_analysis.llm import Llm, LlmConfig, LlmConfigurationError
+from src.backend.text_analysis.llm_local import LlmLocal
+from src.backend.text_analysis.llm_ollama import LlmOllama
+from src.backend.text_analysis.llm_openai import LlmOpenAI
+from src.backend.text_analysis.llm_scaleway import LlmScaleway
+from src.backend.text_analysis.rate_limiter import LlmLimiters, RateLimiter
+
+# Hedged requests: latencies kept per llm_config, and how many are needed before trusting their percentile
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+def build_llm(llm_config: LlmConfig) -> Llm:
+    if llm_config.llm == "openai":
+        return LlmOpenAI(llm_config)
+    if llm_config.llm == "ollama":
+        return LlmOllama(llm_config)
+    if llm_config.llm == "scaleway":
+        return LlmScaleway(llm_config)
+    if llm_config.llm == "local":
+        return LlmLocal(llm_config)
+    msg = f"Unsupported LLM: {llm_config.llm}"
+    raise LlmConfigurationError(msg)
+
+
+class LlmRegistry:
+    """Long-lived Llm instances, one per llm_config id.
+
+    The underlying HTTP clients keep their connections alive between analyses, so the
+    TLS handshake and client setup are paid once per llm_config rather than once per call.
+    Instances are built on first use: a provider whose credentials are missing only fails
+    the analyses that target it, not the loading of the app.
+    """
+
+    def __init__(
+        self,
+        llm_configs: dict[str, LlmConfig] | None = None,
+        llm_limiters: LlmLimiters | None = None,
+    ) -> None:
+        # All the llm_configs of the app, to find the alternate llm_config of hedged requests
+        self.llm_configs: dict[str, LlmConfig] = llm_configs or {}
+        # Semaphores and rate limiters, shared by the registries of all the apps of the server when provided
+        self.llm_limiters: LlmLimiters = llm_limiters if llm_limiters is not None else LlmLimiters()
+        self._llms: dict[str, Llm] = {}
+        self._latencies: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, llm_config: LlmConfig) -> Llm:
+        llm: Llm | None = self._llms.get(llm_config.id)
+        if llm is not None and llm.llm_config == llm_config:
+            return llm
+
+        with self._lock:
+            llm = self._llms.get(llm_config.id)
+            if llm is None or llm.llm_config != llm_config:
+                if llm is not None:
+                    llm.close()
+                llm = build_llm(llm_config)
+                self._llms[llm_config.id] = llm
+            return llm
+
+    def get_semaphore(self, llm_config: LlmConfig) -> asyncio.Semaphore:
+        """:return: The semaphore bounding the concurrent calls to this llm_config, shared by all the batches"""
+        return self.llm_limiters.get_semaphore(llm_config)
+
+    def get_rate_limiter(self, llm_config: LlmConfig) -> RateLimiter | None:
+        """:return: The rate limiter shared by all the calls to this llm_config, None if it has no limits"""
+        return self.llm_limiters.get_rate_limiter(llm_config)
+
+    def get_hedge_llm_config(self, llm_config: LlmConfig) -> LlmConfig:
+        """:return: The llm_config the hedged calls of llm_config are sent to"""
+        if llm_config.hedge_llm_config_id is None:
+            return llm_config
+        hedge_llm_config = self.llm_configs.get(llm_config.hedge_llm_config_id)
+        if hedge_llm_config is None:
+            msg = f"Unknown hedge_llm_config_id of {llm_config.id}: {llm_config.hedge_llm_config_id}"
+            raise LlmConfigurationError(msg)
+        return hedge_llm_config
+
+    def record_latency(self, llm_config: LlmConfig, seconds: float) -> None:
+        with self._lock:
+            latencies = self._latencies.get(llm_config.id)
+            if latencies is None:
+                latencies = deque(maxlen=LATENCY_WINDOW)
+                self._latencies[llm_config.id] = latencies
+            latencies.append(seconds)
+
+    def get_hedge_delay(self, llm_config: LlmConfig) -> float:
+        """:return: The delay after which a call to llm_config is hedged: the hedge_percentile of the
+        recent latencies, or hedge_delay while too few calls are known
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(llm_config.id, ()))
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return llm_config.hedge_delay
+        index = int(len(latencies) * llm_config.hedge_percentile / 100)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def close(self) -> None:
+        with self._lock:
+            for llm in self._llms.values():
+                llm.close()
+            self._llms.clear()
@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 import os
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from openai import OpenAI
-from pydantic_core import ValidationError as PydanticCoreValidationError
-
-from src.backend.text_analysis.llm import Llm, LlmConfig
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from src.backend.text_analysis.json_repair import validate_json
+from src.backend.text_analysis.llm import (
+    Llm,
+    LlmConfig,
+    LlmConfigurationError,
+    LlmUsage,
+)
+from src.backend.text_analysis.llm_openai import json_schema_response_format
 
 if TYPE_CHECKING:
     from pydantic import BaseModel
@@ -21,54 +26,112 @@ class LlmScaleway(Llm):
         project_id = os.environ.get("SCW_PROJECT_ID")
         if not project_id:
             msg = "SCW_PROJECT_ID environment variable is not set"
-            raise ValueError(msg)
+            raise LlmConfigurationError(msg)
 
         api_key = os.environ.get("SCW_SECRET_KEY")
         if not api_key:
             msg = "SCW_SECRET_KEY environment variable is not set"
-            raise ValueError(msg)
+            raise LlmConfigurationError(msg)
 
+        http_client_options = self.http_client_options()
         self.client = OpenAI(
             base_url=f"https://api.scaleway.ai/{project_id}/v1",
             api_key=api_key,
+            timeout=http_client_options["timeout"],
+            # The retry policy is the only retry layer: the retries of the SDK would escape its deadline,
+            # its circuit breaker and the rate limiter
+            max_retries=0,
+            http_client=DefaultHttpxClient(**http_client_options),
+        )
+        self.async_client = AsyncOpenAI(
+            base_url=f"https://api.scaleway.ai/{project_id}/v1",
+            api_key=api_key,
+            timeout=http_client_options["timeout"],
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(**http_client_options),
         )
 
-    def call_llm_with_json_schema(
+    def json_schema_request(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
+    ) -> dict[str, Any]:
         # Using OpenAI API with Scaleway to generate a completion in JSON format
-        response = self.client.chat.completions.parse(
-            model=self.llm_config.model,
-            response_format={"type": "json_object"},
-            messages=[
+        return {
+            "model": self.llm_config.model,
+            "response_format": (
+                json_schema_response_format(analysis_response_model)
+                if self.llm_config.response_format_type == "json_schema"
+                else {"type": "json_object"}
+            ),
+            "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": text},
             ],
-            temperature=self.llm_config.temperature,
-            top_p=0.9,
-            presence_penalty=0,
-        )
+            "temperature": self.llm_config.temperature,
+            "top_p": 0.9,
+            "presence_penalty": 0,
+        }
 
+    @staticmethod
+    def validate_content(
+        analysis_response_model: type[BaseModel],
+        response: Any,
+    ) -> BaseModel:
         content = response.choices[0].message.content
-        try:
-            return analysis_response_model.model_validate_json(content)
-        except (PydanticCoreValidationError, ValueError) as e:
-            # Si la validation échoue, c'est que le LLM a retourné un format incorrect
-            # On propage l'erreur pour qu'elle soit gérée par le mécanisme de retry/fallback
-            msg = f"LLM returned invalid JSON format: {e!s}"
-            raise ValueError(msg) from e
+        # Si la validation échoue malgré les réparations locales, LlmValidationError (une ValueError)
+        # est propagée pour une réparation par le LLM, puis le mécanisme de retry/fallback
+        return validate_json(analysis_response_model, content)
+
+    def call_llm_with_json_schema(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        response = self.client.chat.completions.parse(
+            **self.json_schema_request(analysis_response_model, system_prompt, text),
+        )
+        return (
+            self.validate_content(analysis_response_model, response),
+            LlmUsage.from_openai_completion(response),
+        )
 
     def call_llm_with_pydantic_model(
         self,
         analysis_response_model: type[BaseModel],
         system_prompt: str,
         text: str,
-    ) -> BaseModel:
+    ) -> tuple[BaseModel, LlmUsage]:
         # Scaleway's API doesn't manage output in Pydantic format
         msg = "Scaleway's API doesn't manage structured output in Pydantic format"
-        raise ValueError(
+        raise LlmConfigurationError(
             msg,
         )
+
+    async def call_llm_with_json_schema_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        response = await self.async_client.chat.completions.parse(
+            **self.json_schema_request(analysis_response_model, system_prompt, text),
+        )
+        return (
+            self.validate_content(analysis_response_model, response),
+            LlmUsage.from_openai_completion(response),
+        )
+
+    async def call_llm_with_pydantic_model_async(
+        self,
+        analysis_response_model: type[BaseModel],
+        system_prompt: str,
+        text: str,
+    ) -> tuple[BaseModel, LlmUsage]:
+        return self.call_llm_with_pydantic_model(
+            analysis_response_model,
+            system_prompt,
+            text,
+        )
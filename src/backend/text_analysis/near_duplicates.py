@@ -0,0 +1,129 @@
+"""Near-duplicate matching of the texts to analyze, for the cache lookups.
+
+Citizens often send the same request again with trivial differences: greeting, signature, quoted previous
+reply. Two texts are compared on their sets of character shingles: the share of equal values in their
+MinHash signatures estimates the Jaccard similarity of these sets, and the LSH index only compares a text
+with the ones sharing at least one band of their signatures.
+"""
+
+from __future__ import annotations
+
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from src.backend.text_analysis.analysis_cache import normalize_text_for_key
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: two texts 90% similar share a band with near certainty, 50% similar ones seldom
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+# The hash functions h(x) = (a * x + b) mod p, the same in every process; a and b below 2**31 so that
+# a * x + b stays within 64 bits for the 32-bit shingle hashes
+_random_state = np.random.RandomState(20250101)
+_A = _random_state.randint(1, 1 << 31, NUM_PERMUTATIONS).astype(np.uint64)
+_B = _random_state.randint(0, 1 << 31, NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def get_shingles(text: str) -> set[str]:
+    """:return: The character shingles of the normalized text, without its quoted lines (previous reply)"""
+    lines = [line for line in text.splitlines() if not line.lstrip().startswith(">")]
+    normalized = normalize_text_for_key("\n".join(lines)) or normalize_text_for_key(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {
+        normalized[i : i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)
+    }
+
+
+def get_signature(text: str) -> np.ndarray:
+    hashes = np.array(
+        [zlib.crc32(shingle.encode()) for shingle in get_shingles(text)],
+        dtype=np.uint64,
+    )
+    return ((hashes[:, np.newaxis] * _A + _B) % _MERSENNE_PRIME).min(axis=0)
+
+
+def get_similarity(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    """:return: The estimated Jaccard similarity of the shingles of the two texts"""
+    return float(np.mean(signature1 == signature2))
+
+
+class NearDuplicateIndex:
+    """LSH index of the signatures of the texts analyzed, by cache key.
+
+    The texts are only compared within the same context key (see TextAnalyzer.get_cache_context()): the
+    same prompt, case field values and llm_config. The index holds no result: the cache is looked up with
+    the cache keys found, the texts whose result was not cached being skipped there. Beyond max_entries,
+    the oldest texts are forgotten.
+    """
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        # cache_key => signature, bucket keys
+        self._entries: OrderedDict[str, tuple[np.ndarray, list[tuple[str, int, bytes]]]] = (
+            OrderedDict()
+        )
+        # (context_key, band, band of the signature) => cache keys
+        self._buckets: dict[tuple[str, int, bytes], set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_bucket_keys(context_key: str, signature: np.ndarray) -> list[tuple[str, int, bytes]]:
+        return [
+            (context_key, band, signature[band * ROWS : (band + 1) * ROWS].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def _remove(self, cache_key: str) -> None:
+        _signature, bucket_keys = self._entries.pop(cache_key)
+        for bucket_key in bucket_keys:
+            bucket = self._buckets[bucket_key]
+            bucket.discard(cache_key)
+            if not bucket:
+                del self._buckets[bucket_key]
+
+    def add(self, context_key: str, cache_key: str, signature: np.ndarray) -> None:
+        bucket_keys = self.get_bucket_keys(context_key, signature)
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = (signature, bucket_keys)
+            for bucket_key in bucket_keys:
+                self._buckets.setdefault(bucket_key, set()).add(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def find(
+        self,
+        context_key: str,
+        signature: np.ndarray,
+        threshold: float,
+    ) -> list[tuple[float, str]]:
+        """:return: The similarity and cache key of the indexed texts at least threshold similar, the most
+        similar first
+        """
+        with self._lock:
+            candidates: set[str] = set()
+            for bucket_key in self.get_bucket_keys(context_key, signature):
+                candidates.update(self._buckets.get(bucket_key, ()))
+            similarities = [
+                (get_similarity(signature, self._entries[cache_key][0]), cache_key)
+                for cache_key in candidates
+            ]
+        return sorted(
+            (
+                (similarity, cache_key)
+                for similarity, cache_key in similarities
+                if similarity >= threshold
+            ),
+            reverse=True,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,157 @@
+"""Client-side rate limiting of the LLM calls, so that a batch stays within the requests per minute and
+tokens per minute allowed by the provider instead of collecting 429s.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.backend.text_analysis.llm import LlmConfig
+
+
+class RateLimitQueueFullError(RuntimeError):
+    """Too many calls are already waiting for the rate limiter: the call is refused rather than queued."""
+
+
+class TokenBucket:
+    """Holds up to capacity units, refilled continuously at capacity per minute.
+
+    A reservation may take the bucket below zero: the caller then waits until the refill pays the debt
+    back, and the next callers wait behind it.
+    """
+
+    def __init__(self, capacity: float) -> None:
+        self.capacity = capacity
+        self.refill_rate = capacity / 60.0  # Per second
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """:return: The delay in seconds before the reserved amount is actually available"""
+        self.level = min(
+            self.capacity,
+            self.level + max(0.0, now - self.updated_at) * self.refill_rate,
+        )
+        self.updated_at = max(self.updated_at, now)
+        self.level -= amount
+        return max(0.0, -self.level / self.refill_rate)
+
+
+class RateLimiter:
+    """Token buckets budgeting the requests and the estimated tokens of one llm_config, with a bounded
+    FIFO wait queue in front of them.
+
+    Each call reserves its share of both buckets on arrival, so the calls leave the queue in arrival
+    order, whether they wait in a thread (analyze) or in the event loop (analyze_async, batches).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None,
+        tokens_per_minute: int | None,
+        max_queue_size: int,
+    ) -> None:
+        self.requests_bucket = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_queue_size = max_queue_size
+        self.queue_size = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            if self.queue_size >= self.max_queue_size:
+                msg = f"Rate limiter queue full ({self.max_queue_size} calls waiting)"
+                raise RateLimitQueueFullError(msg)
+
+            now = time.monotonic()
+            delay = 0.0
+            if self.requests_bucket is not None:
+                delay = max(delay, self.requests_bucket.reserve(1, now))
+            if self.tokens_bucket is not None:
+                # A call larger than the whole budget waits for a full bucket, not forever
+                amount = min(tokens, self.tokens_bucket.capacity)
+                delay = max(delay, self.tokens_bucket.reserve(amount, now))
+            if delay > 0:
+                self.queue_size += 1
+            return delay
+
+    def _leave_queue(self) -> None:
+        with self._lock:
+            self.queue_size -= 1
+
+    def acquire(self, tokens: int) -> float:
+        """Wait until the call fits in the budget.
+
+        :return: The time spent waiting in the queue, in seconds
+        :raise RateLimitQueueFullError: If max_queue_size calls are already waiting
+        """
+        delay = self._reserve(tokens)
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self._leave_queue()
+        return delay
+
+    async def acquire_async(self, tokens: int) -> float:
+        """Same as acquire() without blocking the event loop."""
+        delay = self._reserve(tokens)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._leave_queue()
+        return delay
+
+
+class LlmLimiters:
+    """The concurrency semaphores and the rate limiters of the llm_configs, by llm_config id.
+
+    Owned by the server and shared by the registries of all the apps: an llm_config used by several apps
+    stays within one budget, and the buckets and queues survive reload_apps.
+    """
+
+    def __init__(self) -> None:
+        self._semaphores: dict[tuple[str, int], asyncio.Semaphore] = {}
+        self._rate_limiters: dict[tuple[str, int | None, int | None, int], RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get_semaphore(self, llm_config: LlmConfig) -> asyncio.Semaphore:
+        """:return: The semaphore bounding the concurrent calls to this llm_config, shared by all the
+        batches of all the apps
+        """
+        key = (llm_config.id, llm_config.max_concurrency)
+        with self._lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(llm_config.max_concurrency)
+                self._semaphores[key] = semaphore
+            return semaphore
+
+    def get_rate_limiter(self, llm_config: LlmConfig) -> RateLimiter | None:
+        """:return: The rate limiter shared by all the calls to this llm_config, None if it has no limits"""
+        if not llm_config.requests_per_minute and not llm_config.tokens_per_minute:
+            return None
+        # A new budget when the limits of the llm_config change
+        key = (
+            llm_config.id,
+            llm_config.requests_per_minute,
+            llm_config.tokens_per_minute,
+            llm_config.max_queue_size,
+        )
+        with self._lock:
+            rate_limiter = self._rate_limiters.get(key)
+            if rate_limiter is None:
+                rate_limiter = RateLimiter(
+                    llm_config.requests_per_minute,
+                    llm_config.tokens_per_minute,
+                    llm_config.max_queue_size,
+                )
+                self._rate_limiters[key] = rate_limiter
+            return rate_limiter
@@ -0,0 +1,205 @@
+"""Retry policy of the analyses: classification of the errors, jittered exponential backoff honoring
+Retry-After, and a circuit breaker per LLM provider.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Literal
+
+import httpx
+import ollama
+import openai
+
+from src.backend.text_analysis.json_repair import LlmValidationError
+from src.backend.text_analysis.llm import LlmConfigurationError
+from src.backend.text_analysis.rate_limiter import RateLimitQueueFullError
+
+if TYPE_CHECKING:
+    from src.backend.text_analysis.llm import LlmConfig
+
+# HTTP statuses worth a new attempt; the other 4xx are errors in the request itself
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitBreakerOpenError(RuntimeError):
+    """The provider failed too often recently: the call is not even attempted."""
+
+
+def get_exception_chain(exception: BaseException) -> list[BaseException]:
+    """:return: The exception and its causes, outermost first"""
+    chain: list[BaseException] = []
+    while exception is not None and exception not in chain:
+        chain.append(exception)
+        exception = exception.__cause__ or exception.__context__
+    return chain
+
+
+def get_status_code(exception: BaseException) -> int | None:
+    if isinstance(exception, openai.APIStatusError):
+        return exception.status_code
+    if isinstance(exception, ollama.ResponseError):
+        return exception.status_code
+    if isinstance(exception, httpx.HTTPStatusError):
+        return exception.response.status_code
+    return None
+
+
+def is_transient(exception: BaseException) -> bool:
+    """:return: False for the errors that another attempt cannot fix (configuration, authentication, bad request)
+    or that it would make worse (overload)
+    """
+    for cause in get_exception_chain(exception):
+        if isinstance(cause, LlmConfigurationError):
+            return False
+        if isinstance(cause, (CircuitBreakerOpenError, RateLimitQueueFullError)):
+            return False  # Retrying a refused call would only add to the load
+        if isinstance(cause, LlmValidationError):
+            return True  # The LLM output varies from one call to the next
+        status_code = get_status_code(cause)
+        if status_code is not None:
+            return status_code in TRANSIENT_STATUS_CODES or status_code >= 500
+    # Unknown errors (connection errors, timeouts...) are retried
+    return True
+
+
+def is_provider_failure(exception: BaseException) -> bool:
+    """:return: True for the transient errors that count toward opening the circuit breaker of the provider.
+    An invalid LLM output is retried but shows that the provider answered.
+    """
+    return is_transient(exception) and not any(
+        isinstance(cause, LlmValidationError) for cause in get_exception_chain(exception)
+    )
+
+
+def get_retry_after(exception: BaseException) -> float | None:
+    """:return: The delay in seconds requested by the provider in a Retry-After header, if any"""
+    for cause in get_exception_chain(exception):
+        response: Any = getattr(cause, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            continue
+        retry_after: str | None = headers.get("retry-after")
+        if retry_after is None:
+            continue
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def get_retry_delay(
+    llm_config: LlmConfig,
+    attempt: int,
+    exception: BaseException,
+) -> float:
+    """:return: The delay before the next attempt: Retry-After if given, otherwise an exponential backoff
+    with full jitter, so that concurrent analyses do not retry in lockstep
+    """
+    retry_after = get_retry_after(exception)
+    if retry_after is not None:
+        return retry_after
+    backoff = min(
+        llm_config.retry_max_delay,
+        llm_config.retry_initial_delay * 2 ** (attempt - 1),
+    )
+    return random.uniform(0, backoff)
+
+
+class CircuitBreaker:
+    """Fails fast while a provider is down.
+
+    After failure_threshold consecutive provider failures (see is_provider_failure()), the circuit opens: calls are refused for
+    reset_timeout seconds. Then a single trial call is let through (half-open): it closes the circuit
+    if it succeeds, reopens it otherwise.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state: Literal["closed", "open", "half_open"] = "closed"
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            # A trial call that never reported back (e.g. a non-transient error) does not block forever
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.opened_at = time.monotonic()
+                return True  # The trial call
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if (
+                self.state == "half_open"
+                or self.consecutive_failures >= self.failure_threshold
+            ):
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def get_state(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "retry_in": (
+                    max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+                    if self.state == "open"
+                    else None
+                ),
+            }
+
+
+class CircuitBreakers:
+    """The circuit breakers of the providers, owned by the server so that their state survives reload_apps."""
+
+    def __init__(self) -> None:
+        self._circuit_breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            circuit_breaker = self._circuit_breakers.get(provider)
+            if circuit_breaker is None:
+                circuit_breaker = CircuitBreaker(provider)
+                self._circuit_breakers[provider] = circuit_breaker
+            return circuit_breaker
+
+    def get_states(self) -> list[dict[str, Any]]:
+        with self._lock:
+            circuit_breakers = sorted(
+                self._circuit_breakers.values(),
+                key=lambda circuit_breaker: circuit_breaker.provider,
+            )
+        return [circuit_breaker.get_state() for circuit_breaker in circuit_breakers]
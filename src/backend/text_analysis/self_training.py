@@ -0,0 +1,194 @@
+"""Self-training of the local pre-router: the intentions the LLM scored with confidence are collected as
+labelled examples, and a background job periodically retrains the local classifier of each app and locale
+on them, swapping it into the pre-router only when it is accurate enough on a holdout share.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from src.backend.text_analysis.llm_local import IntentClassifier, LlmLocal, load_examples
+from src.common.logging import print_blue, print_red
+
+if TYPE_CHECKING:
+    from src.backend.text_analysis.text_analyzer import TextAnalyzer
+
+# One text in HOLDOUT_MODULO goes to the holdout ("test") split, always the same for a given text
+HOLDOUT_MODULO = 5
+# Below this many holdout examples, the accuracy is too noisy to decide on a swap
+MIN_HOLDOUT_EXAMPLES = 20
+# The texts are stored truncated: their beginning is enough to recognize the intention
+MAX_EXAMPLE_TEXT_LENGTH = 2_000
+
+_examples_lock = threading.Lock()
+# filename => number of examples in the file, counted on the first record
+_example_counts: dict[str, int] = {}
+
+
+def get_split(text: str) -> str:
+    digest = hashlib.sha256(text.encode()).digest()
+    return "test" if int.from_bytes(digest[:4], "big") % HOLDOUT_MODULO == 0 else "train"
+
+
+def get_previous_filename(filename: str) -> str:
+    """:return: The file the examples of filename are rotated to, the older ones being dropped"""
+    root, extension = os.path.splitext(filename)
+    return f"{root}.previous{extension}"
+
+
+def _count_examples(filename: str) -> int:
+    if not os.path.exists(filename):
+        return 0
+    with open(filename, encoding="utf-8", newline="") as f:
+        return max(0, sum(1 for _row in csv.reader(f)) - 1)  # Without the header
+
+
+def record_example(
+    filename: str,
+    intention_id: str,
+    text: str,
+    max_examples: int | None = None,
+) -> None:
+    """Append a labelled example to a CSV with intention id, split and text columns (see load_examples()).
+
+    Once the file holds max_examples examples, it replaces the previous file and a new one is started: at
+    most twice max_examples texts are kept, the oldest first dropped.
+    """
+    text = text[:MAX_EXAMPLE_TEXT_LENGTH]
+    with _examples_lock:
+        count = _example_counts.get(filename)
+        if count is None:
+            count = _count_examples(filename)
+        if max_examples is not None and count >= max_examples:
+            os.replace(filename, get_previous_filename(filename))
+            count = 0
+        is_new = not os.path.exists(filename)
+        if is_new:
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, mode="a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(["id", "split", "text"])
+            writer.writerow([intention_id, get_split(text), text])
+        _example_counts[filename] = count + 1
+
+
+def load_collected_examples(filename: str, split: str) -> list[tuple[str, str]]:
+    """:return: The examples of the split, from the previous file then the current one, once per text
+    with its latest label
+    """
+    examples: list[tuple[str, str]] = []
+    with _examples_lock:
+        for path in (get_previous_filename(filename), filename):
+            if os.path.exists(path):
+                examples += load_examples(path, split)
+    return list({text: (intention_id, text) for intention_id, text in examples}.values())
+
+
+def get_accuracy(classifier: IntentClassifier, examples: list[tuple[str, str]]) -> float:
+    correct = sum(classifier.predict(text) == intention_id for intention_id, text in examples)
+    return correct / len(examples)
+
+
+class SelfTrainer:
+    """Background job retraining the pre-router of the text analyzers with self_training enabled.
+
+    Owned by the server: the text analyzers are fetched again on each run, so that the job follows
+    reload_apps.
+    """
+
+    def __init__(self, get_text_analyzers: Callable[[], Iterable[TextAnalyzer]]) -> None:
+        self.get_text_analyzers = get_text_analyzers
+        self.interval: float | None = None
+        self._stopped: threading.Event | None = None
+        self._lock = threading.Lock()
+
+    def retrain(self, text_analyzer: TextAnalyzer) -> dict[str, Any] | None:
+        """Retrain the pre-router of a text analyzer and swap it in if it is accurate enough.
+
+        :return: What was done, None if the text analyzer does not self-train
+        """
+        text_analysis_config = text_analyzer.text_analysis_config
+        if not text_analysis_config.self_training:
+            return None
+        pre_router_llm_config = text_analyzer.llm_registry.llm_configs.get(
+            text_analysis_config.pre_router_llm_config_id or "",
+        )
+        if pre_router_llm_config is None or pre_router_llm_config.llm != "local":
+            return None
+
+        report: dict[str, Any] = {
+            "app_id": text_analyzer.app_id,
+            "locale": text_analyzer.locale,
+            "swapped": False,
+        }
+        filename = text_analyzer.get_self_training_filename()
+        if not os.path.exists(filename):
+            return report
+        holdout = load_collected_examples(filename, "test")
+        report["holdout_examples"] = len(holdout)
+        if len(holdout) < MIN_HOLDOUT_EXAMPLES:
+            return report
+
+        # The hand-labelled examples of the pre-router are kept, the collected ones come on top
+        examples = load_collected_examples(filename, "train")
+        if pre_router_llm_config.examples_filename:
+            examples += load_examples(pre_router_llm_config.examples_filename)
+        classifier = IntentClassifier(examples)
+        accuracy = get_accuracy(classifier, holdout)
+        report["training_examples"] = len(examples)
+        report["accuracy"] = accuracy
+
+        # Never swap in a model doing worse than the current one on the same holdout
+        current_llm = text_analyzer.get_llm(pre_router_llm_config)
+        current_accuracy = 0.0
+        if isinstance(current_llm, LlmLocal):
+            current_accuracy = get_accuracy(current_llm.classifier, holdout)
+            report["current_accuracy"] = current_accuracy
+        min_accuracy = text_analysis_config.self_training_min_accuracy
+        if accuracy >= min_accuracy and accuracy >= current_accuracy:
+            text_analyzer.pre_router_llm = LlmLocal(pre_router_llm_config, classifier)
+            report["swapped"] = True
+        return report
+
+    def run(self) -> list[dict[str, Any]]:
+        reports: list[dict[str, Any]] = []
+        for text_analyzer in self.get_text_analyzers():
+            try:
+                report = self.retrain(text_analyzer)
+            except Exception as e:
+                print_red(
+                    f"Self-training of {text_analyzer.app_id} ({text_analyzer.locale}) failed: "
+                    f"{type(e).__name__}: {e!s:.200}",
+                )
+                continue
+            if report is not None:
+                print_blue(f"Self-training: {report}")
+                reports.append(report)
+        return reports
+
+    def _loop(self, interval: float, stopped: threading.Event) -> None:
+        while not stopped.wait(interval):
+            self.run()
+
+    def schedule(self, interval: float | None) -> None:
+        """Run the job every interval seconds from now on, never if None."""
+        with self._lock:
+            if interval == self.interval:
+                return
+            if self._stopped is not None:
+                self._stopped.set()
+                self._stopped = None
+            self.interval = interval
+            if interval:
+                self._stopped = threading.Event()
+                threading.Thread(
+                    target=self._loop,
+                    args=(interval, self._stopped),
+                    name="self-training",
+                    daemon=True,
+                ).start()
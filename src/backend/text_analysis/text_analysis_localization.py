@@ -13,6 +13,7 @@ class TextAnalysisLocalization(Localization):
     docstring_scoring_for_one_intention_intention_id: str
     docstring_scoring_for_one_intention_score: str
     docstring_scoring_for_one_intention_justification: str
+    docstring_scoring_for_one_intention_justification_short: str
     docstring_scoring_for_multiple_intentions: str
 
     promptstring_prompt_is_markdown: str
@@ -22,12 +23,23 @@ class TextAnalysisLocalization(Localization):
     promptstring_task: str
     promptstring_instructions_intentions: str
     promptstring_list_of_intentions: str
+    promptstring_instructions_top_k: str
+    promptstring_instructions_min_score: str
+    promptstring_instructions_short_justification: str
+    promptstring_instructions_no_justification: str
     promptstring_instructions_extract_features: str
     promptstring_description_of_fragments_feature: str
     promptstring_definitions: str
     promptstring_term: str
     promptstring_definition: str
     promptstring_return_only_json: str
+    promptstring_case_field_values: str
+    promptstring_packed_texts: str
+    promptstring_repair_json: str
+    promptstring_previous_answer: str
+    promptstring_validation_errors: str
+    promptstring_text: str
+    docstring_indexed_analysis_result_text_index: str
 
     label_intention_other: str
     error_analysis_failed: str
@@ -43,6 +55,7 @@ text_analysis_localizations: dict[SupportedLocale, TextAnalysisLocalization] = {
         docstring_scoring_for_one_intention_intention_id="Matches Intention.id",
         docstring_scoring_for_one_intention_score="0 = absent, 10 = fully present",
         docstring_scoring_for_one_intention_justification="Why the model chose this score",
+        docstring_scoring_for_one_intention_justification_short="Why the model chose this score, in a few words",
         docstring_scoring_for_multiple_intentions="List of the scorings for individual intentions",
         promptstring_prompt_is_markdown="This prompt is written in Markdown format.",
         promptstring_intent_id="Intent id",
@@ -51,12 +64,23 @@ text_analysis_localizations: dict[SupportedLocale, TextAnalysisLocalization] = {
         promptstring_task="TASK",
         promptstring_instructions_intentions="Given the *user's* text and the list of intentions below, rate each intention between 0 and 10 and justify the rating in one or two sentences.",
         promptstring_list_of_intentions="List of intentions",
+        promptstring_instructions_top_k="Only return the {top_k} most likely intentions: the other ones are considered as rated 0.",
+        promptstring_instructions_min_score="Only return the intentions rated {min_score} or more: the other ones are considered as rated 0.",
+        promptstring_instructions_short_justification="Keep each justification to a few words.",
+        promptstring_instructions_no_justification="Do not justify the ratings.",
         promptstring_instructions_extract_features="Extract the following features from the text",
         promptstring_description_of_fragments_feature="If the text mentions {description_of_feature}, the list of string fragments that mention it",
         promptstring_definitions="Definitions",
         promptstring_term="Term",
         promptstring_definition="Definition",
         promptstring_return_only_json="Return ONLY valid JSON that matches this JSON Schema (no extra keys, no prose)",
+        promptstring_case_field_values="Values of the case fields referred to above as [field]",
+        promptstring_packed_texts="The *user's* message contains several texts, each one introduced by its index. Perform the tasks above for each text independently and return one result per text, with its index in text_index",
+        promptstring_text="Text",
+        promptstring_repair_json="The *user's* message contains a JSON answer that does not match the expected structure, and the validation errors. Return ONLY the corrected JSON, with the same content wherever it is valid (no prose).",
+        promptstring_previous_answer="Answer to correct",
+        promptstring_validation_errors="Validation errors",
+        docstring_indexed_analysis_result_text_index="Index of the text this result is about",
         label_intention_other="OTHER",
         error_analysis_failed="Analysis failed after multiple retry attempts",
         error_justification_prefix="Analysis error: ",
@@ -66,6 +90,7 @@ text_analysis_localizations: dict[SupportedLocale, TextAnalysisLocalization] = {
         docstring_scoring_for_one_intention_intention_id="Correspond à Intention.id",
         docstring_scoring_for_one_intention_score="0 = absence, 10 = forte présence",
         docstring_scoring_for_one_intention_justification="La raison pour laquelle le modèle a déterminé ce score",
+        docstring_scoring_for_one_intention_justification_short="La raison pour laquelle le modèle a déterminé ce score, en quelques mots",
         docstring_scoring_for_multiple_intentions="Liste des scorings pour chacune des intentions",
         promptstring_prompt_is_markdown="Ce prompt est au format Markdown.",
         promptstring_intent_id="Identifiant de l'intention",
@@ -74,12 +99,23 @@ text_analysis_localizations: dict[SupportedLocale, TextAnalysisLocalization] = {
         promptstring_task="TACHE",
         promptstring_instructions_intentions="Pour un texte donné fourni par *l'utilisateur* et la liste d'intentions ci-dessous, calculer un score entre 0 et 10 pour chaque intention et justifier le score en une ou deux phrases.",
         promptstring_list_of_intentions="Liste des intentions",
+        promptstring_instructions_top_k="Ne retourner que les {top_k} intentions les plus probables : les autres sont considérées comme ayant un score de 0.",
+        promptstring_instructions_min_score="Ne retourner que les intentions dont le score est d'au moins {min_score} : les autres sont considérées comme ayant un score de 0.",
+        promptstring_instructions_short_justification="Limiter chaque justification à quelques mots.",
+        promptstring_instructions_no_justification="Ne pas justifier les scores.",
         promptstring_instructions_extract_features="Extraire les éléments suivants du texte",
         promptstring_description_of_fragments_feature="si le texte mentionne {description_of_feature}, la liste des fragments de ce texte qui le mentionne",
         promptstring_definitions="Définitions",
         promptstring_term="Terme",
         promptstring_definition="Définition",
         promptstring_return_only_json="Retourner obligatoirement une structure JSON valide qui matche le schéma JSON suivant (n'ajouter aucun texte parasite)",
+        promptstring_case_field_values="Valeurs des champs du dossier désignés ci-dessus par [champ]",
+        promptstring_packed_texts="Le message de l'*utilisateur* contient plusieurs textes, chacun précédé de son numéro. Effectuez les tâches ci-dessus pour chaque texte indépendamment et renvoyez un résultat par texte, avec son numéro dans text_index",
+        promptstring_text="Texte",
+        promptstring_repair_json="Le message de l'*utilisateur* contient une réponse JSON qui ne respecte pas la structure attendue, et les erreurs de validation. Retourner uniquement le JSON corrigé, en gardant le contenu partout où il est valide (n'ajouter aucun texte parasite).",
+        promptstring_previous_answer="Réponse à corriger",
+        promptstring_validation_errors="Erreurs de validation",
+        docstring_indexed_analysis_result_text_index="Numéro du texte auquel se rapporte ce résultat",
         label_intention_other="AUTRE",
         error_analysis_failed="Échec de l'analyse après plusieurs tentatives",
         error_justification_prefix="Erreur lors de l'analyse : ",
@@ -89,6 +125,7 @@ text_analysis_localizations: dict[SupportedLocale, TextAnalysisLocalization] = {
         docstring_scoring_for_one_intention_intention_id="vastaa Intention.id",
         docstring_scoring_for_one_intention_score="0 = puuttuu, 10 = täysosuma",
         docstring_scoring_for_one_intention_justification="Miksi malli valitsi tämän pisteytyksen",
+        docstring_scoring_for_one_intention_justification_short="Miksi malli valitsi tämän pisteytyksen, muutamalla sanalla",
         docstring_scoring_for_multiple_intentions="Lista yksittäisen aikomuksen pisteytyksistä",
         promptstring_prompt_is_markdown="Tämä prompti on kirjoitettu Markdown- formaatissa.",
         promptstring_intent_id="Intent id",
@@ -97,12 +134,23 @@ text_analysis_localizations: dict[SupportedLocale, TextAnalysisLocalization] = {
         promptstring_task="TEHTÄVÄ",
         promptstring_instructions_intentions="Perustuen *käyttäjän* antamaan tekstiin ja alla olevaan listaan aikomuksista luokittele jokainen aikomus nollasta kymmeneen ja perustele luokittelu yhdellä tai kahdella lauseella.",
         promptstring_list_of_intentions="Lista aikomuksista",
+        promptstring_instructions_top_k="Palauta vain {top_k} todennäköisintä aikomusta: muiden pisteytys on 0.",
+        promptstring_instructions_min_score="Palauta vain aikomukset, joiden pisteytys on vähintään {min_score}: muiden pisteytys on 0.",
+        promptstring_instructions_short_justification="Perustele jokainen pisteytys muutamalla sanalla.",
+        promptstring_instructions_no_justification="Älä perustele pisteytyksiä.",
         promptstring_instructions_extract_features="Poimi seuraavat ominaisuudet tekstistä",
         promptstring_description_of_fragments_feature="Jos tekstissä mainitaan {description_of_feature}, lista merkkijonon osista, joissa se mainitaan",
         promptstring_definitions="Määritelmät",
         promptstring_term="Termi",
         promptstring_definition="Määritelmä",
         promptstring_return_only_json="Palauta VAIN validi JSON, joka vastaa kyseistä JSON-mallia (ei ylimääräisiä avaimia, ei proosaa)",
+        promptstring_case_field_values="Yllä muodossa [kenttä] viitattujen tapauskenttien arvot",
+        promptstring_packed_texts="*Käyttäjän* viesti sisältää useita tekstejä, joista kunkin edellä on sen numero. Suorita yllä olevat tehtävät jokaiselle tekstille erikseen ja palauta yksi tulos tekstiä kohden, numero kentässä text_index",
+        promptstring_text="Teksti",
+        promptstring_repair_json="*Käyttäjän* viesti sisältää JSON-vastauksen, joka ei vastaa odotettua rakennetta, sekä validointivirheet. Palauta VAIN korjattu JSON ja säilytä sisältö kaikkialla, missä se on validia (ei proosaa).",
+        promptstring_previous_answer="Korjattava vastaus",
+        promptstring_validation_errors="Validointivirheet",
+        docstring_indexed_analysis_result_text_index="Tekstin numero, jota tämä tulos koskee",
         label_intention_other="MUU",
         error_analysis_failed="Analyysi epäonnistui useiden uudelleenyritysten jälkeen",
         error_justification_prefix="Analyysivirhe: ",
@@ -8,19 +8,33 @@ Date: 2025-04-29
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
-import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, List, Optional, cast
+from string import Formatter
+from typing import TYPE_CHECKING, Any, Iterable, List, Literal, Optional, cast
 
 from pydantic import BaseModel, Field, create_model
 
-from src.backend.backend.paths import get_cache_file_path, short_hash
+from src.backend.backend.paths import get_self_training_file_path, short_hash
 from src.backend.rendering.html import build_html_highlighted_text_and_features
 from src.backend.rendering.md import (
     build_markdown_table,
     build_markdown_table_intentions,
 )
+from src.backend.text_analysis.analysis_cache import (
+    CACHE_KEY_LLM_CONFIG_FIELDS,
+    AnalysisCache,
+    JsonFilesAnalysisCache,
+    build_cache_key,
+    normalize_text_for_key,
+)
 from src.backend.text_analysis.base_models import (
     FIELD_NAME_SCORINGS,
     PREFIX_FRAGMENTS,
@@ -28,9 +42,15 @@ from src.backend.text_analysis.base_models import (
     Feature,
     Intention,
 )
-from src.backend.text_analysis.llm_ollama import LlmOllama
-from src.backend.text_analysis.llm_openai import LlmOpenAI
-from src.backend.text_analysis.llm_scaleway import LlmScaleway
+from src.backend.text_analysis.json_repair import LlmValidationError
+from src.backend.text_analysis.llm import (
+    LlmConfigurationError,
+    LlmUsage,
+    estimate_tokens,
+)
+from src.backend.text_analysis.llm_registry import LlmRegistry
+from src.backend.text_analysis.near_duplicates import NearDuplicateIndex, get_signature
+from src.backend.text_analysis.self_training import record_example
 from src.backend.text_analysis.text_analysis_localization import (
     TextAnalysisLocalization,
     text_analysis_localizations,
@@ -38,24 +58,85 @@ from src.backend.text_analysis.text_analysis_localization import (
 from src.common.config import Config, SupportedLocale, load_config_from_workbook
 from src.common.constants import (
     KEY_ANALYSIS_RESULT,
+    KEY_CACHE_KEY,
     KEY_HASH_CODE,
     KEY_HIGHLIGHTED_TEXT_AND_FEATURES,
     KEY_MARKDOWN_TABLE,
     KEY_PROMPT,
     KEY_STATISTICS,
 )
-from src.common.logging import print_red
+from src.common.logging import print_blue, print_red
 
 if TYPE_CHECKING:
+    import numpy as np
+
+    from src.backend.backend.usage_statistics import UsageStatistics
     from src.backend.text_analysis.llm import Llm, LlmConfig
+    from src.backend.text_analysis.rate_limiter import RateLimiter
     from src.common.case_model import CaseModel
 
 
+# "two_phase" analysis mode: number of best scored intentions whose case fields are extracted
+PHASE_TWO_INTENTIONS = 2
+
+
 class TextAnalysisConfig(Config):
     system_prompt_prefix: str
     definitions: list[Definition]
     intentions: list[Intention]
 
+    # Sparse scoring: the LLM only scores the top_k most likely intentions and/or those scoring at least
+    # min_score, the other ones are added back with a score of 0 after the call
+    top_k: Optional[int] = None
+    min_score: Optional[int] = None
+    justifications: Literal["full", "short", "none"] = "full"
+
+    # "two_phase": a first call scores the intentions only, then the case fields of the 2 best intentions
+    # are extracted by parallel calls restricted to these fields (see CaseField.intention_ids)
+    # "parallel": the intentions are scored and the features extracted by two concurrent calls
+    analysis_mode: Literal["single_call", "two_phase", "parallel"] = "single_call"
+
+    # Cascade: the texts are first analyzed with the (cheap, fast) cascade llm_config, and escalated to the
+    # requested llm_config only when its best intention scores below cascade_min_score, when the two best
+    # intentions are less than cascade_min_margin apart, or when its response is invalid
+    cascade_llm_config_id: Optional[str] = None
+    cascade_min_score: int = 7
+    cascade_min_margin: int = 3
+
+    # Pre-router: the texts are first scored by pre_router_llm_config_id (typically a "local" llm_config);
+    # when the best intention reaches its pre_router_min_score and has no case field to extract, this result
+    # is served without calling the LLM. A pre_router_shadow_rate share of these bypasses is still analyzed
+    # by the LLM in the background, to measure how often the pre-router agrees with it
+    pre_router_llm_config_id: Optional[str] = None
+    pre_router_shadow_rate: float = 0.0
+
+    # Self-training: the intentions the LLM scores at least self_training_min_score, clearly ahead of the
+    # others, are collected as examples to retrain the local pre-router of the app (see self_training.py),
+    # swapped in when it reaches self_training_min_accuracy on the holdout examples. Opt-in, as the texts
+    # of the users are then stored on disk (truncated): at most twice self_training_max_examples of them,
+    # the oldest being dropped first
+    self_training: bool = False
+    self_training_min_score: int = 8
+    self_training_min_accuracy: float = 0.9
+    self_training_max_examples: int = 10_000
+
+    # Write-through cache: the results of the LLM are stored in the analysis cache as soon as they are
+    # validated, instead of waiting for the client to save them (see save_text_analysis_cache), and the
+    # cached results of the app are served for cache_ttl seconds (None: as long as the cache keeps them).
+    # With cache_read_policy "on_request" the cache is only read when the client asks for it
+    # (read_from_cache), with "always" every analysis is first looked up in the cache
+    cache_write_through: bool = False
+    cache_ttl: Optional[float] = None
+    cache_read_policy: Literal["on_request", "always"] = "on_request"
+
+    # Near-duplicate matching: when the cache has no result for a text, the cached result of a text
+    # analyzed with the same prompt, case field values and llm_config is served if their estimated Jaccard
+    # similarity reaches near_duplicate_threshold (see near_duplicates.py), flagged in its statistics
+    near_duplicate_threshold: Optional[float] = None
+
+    def is_sparse_scoring(self) -> bool:
+        return self.top_k is not None or self.min_score is not None
+
 
 def load_text_analysis_config_from_workbook(
     filename: str,
@@ -75,13 +156,32 @@ class ListOfTextFragments(BaseModel):
     list: list[str]
 
 
-def create_analysis_models(locale: SupportedLocale, features: list[Feature]):
+def create_analysis_models(
+    locale: SupportedLocale,
+    features: list[Feature],
+    justifications: Literal["full", "short", "none"] = "full",
+    score_intentions: bool = True,
+):
     localization: TextAnalysisLocalization = text_analysis_localizations[
         locale
     ]  # Will fail here if language is not supported
 
     # class ScoringForOneIntention
 
+    justification_field_definitions = {}
+    if justifications != "none":
+        justification_field_definitions["justification"] = (
+            str,
+            Field(
+                ...,
+                description=(
+                    localization.docstring_scoring_for_one_intention_justification_short
+                    if justifications == "short"
+                    else localization.docstring_scoring_for_one_intention_justification
+                ),
+            ),
+        )
+
     class_scoring_for_one_intention = create_model(
         "ScoringForOneIntention",
         __base__=BaseModel,
@@ -99,13 +199,7 @@ def create_analysis_models(locale: SupportedLocale, features: list[Feature]):
                 description=localization.docstring_scoring_for_one_intention_score,
             ),
         ),
-        justification=(
-            str,
-            Field(
-                ...,
-                description=localization.docstring_scoring_for_one_intention_justification,
-            ),
-        ),
+        **justification_field_definitions,
     )
 
     class_scoring_for_one_intention.__doc__ = (
@@ -144,11 +238,52 @@ def create_analysis_models(locale: SupportedLocale, features: list[Feature]):
 
     return create_model(
         "AnalysisResult",
-        __base__=class_scorings_for_multiple_intentions,
+        __base__=(
+            class_scorings_for_multiple_intentions if score_intentions else BaseModel
+        ),
         **field_definitions,
     )
 
 
+def create_packed_analysis_model(
+    locale: SupportedLocale,
+    analysis_response_model: type[BaseModel],
+) -> type[BaseModel]:
+    """:return: The model of the response to several texts packed in one call: the AnalysisResult of each text, with its index"""
+    localization: TextAnalysisLocalization = text_analysis_localizations[locale]
+
+    class_indexed_analysis_result = create_model(
+        "IndexedAnalysisResult",
+        __base__=analysis_response_model,
+        text_index=(
+            int,
+            Field(
+                ...,
+                description=localization.docstring_indexed_analysis_result_text_index,
+            ),
+        ),
+    )
+
+    return create_model(
+        "PackedAnalysisResults",
+        __base__=BaseModel,
+        results=(List[class_indexed_analysis_result], Field(...)),
+    )
+
+
+def get_template_field_names(template: str) -> list[str]:
+    """:return: The names of the case fields referred to by the {placeholders} of a template, in order of first use"""
+    field_names: list[str] = []
+    for _literal_text, field_name, _format_spec, _conversion in Formatter().parse(
+        template,
+    ):
+        if field_name:
+            field_name = re.split(r"[.\[]", field_name, maxsplit=1)[0]
+            if field_name not in field_names:
+                field_names.append(field_name)
+    return field_names
+
+
 class TextAnalyzer:
     def __init__(
         self,
@@ -157,6 +292,9 @@ class TextAnalyzer:
         locale: SupportedLocale,  # llm_config: LlmConfig,
         case_model: CaseModel,
         text_analysis_config: TextAnalysisConfig,
+        llm_registry: LlmRegistry | None = None,
+        usage_statistics: UsageStatistics | None = None,
+        analysis_cache: AnalysisCache | None = None,
     ) -> None:
 
         start_init_datetime = datetime.now()
@@ -168,6 +306,26 @@ class TextAnalyzer:
 
         self.case_model: CaseModel = case_model
 
+        # Shared with the other localized apps of the App when provided
+        self.llm_registry: LlmRegistry = (
+            llm_registry if llm_registry is not None else LlmRegistry()
+        )
+        self.usage_statistics: UsageStatistics | None = usage_statistics
+        # Shared by all the apps of the server when provided
+        self.analysis_cache: AnalysisCache = (
+            analysis_cache
+            if analysis_cache is not None
+            else JsonFilesAnalysisCache(runtime_directory)
+        )
+        # The pre-router retrained on the examples collected for this app and locale, once swapped in
+        self.pre_router_llm: Llm | None = None
+        # The texts analyzed, to serve the cached result of a near duplicate
+        self.near_duplicate_index: NearDuplicateIndex | None = (
+            NearDuplicateIndex()
+            if text_analysis_config.near_duplicate_threshold is not None
+            else None
+        )
+
         features: list[Feature] = []
         for case_field in self.case_model.case_fields:
             if case_field.extraction != "DO NOT EXTRACT":
@@ -185,20 +343,161 @@ class TextAnalyzer:
         self.analysis_response_model: type[BaseModel] = create_analysis_models(
             self.locale,
             features,
+            text_analysis_config.justifications,
+        )
+
+        self.packed_analysis_response_model: type[BaseModel] = (
+            create_packed_analysis_model(self.locale, self.analysis_response_model)
         )
 
+        # Partial analyses (see get_part_features()), their response models built on first use
+        self.part_response_models: dict[tuple[str, ...], type[BaseModel]] = {
+            (): self.analysis_response_model,
+        }
+
         self.localization: TextAnalysisLocalization = text_analysis_localizations[
             self.locale
         ]  # Will fail here if language is not supported
 
+        # Localized system prompt templates, compiled once per prompt-shaping llm_config settings
+        self.localized_system_prompt_templates: dict[tuple[str, ...], str] = {}
+        # "static_prefix" layout: the templates with [field] markers in place of the case field values,
+        # and the names of these fields
+        self.static_system_prompts: dict[tuple[str, ...], tuple[str, list[str]]] = {}
+        # Multi-text packing: the instructions and schema of the packed calls
+        self.packed_prompt_instructions: dict[tuple[str, ...], str] = {}
+
         end_init_datetime = datetime.now()
         time_difference: timedelta = end_init_datetime - start_init_datetime
         time_difference.total_seconds()
 
-    def build_localizedsystem_prompt_template(self, llm_config: LlmConfig) -> str:
+    def get_llm(self, llm_config: LlmConfig) -> Llm:
+        if self.pre_router_llm is not None and self.pre_router_llm.llm_config == llm_config:
+            return self.pre_router_llm
+        return self.llm_registry.get(llm_config)
+
+    @staticmethod
+    def get_prompt_template_key(llm_config: LlmConfig) -> tuple[str, ...]:
+        """:return: The llm_config settings the system prompt template depends on"""
+        return llm_config.prompt_format, llm_config.response_format_type
+
+    def get_part_features(self, part: tuple[str, ...]) -> list[Feature]:
+        """Partial analyses:
+        - (): the whole analysis, intentions and features
+        - ("intentions",): the scoring of the intentions only
+        - ("features",): the extraction of all the features only
+        - ("features", intention_id): the extraction of the features of the case fields of one intention
+
+        :return: The features extracted by this partial analysis
+        """
+        if len(part) <= 1:
+            return [] if part == ("intentions",) else self.features
+        intention_id = part[1]
+        case_field_ids = {
+            case_field.id
+            for case_field in self.case_model.case_fields
+            if intention_id in case_field.intention_ids
+        }
+        return [feature for feature in self.features if feature.id in case_field_ids]
+
+    def get_part_response_model(self, part: tuple[str, ...]) -> type[BaseModel]:
+        """:return: The response model of a partial analysis, built on first use"""
+        response_model = self.part_response_models.get(part)
+        if response_model is None:
+            response_model = create_analysis_models(
+                self.locale,
+                self.get_part_features(part),
+                self.text_analysis_config.justifications,
+                score_intentions=part[0] != "features",
+            )
+            self.part_response_models[part] = response_model
+        return response_model
+
+    def get_analysis_parts(self) -> list[tuple[str, ...]]:
+        """:return: The partial analyses the analysis_mode may perform"""
+        if self.text_analysis_config.analysis_mode == "two_phase":
+            return [("intentions",)] + [
+                ("features", intention.id)
+                for intention in self.text_analysis_config.intentions
+                if self.get_part_features(("features", intention.id))
+            ]
+        if self.text_analysis_config.analysis_mode == "parallel" and self.features:
+            return [("intentions",), ("features",)]
+        return [()]
+
+    def get_localized_system_prompt_template(
+        self,
+        llm_config: LlmConfig,
+        part: tuple[str, ...] = (),
+    ) -> str:
+        """:return: The compiled system prompt template, built on first use for these llm_config settings"""
+        key = self.get_prompt_template_key(llm_config) + part
+        template: str | None = self.localized_system_prompt_templates.get(key)
+        if template is None:
+            template = self.build_localizedsystem_prompt_template(llm_config, part)
+            self.localized_system_prompt_templates[key] = template
+        return template
+
+    def get_static_system_prompt(
+        self,
+        llm_config: LlmConfig,
+        part: tuple[str, ...] = (),
+    ) -> tuple[str, list[str]]:
+        """:return: The system prompt without any case field value and the names of the fields it refers to"""
+        key = self.get_prompt_template_key(llm_config) + part
+        static_system_prompt = self.static_system_prompts.get(key)
+        if static_system_prompt is None:
+            template = self.get_localized_system_prompt_template(llm_config, part)
+            field_names = get_template_field_names(template)
+            static_system_prompt = (
+                template.format(**{name: f"[{name}]" for name in field_names}),
+                field_names,
+            )
+            self.static_system_prompts[key] = static_system_prompt
+        return static_system_prompt
+
+    def build_static_prefix_system_prompt(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        part: tuple[str, ...] = (),
+    ) -> str:
+        """:return: The static system prompt followed by the values of the case fields it refers to"""
+        static_system_prompt, field_names = self.get_static_system_prompt(
+            llm_config,
+            part,
+        )
+        if not field_names:
+            return static_system_prompt
+
+        md_line_break = "  \n"
+        lines = [f"## {self.localization.promptstring_case_field_values}:"]
+        lines.extend(f"- [{name}]: {field_values[name]}" for name in field_names)
+        return (
+            static_system_prompt
+            + md_line_break
+            + md_line_break.join(lines)
+            + md_line_break
+        )
+
+    def warm_up(self, llm_configs: Iterable[LlmConfig]) -> None:
+        """Compile the system prompt templates of all the llm_configs ahead of the first analysis."""
+        for llm_config in llm_configs:
+            for part in self.get_analysis_parts():
+                if llm_config.prompt_layout == "static_prefix":
+                    self.get_static_system_prompt(llm_config, part)
+                else:
+                    self.get_localized_system_prompt_template(llm_config, part)
+
+    def build_localizedsystem_prompt_template(
+        self,
+        llm_config: LlmConfig,
+        part: tuple[str, ...] = (),
+    ) -> str:
         """:return: The localized system prompt template with placeholders to be replaced with actual case fiels values"""
         text_analysis_config: TextAnalysisConfig = self.text_analysis_config
-        features: list[Feature] = self.features
+        features: list[Feature] = self.get_part_features(part)
+        score_intentions: bool = not part or part[0] != "features"
 
         localization: TextAnalysisLocalization = text_analysis_localizations[
             self.locale
@@ -218,12 +517,31 @@ class TextAnalyzer:
             lines.append(text_analysis_config.system_prompt_prefix)
             lines.append("")
 
-        if features:
+        if features and score_intentions:
             lines.append(localization.promptstring_perform_the_2_tasks_below)
             lines.append(f"## {localization.promptstring_task} 1")
 
-        lines.append(localization.promptstring_instructions_intentions)
-        lines.append(f"### {localization.promptstring_list_of_intentions}:")
+        if score_intentions:
+            lines.append(localization.promptstring_instructions_intentions)
+            if text_analysis_config.top_k is not None:
+                lines.append(
+                    localization.promptstring_instructions_top_k.format(
+                        top_k=text_analysis_config.top_k,
+                    ),
+                )
+            if text_analysis_config.min_score is not None:
+                lines.append(
+                    localization.promptstring_instructions_min_score.format(
+                        min_score=text_analysis_config.min_score,
+                    ),
+                )
+            if text_analysis_config.justifications == "short":
+                lines.append(
+                    localization.promptstring_instructions_short_justification,
+                )
+            elif text_analysis_config.justifications == "none":
+                lines.append(localization.promptstring_instructions_no_justification)
+            lines.append(f"### {localization.promptstring_list_of_intentions}:")
 
         # Append a md_line_break to each string
         lines = [line + md_line_break for line in lines]
@@ -231,34 +549,38 @@ class TextAnalyzer:
 
         # List of intents
 
-        rows = text_analysis_config.intentions
-        column_names = [
-            localization.promptstring_intent_id,
-            localization.promptstring_intent_description,
-        ]
+        if score_intentions:
+            rows = text_analysis_config.intentions
+            column_names = [
+                localization.promptstring_intent_id,
+                localization.promptstring_intent_description,
+            ]
 
-        def intent_id(intent: Intention) -> str:
-            return intent.id
+            def intent_id(intent: Intention) -> str:
+                return intent.id
 
-        def intent_description(intent: Intention) -> str:
-            return intent.description
+            def intent_description(intent: Intention) -> str:
+                return intent.description
 
-        if llm_config.prompt_format == "markdown":
-            system_prompt += build_markdown_table(
-                rows,
-                column_names,
-                [intent_id, intent_description],
-            )
-            system_prompt += md_line_break
+            if llm_config.prompt_format == "markdown":
+                system_prompt += build_markdown_table(
+                    rows,
+                    column_names,
+                    [intent_id, intent_description],
+                )
+                system_prompt += md_line_break
 
-        else:
-            for definition in rows:
-                system_prompt += f"- {intent_id(definition)}: {intent_description(definition)}{md_line_break}"
+            else:
+                for definition in rows:
+                    system_prompt += f"- {intent_id(definition)}: {intent_description(definition)}{md_line_break}"
 
         # Features to extract
 
         if features:
-            system_prompt += f"## {localization.promptstring_task} 2{md_line_break}"
+            if score_intentions:
+                system_prompt += (
+                    f"## {localization.promptstring_task} 2{md_line_break}"
+                )
             system_prompt += f"{localization.promptstring_instructions_extract_features}:{md_line_break}"
 
             rows: list[tuple[str, str]] = []
@@ -318,185 +640,1525 @@ class TextAnalyzer:
                     system_prompt += f"- {term_name(definition)}: {term_definition(definition)}{md_line_break}"
                 system_prompt += f"---------{md_line_break}"
 
-        # if text_analysis_config.response_format_type == "json_object":
-        if llm_config.response_format_type == "json_object":
-            system_prompt += (
-                f"{localization.promptstring_return_only_json}:{md_line_break}"
-            )
-            schema: str = json.dumps(
-                self.analysis_response_model.model_json_schema(),
-                indent=2,
-            )
-            # Escape braces in JSON schema to avoid conflict with .format() placeholders
-            schema_escaped = schema.replace("{", "{{").replace("}", "}}")
-            system_prompt += f"```{schema_escaped}```"
+        # Escape braces in JSON schema to avoid conflict with .format() placeholders
+        system_prompt += self.get_response_schema_instructions(
+            llm_config,
+            self.get_part_response_model(part),
+        ).replace("{", "{{").replace("}", "}}")
 
         return system_prompt
 
-    def _analyze(
+    def get_response_schema_instructions(
         self,
         llm_config: LlmConfig,
-        field_values: dict[str, Any],
-        text: str,
-        read_from_cache: bool,
-    ) -> tuple[str, dict[str, str]]:
-
-        # TODO: Save the system_prompt in cache and move down the lines that follow under else:  # read_from_cache
+        response_model: type[BaseModel],
+    ) -> str:
+        """:return: The JSON schema the LLM must follow, to be added to the system prompt"""
+        # With "json_schema" the provider enforces the schema, no need to repeat it in the prompt
+        if llm_config.response_format_type != "json_object":
+            return ""
+        md_line_break = "  \n"
+        schema: str = json.dumps(response_model.model_json_schema(), indent=2)
+        return f"{self.localization.promptstring_return_only_json}:{md_line_break}```{schema}```"
 
+    def build_system_prompt(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        part: tuple[str, ...] = (),
+    ) -> str:
         # S'assurer que date_demande est présent dans field_values (requis par le template)
         if "date_demande" not in field_values:
             field_values["date_demande"] = datetime.now().strftime("%d/%m/%Y")
 
+        if llm_config.prompt_layout == "static_prefix":
+            return self.build_static_prefix_system_prompt(
+                llm_config,
+                field_values,
+                part,
+            )
+
         localized_system_prompt_template: str = (
-            self.build_localizedsystem_prompt_template(llm_config)
+            self.get_localized_system_prompt_template(llm_config, part)
+        )
+        return localized_system_prompt_template.format(**field_values)
+
+    def get_packed_prompt_instructions(self, llm_config: LlmConfig) -> str:
+        """:return: The instructions, and the schema, of a call where several texts are packed"""
+        key = self.get_prompt_template_key(llm_config)
+        instructions: str | None = self.packed_prompt_instructions.get(key)
+        if instructions is None:
+            md_line_break = "  \n"
+            instructions = (
+                f"{md_line_break}## {self.localization.promptstring_packed_texts}{md_line_break}"
+                + self.get_response_schema_instructions(
+                    llm_config,
+                    self.packed_analysis_response_model,
+                )
+            )
+            self.packed_prompt_instructions[key] = instructions
+        return instructions
+
+    def build_packed_system_prompt(self, llm_config: LlmConfig, system_prompt: str) -> str:
+        """:return: The system prompt of a packed call: the system prompt of its texts, with the
+        packed instructions and schema in place of the schema of a single text
+        """
+        schema_instructions = self.get_response_schema_instructions(
+            llm_config,
+            self.analysis_response_model,
+        )
+        packed_instructions = self.get_packed_prompt_instructions(llm_config)
+        if not schema_instructions:
+            return system_prompt + packed_instructions
+        return system_prompt.replace(schema_instructions, packed_instructions, 1)
+
+    def can_pack(self, llm_config: LlmConfig) -> bool:
+        """:return: Whether several texts can be analyzed by llm_config in a single call. A packed call
+        is a plain single call: the analysis modes with several calls, the cascade and the pre-router
+        are not applied to it.
+        """
+        return (
+            llm_config.pack_size > 1
+            and self.text_analysis_config.analysis_mode == "single_call"
+            and self.get_cascade_llm_config(llm_config) is None
+            and self.get_pre_router_llm_config(llm_config) is None
         )
-        system_prompt = localized_system_prompt_template.format(**field_values)
-
-        # Calling LLM
 
-        # cache_filename = get_cache_file_path(self.runtime_directory, self.app_id, self.locale, system_prompt, text)
-        hash_code = short_hash(system_prompt, text)
-        cache_filename = get_cache_file_path(
-            self.runtime_directory,
-            self.app_id,
-            self.locale,
-            hash_code,
+    def build_packed_text(self, texts: list[str]) -> str:
+        """:return: The user message of a packed call: the texts, each one introduced by its index"""
+        return "\n\n".join(
+            f"### {self.localization.promptstring_text} {text_index}\n{text}"
+            for text_index, text in enumerate(texts)
         )
 
-        if read_from_cache and not os.path.exists(cache_filename):
-            print_red(
-                f"File {cache_filename} does not exist - Sending text to analyze to LLM",
+    def plan_packs(
+        self,
+        llm_config: LlmConfig,
+        texts: list[tuple[dict[str, Any], str]],
+    ) -> list[list[int]]:
+        """Group the (field_values, text) to analyze into packs that can be scored in a single LLM call.
+
+        Only texts with the same system prompt are packed together, at most llm_config.pack_size at a time
+        and within an estimated llm_config.max_pack_tokens. A text too long for any pack is packed alone.
+
+        :return: The packs, as lists of indexes in texts
+        """
+        indexes_by_system_prompt: dict[str, list[int]] = {}
+        for index, (field_values, _text) in enumerate(texts):
+            system_prompt = self.build_system_prompt(llm_config, field_values)
+            indexes_by_system_prompt.setdefault(system_prompt, []).append(index)
+
+        packs: list[list[int]] = []
+        for system_prompt, indexes in indexes_by_system_prompt.items():
+            budget = llm_config.max_pack_tokens - estimate_tokens(
+                self.build_packed_system_prompt(llm_config, system_prompt),
             )
-            read_from_cache = False
+            pack: list[int] = []
+            pack_tokens = 0
+            for index in indexes:
+                text_tokens = estimate_tokens(texts[index][1])
+                if pack and (
+                    len(pack) >= llm_config.pack_size
+                    or pack_tokens + text_tokens > budget
+                ):
+                    packs.append(pack)
+                    pack = []
+                    pack_tokens = 0
+                pack.append(index)
+                pack_tokens += text_tokens
+            if pack:
+                packs.append(pack)
+        return packs
+
+    def get_cache_context(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+    ) -> dict[str, Any]:
+        """:return: Everything the result of an analysis depends on but the text: the static system prompt,
+        the values of the case fields it refers to, the llm_config settings, the analysis mode and the
+        cascade settings (an accepted result of the cascade llm_config is served for llm_config)
+        """
 
-        if read_from_cache:
-            with open(file=cache_filename, encoding="utf-8") as f:
-                analysis_result = json.load(f)
+        def get_llm_config_fields(llm_config: LlmConfig) -> dict[str, Any]:
+            return {name: getattr(llm_config, name) for name in CACHE_KEY_LLM_CONFIG_FIELDS}
 
-        else:
+        static_system_prompt, field_names = self.get_static_system_prompt(llm_config)
+        cascade_llm_config = self.get_cascade_llm_config(llm_config)
+        return {
+            "static_system_prompt": hashlib.sha256(static_system_prompt.encode()).hexdigest(),
+            "field_values": {name: field_values.get(name) for name in field_names},
+            "llm_config": get_llm_config_fields(llm_config),
+            "analysis_mode": self.text_analysis_config.analysis_mode,
+            "cascade": (
+                None
+                if cascade_llm_config is None
+                else {
+                    "llm_config": get_llm_config_fields(cascade_llm_config),
+                    "min_score": self.text_analysis_config.cascade_min_score,
+                    "min_margin": self.text_analysis_config.cascade_min_margin,
+                }
+            ),
+        }
 
-            before = datetime.now()
+    @staticmethod
+    def build_cache_key(cache_context: dict[str, Any], text: str) -> str:
+        return build_cache_key({**cache_context, "text": normalize_text_for_key(text)})
 
-            if llm_config.llm == "openai":
-                llm: Llm = LlmOpenAI(llm_config)
-            elif llm_config.llm == "ollama":
-                llm: Llm = LlmOllama(llm_config)
-            elif llm_config.llm == "scaleway":
-                llm: Llm = LlmScaleway(llm_config)
-            else:
-                msg = f"Unsupported LLM: {llm_config.llm}"
-                raise ValueError(msg)
+    def get_cache_key(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+    ) -> str:
+        """:return: The key of the analysis in the cache, over everything its result depends on"""
+        return self.build_cache_key(self.get_cache_context(llm_config, field_values), text)
 
-            if llm_config.response_format_type == "json_object":
-                try:
-                    _analysis_result: BaseModel = llm.call_llm_with_json_schema(
-                        self.analysis_response_model,
-                        system_prompt,
-                        text,
-                    )
-                except (ValueError, Exception) as e:
-                    # Si la validation Pydantic échoue, propager l'erreur pour le retry/fallback
-                    # L'erreur sera capturée par le mécanisme de retry dans LocalizedApp.analyze()
-                    msg = f"LLM returned invalid format: {type(e).__name__}: {e!s}"
-                    raise ValueError(
-                        msg,
-                    ) from e
-            else:
-                _analysis_result: BaseModel = llm.call_llm_with_pydantic_model(
-                    self.analysis_response_model,
-                    system_prompt,
-                    text,
-                )
+    def _get_served_cache_key(
+        self,
+        llm_config: LlmConfig,
+        served_llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        cache_key: str,
+    ) -> str:
+        """:return: The cache key of a result of served_llm_config for a call to llm_config: when the
+        alternate llm_config of the hedged calls won, its result is cached (and indexed) under its own key
+        """
+        if served_llm_config.id == llm_config.id:
+            return cache_key
+        cache_context = self.get_cache_context(served_llm_config, field_values)
+        cache_key = self.build_cache_key(cache_context, text)
+        if self.near_duplicate_index is not None:
+            self.near_duplicate_index.add(
+                build_cache_key(cache_context),
+                cache_key,
+                get_signature(text),
+            )
+        return cache_key
 
-            time_difference: timedelta = datetime.now() - before
+    def _get_near_duplicate(
+        self,
+        llm_config: LlmConfig,
+        context_key: str,
+        signature: np.ndarray,
+        hash_code: str,
+    ) -> dict[str, Any] | None:
+        """:return: The cached result of the most similar text analyzed in the same context, if at least
+        near_duplicate_threshold similar, flagged in its statistics
+        """
+        for similarity, cache_key in self.near_duplicate_index.find(
+            context_key,
+            signature,
+            self.text_analysis_config.near_duplicate_threshold,
+        ):
+            analysis_result = self.analysis_cache.get(
+                self.app_id,
+                self.locale,
+                cache_key,
+                max_age=self.text_analysis_config.cache_ttl,
+            )
+            if analysis_result is None:
+                continue
+            statistics = analysis_result.setdefault(KEY_STATISTICS, {})
+            statistics["Near duplicate of"] = analysis_result.get(KEY_HASH_CODE)
+            statistics["Near duplicate similarity"] = f"{similarity:.2f}"
+            analysis_result[KEY_HASH_CODE] = hash_code
+            # The result of another text: not to be cached under the key of this one
+            analysis_result[KEY_CACHE_KEY] = None
+            if self.usage_statistics is not None:
+                self.usage_statistics.record_near_duplicate(self.app_id, self.locale, llm_config)
+            print_blue(f"Near duplicate {similarity:.2f} of cached analysis {cache_key}")
+            return analysis_result
+        return None
+
+    def _prepare_analysis(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+    ) -> tuple[str, str, str, dict[str, Any] | None]:
+        """:return: The system prompt, the hash code, the cache key and the cached analysis result (None if
+        the LLM has to be called)
+        """
 
-            seconds: float = time_difference.total_seconds()
+        # TODO: Save the system_prompt in cache and move down the lines that follow under else:  # read_from_cache
 
-            analysis_result: dict[str, Any] = _analysis_result.model_dump(mode="json")
+        system_prompt = self.build_system_prompt(llm_config, field_values)
 
-            statistics: dict[str, Any] = {
-                "LLM config": llm_config.id,
-                "LLM": llm_config.llm,
-                "LLM Model": llm_config.model,
-                "Prompt format": llm_config.prompt_format,
-                "Response time": f"{seconds:.2f}s",
-                "Prompt tokens": "Not implemented yet",
-                "Completion tokens": "Not implemented yet",
-            }
+        # The hash code is only a short alias of the analysis, for display
+        hash_code = short_hash(system_prompt, text)
+        cache_context = self.get_cache_context(llm_config, field_values)
+        cache_key = self.build_cache_key(cache_context, text)
+        if self.near_duplicate_index is not None:
+            context_key = build_cache_key(cache_context)
+            signature = get_signature(text)
+
+        if read_from_cache or self.text_analysis_config.cache_read_policy == "always":
+            analysis_result = self.analysis_cache.get(
+                self.app_id,
+                self.locale,
+                cache_key,
+                max_age=self.text_analysis_config.cache_ttl,
+            )
+            if analysis_result is None and self.near_duplicate_index is not None:
+                analysis_result = self._get_near_duplicate(
+                    llm_config,
+                    context_key,
+                    signature,
+                    hash_code,
+                )
+            if analysis_result is not None:
+                return system_prompt, hash_code, cache_key, analysis_result
+            print_red(
+                f"No cached analysis {hash_code} - Sending text to analyze to LLM",
+            )
 
-            analysis_result[KEY_STATISTICS] = statistics
-            analysis_result[KEY_HASH_CODE] = hash_code
+        if self.near_duplicate_index is not None:
+            # Indexed before its result is known: the cache is looked up anyway when matched
+            self.near_duplicate_index.add(context_key, cache_key, signature)
 
-        # Joining with collection of intentions
-        # intention_id => intention_label, intention_fields
-        for scoring in analysis_result[FIELD_NAME_SCORINGS]:
-            scoring: dict[int, str]
+        return system_prompt, hash_code, cache_key, None
 
-            matching_intentions = [
-                intention
-                for intention in self.text_analysis_config.intentions
-                if intention.id == scoring.get("intention_id")
-            ]
-            if matching_intentions:
-                matching_intention: Intention = matching_intentions[0]
-                scoring["intention_label"] = matching_intention.label
-                scoring["intention_fields"] = [
-                    case_field.id
-                    for case_field in self.case_model.case_fields
-                    if matching_intention.id in case_field.intention_ids
-                ]
+    def build_repair_text(self, error: LlmValidationError) -> str:
+        """:return: The user message of the follow-up turn asking the LLM to correct its own answer"""
+        return (
+            f"## {self.localization.promptstring_previous_answer}\n{error.content}\n\n"
+            f"## {self.localization.promptstring_validation_errors}\n{error.errors}"
+        )
 
-        analysis_result[FIELD_NAME_SCORINGS] = [
-            scoring
-            for scoring in analysis_result[FIELD_NAME_SCORINGS]
-            if scoring.get("intention_label") is not None
-        ]
+    def _call_llm(
+        self,
+        llm_config: LlmConfig,
+        system_prompt: str,
+        text: str,
+        response_model: type[BaseModel] | None = None,
+    ) -> tuple[BaseModel, LlmUsage]:
+        llm: Llm = self.get_llm(llm_config)
+        rate_limiter: RateLimiter | None = self.llm_registry.get_rate_limiter(llm_config)
+        response_model = response_model or self.analysis_response_model
+        queue_wait = 0.0
+
+        def call(method: Any, system_prompt: str, text: str) -> tuple[BaseModel, LlmUsage]:
+            nonlocal queue_wait
+            if rate_limiter is not None:
+                queue_wait += rate_limiter.acquire(
+                    estimate_tokens(system_prompt) + estimate_tokens(text),
+                )
+            result, usage = method(response_model, system_prompt, text)
+            if rate_limiter is not None:
+                usage.queue_wait = queue_wait
+            return result, usage
 
-        self._ensure_fallback_intention(analysis_result)
+        if llm_config.response_format_type in ("json_object", "json_schema"):
+            try:
+                try:
+                    return call(llm.call_llm_with_json_schema, system_prompt, text)
+                except LlmValidationError as e:
+                    # A short follow-up turn instead of the full prompt and text again
+                    print_blue(f"Asking the LLM to repair its response: {e!s:.200}")
+                    return call(
+                        llm.call_llm_with_json_schema,
+                        self.localization.promptstring_repair_json,
+                        self.build_repair_text(e),
+                    )
+            except (ValueError, Exception) as e:
+                # Si la validation Pydantic échoue, propager l'erreur pour le retry/fallback
+                # L'erreur sera capturée par le mécanisme de retry dans LocalizedApp.analyze()
+                msg = f"LLM returned invalid format: {type(e).__name__}: {e!s}"
+                raise ValueError(
+                    msg,
+                ) from e
+        else:
+            return call(llm.call_llm_with_pydantic_model, system_prompt, text)
 
-        return system_prompt, analysis_result
+    async def _call_llm_async(
+        self,
+        llm_config: LlmConfig,
+        system_prompt: str,
+        text: str,
+        response_model: type[BaseModel] | None = None,
+        hedge_on_alternate: bool = True,
+    ) -> tuple[BaseModel, LlmUsage, LlmConfig]:
+        """:return: The result, the usage and the llm_config that served the call: the alternate llm_config
+        of the hedged calls when its call won. The calls of a multi-call analysis are only hedged on
+        llm_config itself (hedge_on_alternate=False), so that all of them are accounted to one llm_config.
+        """
+        if llm_config.hedge_percentile is not None:
+            return await self._call_llm_hedged_async(
+                llm_config,
+                system_prompt,
+                text,
+                response_model,
+                (
+                    self.llm_registry.get_hedge_llm_config(llm_config)
+                    if hedge_on_alternate
+                    else llm_config
+                ),
+            )
+        result, usage = await self._call_llm_once_async(
+            llm_config,
+            system_prompt,
+            text,
+            response_model,
+        )
+        return result, usage, llm_config
 
-    def _ensure_fallback_intention(self, analysis_result: dict[str, Any]) -> None:
-        """Guarantee presence of the fallback "other" intention, even for cached payloads."""
-        existing_ids = {
-            scoring.get("intention_id")
-            for scoring in analysis_result.get(FIELD_NAME_SCORINGS, [])
-        }
-        if "other" in existing_ids:
-            return
+    async def _call_llm_hedged_async(
+        self,
+        llm_config: LlmConfig,
+        system_prompt: str,
+        text: str,
+        response_model: type[BaseModel] | None,
+        hedge_llm_config: LlmConfig,
+    ) -> tuple[BaseModel, LlmUsage, LlmConfig]:
+        """Same as _call_llm_async() but a slow call is raced against a second identical one, sent to
+        hedge_llm_config.
+
+        The first valid result wins and the other call is cancelled. If both calls fail, the error of
+        the first one is raised.
+        """
+
+        async def timed_call(call_llm_config: LlmConfig) -> tuple[BaseModel, LlmUsage]:
+            before = time.monotonic()
+            try:
+                return await self._call_llm_once_async(
+                    call_llm_config,
+                    system_prompt,
+                    text,
+                    response_model,
+                )
+            finally:
+                # Also the calls that failed or were cancelled, at least as long as they ran: leaving out
+                # the slow ones would shrink the hedge delay and fire ever more hedges
+                self.llm_registry.record_latency(call_llm_config, time.monotonic() - before)
+
+        hedge_delay = self.llm_registry.get_hedge_delay(llm_config)
+        first = asyncio.ensure_future(timed_call(llm_config))
+        tasks: set[asyncio.Future] = {first}
+        try:
+            done, tasks = await asyncio.wait(tasks, timeout=hedge_delay)
+            hedge: asyncio.Future | None = None
+            if not done:
+                print_blue(f"No response from {llm_config.id} after {hedge_delay:.2f}s, hedging")
+                hedge = asyncio.ensure_future(timed_call(hedge_llm_config))
+                tasks.add(hedge)
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+            while True:
+                # The first call wins a tie
+                for task in sorted(done, key=lambda task: task is hedge):
+                    if task.exception() is None:
+                        result, usage = task.result()
+                        usage.hedges_fired = 0 if hedge is None else 1
+                        usage.hedges_won = 1 if task is hedge else 0
+                        return result, usage, hedge_llm_config if task is hedge else llm_config
+                if not tasks:
+                    raise first.exception()
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _call_llm_once_async(
+        self,
+        llm_config: LlmConfig,
+        system_prompt: str,
+        text: str,
+        response_model: type[BaseModel] | None = None,
+    ) -> tuple[BaseModel, LlmUsage]:
+        llm: Llm = self.get_llm(llm_config)
+        rate_limiter: RateLimiter | None = self.llm_registry.get_rate_limiter(llm_config)
+        response_model = response_model or self.analysis_response_model
+        queue_wait = 0.0
+
+        async def call(
+            method: Any,
+            system_prompt: str,
+            text: str,
+        ) -> tuple[BaseModel, LlmUsage]:
+            nonlocal queue_wait
+            if rate_limiter is not None:
+                queue_wait += await rate_limiter.acquire_async(
+                    estimate_tokens(system_prompt) + estimate_tokens(text),
+                )
+            result, usage = await method(response_model, system_prompt, text)
+            if rate_limiter is not None:
+                usage.queue_wait = queue_wait
+            return result, usage
 
-        intention_other = Intention(
-            id="other",
-            label=self.localization.label_intention_other,
-            description="Fallback",
+        if llm_config.response_format_type in ("json_object", "json_schema"):
+            try:
+                try:
+                    return await call(
+                        llm.call_llm_with_json_schema_async,
+                        system_prompt,
+                        text,
+                    )
+                except LlmValidationError as e:
+                    print_blue(f"Asking the LLM to repair its response: {e!s:.200}")
+                    return await call(
+                        llm.call_llm_with_json_schema_async,
+                        self.localization.promptstring_repair_json,
+                        self.build_repair_text(e),
+                    )
+            except (ValueError, Exception) as e:
+                # Same as _call_llm(): the retry/fallback is done by LocalizedApp.analyze_async()
+                msg = f"LLM returned invalid format: {type(e).__name__}: {e!s}"
+                raise ValueError(
+                    msg,
+                ) from e
+        else:
+            return await call(llm.call_llm_with_pydantic_model_async, system_prompt, text)
+
+    def _select_phase_two_intentions(self, intentions_result: BaseModel) -> list[str]:
+        """:return: The ids of the best scored intentions that have case fields to extract"""
+        scorings = sorted(
+            intentions_result.scorings,
+            key=lambda scoring: scoring.score,
+            reverse=True,
+        )
+        return [
+            scoring.intention_id
+            for scoring in scorings
+            if scoring.score > 0
+            and self.get_part_features(("features", scoring.intention_id))
+        ][:PHASE_TWO_INTENTIONS]
+
+    def _merge_phases(
+        self,
+        intentions_result: BaseModel,
+        features_results: list[BaseModel],
+    ) -> BaseModel:
+        """:return: The whole AnalysisResult made of the scorings of phase one and the features of phase two"""
+        merged: dict[str, Any] = intentions_result.model_dump()
+        # The best intention's extraction comes first and wins over the speculative one
+        for features_result in features_results:
+            for name, value in features_result.model_dump().items():
+                if merged.get(name) is None:
+                    merged[name] = value
+        return self.analysis_response_model.model_validate(merged)
+
+    def _call_llm_two_phase(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+    ) -> tuple[BaseModel, list[LlmUsage]]:
+        part = ("intentions",)
+        intentions_result, usage = self._call_llm(
+            llm_config,
+            self.build_system_prompt(llm_config, field_values, part),
+            text,
+            self.get_part_response_model(part),
         )
+        usages: list[LlmUsage] = [usage]
 
-        analysis_result.setdefault(FIELD_NAME_SCORINGS, []).append(
-            {
-                "intention_id": intention_other.id,
-                "score": 1,
-                "justification": intention_other.description,
-                "intention_label": intention_other.label,
-                "intention_fields": [],
-            },
+        # The extractions for the best intentions run in parallel, as in _call_llm_two_phase_async()
+        phase_two = self._call_llm_parts(
+            llm_config,
+            field_values,
+            text,
+            [
+                ("features", intention_id)
+                for intention_id in self._select_phase_two_intentions(intentions_result)
+            ],
         )
+        features_results: list[BaseModel] = []
+        for features_result, usage in phase_two:
+            features_results.append(features_result)
+            usages.append(usage)
 
-    def analyze(
+        return self._merge_phases(intentions_result, features_results), usages
+
+    async def _call_llm_two_phase_async(
         self,
-        locale: SupportedLocale,
         llm_config: LlmConfig,
         field_values: dict[str, Any],
         text: str,
-        read_from_cache: bool,
-    ) -> dict[str, str]:
+    ) -> tuple[BaseModel, list[LlmUsage]]:
+        part = ("intentions",)
+        intentions_result, usage, _llm_config = await self._call_llm_async(
+            llm_config,
+            self.build_system_prompt(llm_config, field_values, part),
+            text,
+            self.get_part_response_model(part),
+            hedge_on_alternate=False,
+        )
 
-        system_prompt, analysis_result = self._analyze(
+        # The extractions for the best intentions run in parallel: the runner-up one is speculative,
+        # ready for when the case ends up being handled under that intention
+        phase_two = await self._call_llm_parts_async(
             llm_config,
             field_values,
             text,
-            read_from_cache,
+            [
+                ("features", intention_id)
+                for intention_id in self._select_phase_two_intentions(intentions_result)
+            ],
         )
 
+        return self._merge_phases(
+            intentions_result,
+            [features_result for features_result, _usage in phase_two],
+        ), [usage] + [usage for _features_result, usage in phase_two]
+
+    def _call_llm_parts(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        parts: list[tuple[str, ...]],
+    ) -> list[tuple[BaseModel, LlmUsage]]:
+        """The calls run concurrently, at most max_concurrency of them at a time."""
+        if not parts:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(len(parts), llm_config.max_concurrency),
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda part: self._call_llm(
+                        llm_config,
+                        self.build_system_prompt(llm_config, field_values, part),
+                        text,
+                        self.get_part_response_model(part),
+                    ),
+                    parts,
+                ),
+            )
+
+    async def _call_llm_parts_async(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        parts: list[tuple[str, ...]],
+    ) -> list[tuple[BaseModel, LlmUsage]]:
+        """Same as _call_llm_parts() without blocking the event loop."""
+        return [
+            (result, usage)
+            for result, usage, _llm_config in await asyncio.gather(
+                *(
+                    self._call_llm_async(
+                        llm_config,
+                        self.build_system_prompt(llm_config, field_values, part),
+                        text,
+                        self.get_part_response_model(part),
+                        hedge_on_alternate=False,
+                    )
+                    for part in parts
+                ),
+            )
+        ]
+
+    def _call_llm_parallel(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+    ) -> tuple[BaseModel, list[LlmUsage]]:
+        (intentions_result, intentions_usage), (features_result, features_usage) = (
+            self._call_llm_parts(
+                llm_config,
+                field_values,
+                text,
+                self.get_analysis_parts(),
+            )
+        )
+        return self._merge_phases(intentions_result, [features_result]), [
+            intentions_usage,
+            features_usage,
+        ]
+
+    async def _call_llm_parallel_async(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+    ) -> tuple[BaseModel, list[LlmUsage]]:
+        (intentions_result, intentions_usage), (features_result, features_usage) = (
+            await self._call_llm_parts_async(
+                llm_config,
+                field_values,
+                text,
+                self.get_analysis_parts(),
+            )
+        )
+        return self._merge_phases(intentions_result, [features_result]), [
+            intentions_usage,
+            features_usage,
+        ]
+
+    def _record_usage(
+        self,
+        llm_config: LlmConfig,
+        usage: LlmUsage,
+        seconds: float,
+    ) -> float | None:
+        """:return: The cost of the call(s), None if unknown"""
+        if self.usage_statistics is None:
+            return None
+        return self.usage_statistics.record(
+            self.app_id,
+            self.locale,
+            llm_config,
+            usage,
+            seconds,
+        )
+
+    def _build_analysis_result(
+        self,
+        llm_config: LlmConfig,
+        _analysis_result: BaseModel,
+        usage: LlmUsage,
+        time_difference: timedelta,
+        hash_code: str,
+        packed_texts: int = 1,
+        llm_calls: int = 1,
+        cache_key: str | None = None,
+    ) -> dict[str, Any]:
+        seconds: float = time_difference.total_seconds()
+        if usage.queue_wait is not None:
+            # The time spent in the rate limiter queue is not the LLM's
+            seconds = max(0.0, seconds - usage.queue_wait)
+
+        analysis_result: dict[str, Any] = _analysis_result.model_dump(mode="json")
+
+        def not_available_if_none(value: Any) -> Any:
+            return value if value is not None else "N/A"
+
+        statistics: dict[str, Any] = {
+            "LLM config": llm_config.id,
+            "LLM": llm_config.llm,
+            "LLM Model": llm_config.model,
+            "Prompt format": llm_config.prompt_format,
+            "Prompt layout": llm_config.prompt_layout,
+            "Response time": f"{seconds:.2f}s",
+            "Prompt tokens": not_available_if_none(usage.prompt_tokens),
+            "Completion tokens": not_available_if_none(usage.completion_tokens),
+            "Cached tokens": not_available_if_none(usage.cached_tokens),
+        }
+        if usage.prompt_eval_duration is not None:
+            statistics["Prompt eval duration"] = f"{usage.prompt_eval_duration:.2f}s"
+        if usage.eval_duration is not None:
+            statistics["Eval duration"] = f"{usage.eval_duration:.2f}s"
+        if usage.queue_wait is not None:
+            statistics["Queue wait time"] = f"{usage.queue_wait:.2f}s"
+        if usage.hedges_fired is not None:
+            statistics["Hedges fired"] = usage.hedges_fired
+            statistics["Hedges won"] = usage.hedges_won
+        if llm_calls > 1:
+            statistics["LLM calls"] = llm_calls
+        if packed_texts > 1:
+            # The response time is the one of the whole packed call, the tokens are this text's share
+            statistics["Packed texts"] = packed_texts
+
+        cost: float | None = self._record_usage(llm_config, usage, seconds)
+        if cost is not None:
+            statistics["Cost"] = f"{cost:.6f}"
+
+        analysis_result[KEY_STATISTICS] = statistics
+        analysis_result[KEY_HASH_CODE] = hash_code
+        analysis_result[KEY_CACHE_KEY] = cache_key
+        return analysis_result
+
+    def _complete_scorings(self, analysis_result: dict[str, Any]) -> None:
+        """Add back the intentions left out by sparse scoring with a score of 0, and an empty justification
+        where the LLM was asked for none, so that the result looks like a full scoring.
+        """
+        scorings: list[dict[str, Any]] = analysis_result.setdefault(
+            FIELD_NAME_SCORINGS,
+            [],
+        )
+        for scoring in scorings:
+            scoring.setdefault("justification", "")
+
+        if self.text_analysis_config.is_sparse_scoring():
+            scored_ids = {scoring.get("intention_id") for scoring in scorings}
+            scorings.extend(
+                {"intention_id": intention.id, "score": 0, "justification": ""}
+                for intention in self.text_analysis_config.intentions
+                if intention.id not in scored_ids
+            )
+
+    def _join_intentions(self, analysis_result: dict[str, Any]) -> None:
+        self._complete_scorings(analysis_result)
+
+        # Joining with collection of intentions
+        # intention_id => intention_label, intention_fields
+        for scoring in analysis_result[FIELD_NAME_SCORINGS]:
+            scoring: dict[int, str]
+
+            matching_intentions = [
+                intention
+                for intention in self.text_analysis_config.intentions
+                if intention.id == scoring.get("intention_id")
+            ]
+            if matching_intentions:
+                matching_intention: Intention = matching_intentions[0]
+                scoring["intention_label"] = matching_intention.label
+                scoring["intention_fields"] = [
+                    case_field.id
+                    for case_field in self.case_model.case_fields
+                    if matching_intention.id in case_field.intention_ids
+                ]
+
+        analysis_result[FIELD_NAME_SCORINGS] = [
+            scoring
+            for scoring in analysis_result[FIELD_NAME_SCORINGS]
+            if scoring.get("intention_label") is not None
+        ]
+
+        self._ensure_fallback_intention(analysis_result)
+
+    def _call_llm_with_mode(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+    ) -> tuple[BaseModel, list[LlmUsage], LlmConfig]:
+        """Call the LLM as required by the analysis mode.
+
+        :return: The result, the usages of the calls and the llm_config that served them: llm_config
+        itself, the calls are only hedged by _call_llm_with_mode_async()
+        """
+        if self.text_analysis_config.analysis_mode == "two_phase":
+            return *self._call_llm_two_phase(llm_config, field_values, text), llm_config
+        if self.text_analysis_config.analysis_mode == "parallel" and self.features:
+            return *self._call_llm_parallel(llm_config, field_values, text), llm_config
+        _analysis_result, usage = self._call_llm(llm_config, system_prompt, text)
+        return _analysis_result, [usage], llm_config
+
+    async def _call_llm_with_mode_async(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+    ) -> tuple[BaseModel, list[LlmUsage], LlmConfig]:
+        """Same as _call_llm_with_mode() without blocking the event loop, the single calls being hedged:
+        the llm_config that served them is the one returned by _call_llm_async().
+        """
+        if self.text_analysis_config.analysis_mode == "two_phase":
+            return *await self._call_llm_two_phase_async(llm_config, field_values, text), llm_config
+        if self.text_analysis_config.analysis_mode == "parallel" and self.features:
+            return *await self._call_llm_parallel_async(llm_config, field_values, text), llm_config
+        _analysis_result, usage, served_llm_config = await self._call_llm_async(
+            llm_config,
+            system_prompt,
+            text,
+        )
+        return _analysis_result, [usage], served_llm_config
+
+    def get_cascade_llm_config(self, llm_config: LlmConfig) -> LlmConfig | None:
+        """:return: The llm_config to try before llm_config, None if the app does not cascade"""
+        cascade_llm_config_id = self.text_analysis_config.cascade_llm_config_id
+        if cascade_llm_config_id is None or cascade_llm_config_id == llm_config.id:
+            return None
+        cascade_llm_config = self.llm_registry.llm_configs.get(cascade_llm_config_id)
+        if cascade_llm_config is None:
+            msg = f"Unknown cascade_llm_config_id of {self.app_id}: {cascade_llm_config_id}"
+            raise LlmConfigurationError(msg)
+        return cascade_llm_config
+
+    def get_escalation_reason(self, _analysis_result: BaseModel) -> str | None:
+        """:return: Why the result of the cascade llm_config is not trusted, None if it is"""
+        scores = sorted(
+            (scoring.score for scoring in _analysis_result.scorings),
+            reverse=True,
+        ) + [0, 0]
+        if scores[0] < self.text_analysis_config.cascade_min_score:
+            return "Low score"
+        if scores[0] - scores[1] < self.text_analysis_config.cascade_min_margin:
+            return "Small margin"
+        return None
+
+    def _record_cascade(
+        self,
+        analysis_result: dict[str, Any],
+        llm_config: LlmConfig,
+        escalation_reason: str | None,
+    ) -> None:
+        analysis_result[KEY_STATISTICS]["Cascade"] = (
+            f"Escalated ({escalation_reason})" if escalation_reason else "Not escalated"
+        )
+        if self.usage_statistics is not None:
+            self.usage_statistics.record_cascade(
+                self.app_id,
+                self.locale,
+                llm_config,
+                escalation_reason is not None,
+            )
+
+    def get_pre_router_llm_config(self, llm_config: LlmConfig) -> LlmConfig | None:
+        """:return: The llm_config scoring the texts before llm_config, None if the app has no pre-router"""
+        pre_router_llm_config_id = self.text_analysis_config.pre_router_llm_config_id
+        if pre_router_llm_config_id is None or pre_router_llm_config_id == llm_config.id:
+            return None
+        pre_router_llm_config = self.llm_registry.llm_configs.get(pre_router_llm_config_id)
+        if pre_router_llm_config is None:
+            msg = f"Unknown pre_router_llm_config_id of {self.app_id}: {pre_router_llm_config_id}"
+            raise LlmConfigurationError(msg)
+        return pre_router_llm_config
+
+    @staticmethod
+    def get_best_intention_id(_analysis_result: BaseModel) -> str | None:
+        best_scoring = max(
+            _analysis_result.scorings,
+            key=lambda scoring: scoring.score,
+            default=None,
+        )
+        return best_scoring.intention_id if best_scoring is not None else None
+
+    def get_forward_reason(self, _analysis_result: BaseModel) -> str | None:
+        """:return: Why the result of the pre-router cannot be served without the LLM, None if it can"""
+        best_intention_id = self.get_best_intention_id(_analysis_result)
+        intention = next(
+            (
+                intention
+                for intention in self.text_analysis_config.intentions
+                if intention.id == best_intention_id
+            ),
+            None,
+        )
+        if intention is None or intention.pre_router_min_score is None:
+            return "Intention not pre-routed"
+        best_score = max(scoring.score for scoring in _analysis_result.scorings)
+        if best_score < intention.pre_router_min_score:
+            return "Low score"
+        if self.get_part_features(("features", intention.id)):
+            return "Fields to extract"
+        return None
+
+    def _record_pre_routing(
+        self,
+        analysis_result: dict[str, Any],
+        llm_config: LlmConfig,
+        forward_reason: str | None,
+    ) -> None:
+        analysis_result[KEY_STATISTICS]["Pre-router"] = (
+            f"Forwarded ({forward_reason})" if forward_reason else "Bypassed"
+        )
+        if self.usage_statistics is not None:
+            self.usage_statistics.record_pre_routing(
+                self.app_id,
+                self.locale,
+                llm_config,
+                forward_reason is None,
+            )
+
+    def _shadow_analyze(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+        intention_id: str | None,
+    ) -> None:
+        """Analyze a bypassed text with the LLM anyway and record whether it agrees with the pre-router."""
+        before = datetime.now()
+        try:
+            _analysis_result, usages, _llm_config = self._call_llm_with_mode(
+                llm_config,
+                field_values,
+                text,
+                system_prompt,
+            )
+        except Exception as e:
+            print_red(f"Pre-router shadow analysis failed: {type(e).__name__}: {e!s:.200}")
+            return
+        self._record_usage(
+            llm_config,
+            LlmUsage.total(usages),
+            (datetime.now() - before).total_seconds(),
+        )
+        self._record_self_training_example(llm_config, _analysis_result, text)
+        if self.usage_statistics is not None:
+            self.usage_statistics.record_shadow(
+                self.app_id,
+                self.locale,
+                llm_config,
+                self.get_best_intention_id(_analysis_result) == intention_id,
+            )
+
+    def _start_shadow_analysis(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+        intention_id: str | None,
+    ) -> threading.Thread:
+        # In a thread, so that neither the response nor the event loop wait for the LLM
+        thread = threading.Thread(
+            target=self._shadow_analyze,
+            args=(llm_config, field_values, text, system_prompt, intention_id),
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def get_self_training_filename(self) -> str:
+        return get_self_training_file_path(self.runtime_directory, self.app_id, self.locale)
+
+    def get_self_training_intention_id(
+        self,
+        llm_config: LlmConfig,
+        _analysis_result: BaseModel,
+    ) -> str | None:
+        """:return: The best intention if the text is to be collected, the LLM having scored it with
+        confidence, otherwise None
+        """
+        if not self.text_analysis_config.self_training or llm_config.llm == "local":
+            return None
+        scorings = sorted(
+            _analysis_result.scorings,
+            key=lambda scoring: scoring.score,
+            reverse=True,
+        )
+        if not scorings or scorings[0].score < self.text_analysis_config.self_training_min_score:
+            return None
+        if len(scorings) > 1 and scorings[1].score == scorings[0].score:
+            return None
+        return scorings[0].intention_id
+
+    def _record_self_training_example(
+        self,
+        llm_config: LlmConfig,
+        _analysis_result: BaseModel,
+        text: str,
+    ) -> None:
+        """Collect the text with its best intention if the LLM scored it with confidence."""
+        intention_id = self.get_self_training_intention_id(llm_config, _analysis_result)
+        if intention_id is not None:
+            record_example(
+                self.get_self_training_filename(),
+                intention_id,
+                text,
+                self.text_analysis_config.self_training_max_examples,
+            )
+
+    async def _record_self_training_example_async(
+        self,
+        llm_config: LlmConfig,
+        _analysis_result: BaseModel,
+        text: str,
+    ) -> None:
+        """Same as _record_self_training_example() without blocking the event loop on the file."""
+        if self.get_self_training_intention_id(llm_config, _analysis_result) is not None:
+            await asyncio.to_thread(
+                self._record_self_training_example,
+                llm_config,
+                _analysis_result,
+                text,
+            )
+
+    def _write_through(self, cache_key: str, analysis_result: dict[str, Any]) -> None:
+        """Store a result of the LLM in the analysis cache if the app caches them on its own.
+
+        The results of the pre-router are not stored: they are cheap to compute again, and would keep being
+        served after the pre-router is retrained.
+        """
+        if not self.text_analysis_config.cache_write_through:
+            return
+        try:
+            self.analysis_cache.put(self.app_id, self.locale, cache_key, analysis_result)
+        except Exception as e:
+            # The analysis is served all the same, only not cached
+            print_red(f"Caching of analysis {cache_key} failed: {type(e).__name__}: {e!s:.200}")
+
+    def _pre_route(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+        hash_code: str,
+        cache_key: str,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """Score the text with the pre-router of the app, if any.
+
+        :return: The analysis result if the LLM can be bypassed, otherwise None and why the text is
+        forwarded to the LLM (None and None without pre-router)
+        """
+        pre_router_llm_config = self.get_pre_router_llm_config(llm_config)
+        if pre_router_llm_config is None:
+            return None, None
+
+        before = datetime.now()
+        try:
+            _analysis_result, usage = self._call_llm(
+                pre_router_llm_config,
+                self.build_system_prompt(pre_router_llm_config, field_values),
+                text,
+            )
+        except Exception as e:
+            print_blue(f"Pre-router: forwarding after {type(e).__name__}: {e!s:.200}")
+            return None, "Invalid response"
+        return self._get_pre_routing_result(
+            llm_config,
+            pre_router_llm_config,
+            field_values,
+            text,
+            system_prompt,
+            hash_code,
+            cache_key,
+            _analysis_result,
+            usage,
+            datetime.now() - before,
+        )
+
+    async def _pre_route_async(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+        hash_code: str,
+        cache_key: str,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """Same as _pre_route() without blocking the event loop."""
+        pre_router_llm_config = self.get_pre_router_llm_config(llm_config)
+        if pre_router_llm_config is None:
+            return None, None
+
+        before = datetime.now()
+        try:
+            _analysis_result, usage, pre_router_llm_config = await self._call_llm_async(
+                pre_router_llm_config,
+                self.build_system_prompt(pre_router_llm_config, field_values),
+                text,
+            )
+        except Exception as e:
+            print_blue(f"Pre-router: forwarding after {type(e).__name__}: {e!s:.200}")
+            return None, "Invalid response"
+        return self._get_pre_routing_result(
+            llm_config,
+            pre_router_llm_config,
+            field_values,
+            text,
+            system_prompt,
+            hash_code,
+            cache_key,
+            _analysis_result,
+            usage,
+            datetime.now() - before,
+        )
+
+    def _get_pre_routing_result(
+        self,
+        llm_config: LlmConfig,
+        pre_router_llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        system_prompt: str,
+        hash_code: str,
+        cache_key: str,
+        _analysis_result: BaseModel,
+        usage: LlmUsage,
+        time_difference: timedelta,
+    ) -> tuple[dict[str, Any] | None, str | None]:
+        """:return: The result of the pre-router if the LLM can be bypassed, otherwise None and why the text
+        is forwarded to the LLM
+        """
+        forward_reason = self.get_forward_reason(_analysis_result)
+        if forward_reason is not None:
+            self._record_usage(
+                pre_router_llm_config,
+                usage,
+                time_difference.total_seconds(),
+            )
+            return None, forward_reason
+
+        analysis_result = self._build_analysis_result(
+            pre_router_llm_config,
+            _analysis_result,
+            usage,
+            time_difference,
+            hash_code,
+            cache_key=cache_key,
+        )
+        self._record_pre_routing(analysis_result, llm_config, None)
+        if random.random() < self.text_analysis_config.pre_router_shadow_rate:
+            self._start_shadow_analysis(
+                llm_config,
+                field_values,
+                text,
+                system_prompt,
+                self.get_best_intention_id(_analysis_result),
+            )
+        return analysis_result, None
+
+    def _check_cascade_result(
+        self,
+        cascade_llm_config: LlmConfig,
+        _analysis_result: BaseModel,
+        usages: list[LlmUsage],
+        time_difference: timedelta,
+    ) -> str | None:
+        """:return: Why the result of the cascade llm_config is not trusted, None if it is. The usage of an
+        untrusted result is recorded here, as it will not be part of the analysis result
+        """
+        escalation_reason = self.get_escalation_reason(_analysis_result)
+        if escalation_reason is not None:
+            self._record_usage(
+                cascade_llm_config,
+                LlmUsage.total(usages),
+                time_difference.total_seconds(),
+            )
+        return escalation_reason
+
+    def _complete_analysis(
+        self,
+        llm_config: LlmConfig,
+        called_llm_config: LlmConfig,
+        served_llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        _analysis_result: BaseModel,
+        usages: list[LlmUsage],
+        time_difference: timedelta,
+        hash_code: str,
+        cache_key: str,
+        escalation_reason: str | None,
+        forward_reason: str | None,
+    ) -> tuple[str, dict[str, Any]]:
+        """Build the analysis result of the LLM call(s) to called_llm_config (llm_config or its cascade
+        llm_config), served by served_llm_config, and record how it was obtained.
+
+        :return: The key to cache it under (see _get_served_cache_key()) and the analysis result
+        """
+        cache_key = self._get_served_cache_key(
+            called_llm_config,
+            served_llm_config,
+            field_values,
+            text,
+            cache_key,
+        )
+        analysis_result = self._build_analysis_result(
+            served_llm_config,
+            _analysis_result,
+            LlmUsage.total(usages),
+            time_difference,
+            hash_code,
+            llm_calls=len(usages),
+            cache_key=cache_key,
+        )
+        if self.get_cascade_llm_config(llm_config) is not None:
+            self._record_cascade(analysis_result, llm_config, escalation_reason)
+        if forward_reason is not None:
+            self._record_pre_routing(analysis_result, llm_config, forward_reason)
+        return cache_key, analysis_result
+
+    def _analyze(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+    ) -> tuple[str, dict[str, str]]:
+
+        system_prompt, hash_code, cache_key, analysis_result = self._prepare_analysis(
+            llm_config,
+            field_values,
+            text,
+            read_from_cache,
+        )
+
+        forward_reason: str | None = None
+        if analysis_result is None:
+            analysis_result, forward_reason = self._pre_route(
+                llm_config,
+                field_values,
+                text,
+                system_prompt,
+                hash_code,
+                cache_key,
+            )
+
+        if analysis_result is None:
+            # Calling LLM
+            before = datetime.now()
+            cascade_llm_config = self.get_cascade_llm_config(llm_config)
+            escalation_reason: str | None = None
+            if cascade_llm_config is not None:
+                cascade_before = datetime.now()
+                try:
+                    _analysis_result, usages, served_llm_config = self._call_llm_with_mode(
+                        cascade_llm_config,
+                        field_values,
+                        text,
+                        self.build_system_prompt(cascade_llm_config, field_values),
+                    )
+                except Exception as e:
+                    print_blue(f"Cascade: escalating after {type(e).__name__}: {e!s:.200}")
+                    escalation_reason = "Invalid response"
+                else:
+                    escalation_reason = self._check_cascade_result(
+                        served_llm_config,
+                        _analysis_result,
+                        usages,
+                        datetime.now() - cascade_before,
+                    )
+
+            called_llm_config = cascade_llm_config
+            if cascade_llm_config is None or escalation_reason is not None:
+                called_llm_config = llm_config
+                _analysis_result, usages, served_llm_config = self._call_llm_with_mode(
+                    llm_config,
+                    field_values,
+                    text,
+                    system_prompt,
+                )
+            cache_key, analysis_result = self._complete_analysis(
+                llm_config,
+                called_llm_config,
+                served_llm_config,
+                field_values,
+                text,
+                _analysis_result,
+                usages,
+                datetime.now() - before,
+                hash_code,
+                cache_key,
+                escalation_reason,
+                forward_reason,
+            )
+            self._record_self_training_example(served_llm_config, _analysis_result, text)
+            self._write_through(cache_key, analysis_result)
+
+        self._join_intentions(analysis_result)
+
+        return system_prompt, analysis_result
+
+    async def _analyze_async(
+        self,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+    ) -> tuple[str, dict[str, str]]:
+
+        # The reads and writes of the analysis cache (SQLite, JSON files) run in threads, not to block
+        # the event loop
+        system_prompt, hash_code, cache_key, analysis_result = await asyncio.to_thread(
+            self._prepare_analysis,
+            llm_config,
+            field_values,
+            text,
+            read_from_cache,
+        )
+
+        forward_reason: str | None = None
+        if analysis_result is None:
+            analysis_result, forward_reason = await self._pre_route_async(
+                llm_config,
+                field_values,
+                text,
+                system_prompt,
+                hash_code,
+                cache_key,
+            )
+
+        if analysis_result is None:
+            # Calling LLM without blocking the event loop
+            before = datetime.now()
+            cascade_llm_config = self.get_cascade_llm_config(llm_config)
+            escalation_reason: str | None = None
+            if cascade_llm_config is not None:
+                cascade_before = datetime.now()
+                try:
+                    (
+                        _analysis_result,
+                        usages,
+                        served_llm_config,
+                    ) = await self._call_llm_with_mode_async(
+                        cascade_llm_config,
+                        field_values,
+                        text,
+                        self.build_system_prompt(cascade_llm_config, field_values),
+                    )
+                except Exception as e:
+                    print_blue(f"Cascade: escalating after {type(e).__name__}: {e!s:.200}")
+                    escalation_reason = "Invalid response"
+                else:
+                    escalation_reason = self._check_cascade_result(
+                        served_llm_config,
+                        _analysis_result,
+                        usages,
+                        datetime.now() - cascade_before,
+                    )
+
+            called_llm_config = cascade_llm_config
+            if cascade_llm_config is None or escalation_reason is not None:
+                called_llm_config = llm_config
+                (
+                    _analysis_result,
+                    usages,
+                    served_llm_config,
+                ) = await self._call_llm_with_mode_async(
+                    llm_config,
+                    field_values,
+                    text,
+                    system_prompt,
+                )
+            cache_key, analysis_result = self._complete_analysis(
+                llm_config,
+                called_llm_config,
+                served_llm_config,
+                field_values,
+                text,
+                _analysis_result,
+                usages,
+                datetime.now() - before,
+                hash_code,
+                cache_key,
+                escalation_reason,
+                forward_reason,
+            )
+            await self._record_self_training_example_async(
+                served_llm_config,
+                _analysis_result,
+                text,
+            )
+            await asyncio.to_thread(self._write_through, cache_key, analysis_result)
+
+        self._join_intentions(analysis_result)
+
+        return system_prompt, analysis_result
+
+    async def _analyze_packed_async(
+        self,
+        llm_config: LlmConfig,
+        texts: list[tuple[dict[str, Any], str]],
+        read_from_cache: bool,
+    ) -> list[tuple[str, dict[str, Any]] | None]:
+        prepared = await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    self._prepare_analysis,
+                    llm_config,
+                    field_values,
+                    text,
+                    read_from_cache,
+                )
+                for field_values, text in texts
+            ),
+        )
+        results: list[tuple[str, dict[str, Any]] | None] = [
+            (system_prompt, analysis_result) if analysis_result is not None else None
+            for system_prompt, _hash_code, _cache_key, analysis_result in prepared
+        ]
+        pending: list[int] = []
+        for index, result in enumerate(results):
+            if result is None:
+                pending.append(index)
+            else:
+                self._join_intentions(result[1])
+
+        if len(pending) == 1 or not self.can_pack(llm_config):
+            for index in pending:
+                field_values, text = texts[index]
+                results[index] = await self._analyze_async(
+                    llm_config,
+                    field_values,
+                    text,
+                    read_from_cache=False,
+                )
+            return results
+
+        if pending:
+            system_prompt = prepared[pending[0]][0]
+            if any(prepared[index][0] != system_prompt for index in pending):
+                msg = "Only texts with the same system prompt can be packed together"
+                raise ValueError(msg)
+
+            before = datetime.now()
+            packed_analysis_results, usage, served_llm_config = await self._call_llm_async(
+                llm_config,
+                self.build_packed_system_prompt(llm_config, system_prompt),
+                self.build_packed_text([texts[index][1] for index in pending]),
+                self.packed_analysis_response_model,
+            )
+            time_difference = datetime.now() - before
+
+            # Split the packed response back per text; the texts the LLM skipped stay None
+            analysis_results_by_text_index: dict[int, BaseModel] = {}
+            for indexed_analysis_result in packed_analysis_results.results:
+                analysis_results_by_text_index.setdefault(
+                    indexed_analysis_result.text_index,
+                    indexed_analysis_result,
+                )
+            usages = usage.split(len(pending))
+            for text_index, index in enumerate(pending):
+                indexed_analysis_result = analysis_results_by_text_index.get(text_index)
+                if indexed_analysis_result is None:
+                    continue
+                _analysis_result = self.analysis_response_model.model_validate(
+                    indexed_analysis_result.model_dump(exclude={"text_index"}),
+                )
+                cache_key = self._get_served_cache_key(
+                    llm_config,
+                    served_llm_config,
+                    texts[index][0],
+                    texts[index][1],
+                    prepared[index][2],
+                )
+                analysis_result = self._build_analysis_result(
+                    served_llm_config,
+                    _analysis_result,
+                    usages[text_index],
+                    time_difference,
+                    prepared[index][1],
+                    packed_texts=len(pending),
+                    cache_key=cache_key,
+                )
+                await asyncio.to_thread(self._write_through, cache_key, analysis_result)
+                self._join_intentions(analysis_result)
+                await self._record_self_training_example_async(
+                    served_llm_config,
+                    _analysis_result,
+                    texts[index][1],
+                )
+                results[index] = (system_prompt, analysis_result)
+
+        return results
+
+    def _ensure_fallback_intention(self, analysis_result: dict[str, Any]) -> None:
+        """Guarantee presence of the fallback "other" intention, even for cached payloads."""
+        existing_ids = {
+            scoring.get("intention_id")
+            for scoring in analysis_result.get(FIELD_NAME_SCORINGS, [])
+        }
+        if "other" in existing_ids:
+            return
+
+        intention_other = Intention(
+            id="other",
+            label=self.localization.label_intention_other,
+            description="Fallback",
+        )
+
+        analysis_result.setdefault(FIELD_NAME_SCORINGS, []).append(
+            {
+                "intention_id": intention_other.id,
+                "score": 1,
+                "justification": intention_other.description,
+                "intention_label": intention_other.label,
+                "intention_fields": [],
+            },
+        )
+
+    def _build_response(
+        self,
+        locale: SupportedLocale,
+        text: str,
+        system_prompt: str,
+        analysis_result: dict[str, Any],
+    ) -> dict[str, str]:
         return {
             KEY_ANALYSIS_RESULT: analysis_result,  # json.dumps(analysis_result),
             KEY_PROMPT: system_prompt,
@@ -508,3 +2170,60 @@ class TextAnalyzer:
                 analysis_result,
             ),
         }
+
+    def analyze(
+        self,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+    ) -> dict[str, str]:
+
+        system_prompt, analysis_result = self._analyze(
+            llm_config,
+            field_values,
+            text,
+            read_from_cache,
+        )
+
+        return self._build_response(locale, text, system_prompt, analysis_result)
+
+    async def analyze_packed_async(
+        self,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        texts: list[tuple[dict[str, Any], str]],
+        read_from_cache: bool,
+    ) -> list[dict[str, str] | None]:
+        """Analyze a pack of (field_values, text) planned by plan_packs() in a single LLM call.
+
+        Each text gets the same hash code as when analyzed alone, so that the cache entries are shared.
+        If llm_config cannot pack (see can_pack()), the texts are analyzed one by one.
+
+        :return: The response for each text, None for the texts missing from the LLM response
+        """
+        results = await self._analyze_packed_async(llm_config, texts, read_from_cache)
+
+        return [
+            self._build_response(locale, text, *result) if result is not None else None
+            for (_field_values, text), result in zip(texts, results)
+        ]
+
+    async def analyze_async(
+        self,
+        locale: SupportedLocale,
+        llm_config: LlmConfig,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+    ) -> dict[str, str]:
+
+        system_prompt, analysis_result = await self._analyze_async(
+            llm_config,
+            field_values,
+            text,
+            read_from_cache,
+        )
+
+        return self._build_response(locale, text, system_prompt, analysis_result)
@@ -52,6 +52,31 @@ class ApiClientRest(ApiClient):
     def get_app_ids(self) -> list[str]:
         return self.get("app_ids")
 
+    def get_usage_statistics(self, app_id: str | None = None) -> list[dict[str, Any]]:
+        url = f"{self.base_url}/{API_ROUTE_V2}/usage_statistics"
+        params = {"app_id": app_id} if app_id is not None else None
+        response = requests.get(url, params=params, timeout=self._timeout)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+
+    def get_circuit_breakers(self) -> list[dict[str, Any]]:
+        url = f"{self.base_url}/{API_ROUTE_V2}/circuit_breakers"
+        response = requests.get(url, timeout=self._timeout)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+
+    def get_analysis_cache_statistics(self) -> list[dict[str, Any]]:
+        url = f"{self.base_url}/{API_ROUTE_V2}/analysis_cache_statistics"
+        response = requests.get(url, timeout=self._timeout)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return None
+
     def get_locales(self, app_id: str) -> list[SupportedLocale]:
         return self.get("locales", app_id)
 
@@ -6,3 +6,4 @@ KEY_MARKDOWN_TABLE = "markdown_table"
 KEY_HIGHLIGHTED_TEXT_AND_FEATURES = "highlighted_text_and_features"
 KEY_STATISTICS = "statistics"
 KEY_HASH_CODE = "hash_code"
+KEY_CACHE_KEY = "cache_key"
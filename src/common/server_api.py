@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Literal
+from typing import TYPE_CHECKING, Any, AsyncIterator, Literal
 
 from pydantic import BaseModel
 
@@ -10,6 +11,11 @@ if TYPE_CHECKING:
     from src.common.config import SupportedLocale
 
 
+class AnalyzeBatchItem(BaseModel):
+    text: str
+    field_values: dict[str, Any] = {}
+
+
 class CaseHandlingRequest(BaseModel):
     intention_id: str
     field_values: dict[str, Any]  # rename case field values
@@ -63,6 +69,18 @@ class ServerApi(ABC):
     def get_app_ids(self) -> list[str]:
         pass
 
+    @abstractmethod
+    def get_usage_statistics(self, app_id: str | None = None) -> list[dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def get_circuit_breakers(self) -> list[dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def get_analysis_cache_statistics(self) -> list[dict[str, Any]]:
+        pass
+
     @abstractmethod
     def get_locales(self, app_id: str) -> list[SupportedLocale]:
         pass
@@ -103,6 +121,55 @@ class ServerApi(ABC):
     ) -> dict[str, Any]:
         pass
 
+    async def analyze_async(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        field_values: dict[str, Any],
+        text: str,
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> dict[str, Any]:
+        # Default for implementations without a native asyncio path: run analyze() in a worker thread
+        return await asyncio.to_thread(
+            self.analyze,
+            app_id,
+            locale,
+            field_values,
+            text,
+            read_from_cache,
+            llm_config_id,
+        )
+
+    async def analyze_batch(
+        self,
+        app_id: str,
+        locale: SupportedLocale,
+        items: list[AnalyzeBatchItem],
+        read_from_cache: bool,
+        llm_config_id: str,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Analyze several texts, yielding {"index": ..., "result": ...} or {"index": ..., "error": ...}
+        for each item, in completion order.
+        """
+        # Default for implementations without concurrent fan-out: one item after the other
+        for index, item in enumerate(items):
+            try:
+                result = await self.analyze_async(
+                    app_id,
+                    locale,
+                    dict(item.field_values),
+                    item.text,
+                    read_from_cache,
+                    llm_config_id,
+                )
+                yield {"index": index, "result": result}
+            except Exception as e:
+                yield {
+                    "index": index,
+                    "error": {"error_type": type(e).__name__, "error_message": str(e)},
+                }
+
     @abstractmethod
     def save_text_analysis_cache(
         self,
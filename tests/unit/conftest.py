@@ -0,0 +1,58 @@
+"""Fixtures communes aux tests unitaires de TextAnalyzer."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.backend.text_analysis.llm import LlmUsage
+from src.backend.text_analysis.text_analyzer import TextAnalyzer
+
+
+@pytest.fixture()
+def make_analyzer(sample_case_model, sample_text_analysis_config, temp_runtime_directory):
+    """Fixture pour fabriquer un TextAnalyzer de test.
+
+    Les arguments nommés autres que case_model et usage_statistics remplacent les champs de
+    sample_text_analysis_config.
+    """
+
+    def make_analyzer(case_model=None, usage_statistics=None, **text_analysis_config_updates):
+        return TextAnalyzer(
+            runtime_directory=temp_runtime_directory,
+            app_id="test_app",
+            locale="fr",
+            case_model=case_model or sample_case_model,
+            text_analysis_config=sample_text_analysis_config.model_copy(
+                update=text_analysis_config_updates,
+            ),
+            usage_statistics=usage_statistics,
+        )
+
+    return make_analyzer
+
+
+@pytest.fixture()
+def analyzer(request, make_analyzer):
+    """Fixture pour TextAnalyzer.
+
+    Paramétrable de façon indirecte par les champs de TextAnalysisConfig à remplacer, par exemple
+    @pytest.mark.parametrize("analyzer", [{"analysis_mode": "parallel"}], indirect=True).
+    """
+    return make_analyzer(**getattr(request, "param", {}))
+
+
+@pytest.fixture()
+def mock_llm_instance():
+    """Fixture pour un LLM OpenAI simulé, qui répond toujours intention1 et le nom Dupont."""
+    mock_llm_instance = Mock()
+    mock_result = Mock()
+    mock_result.model_dump.return_value = {
+        "scorings": [{"intention_id": "intention1", "score": 8, "justification": ""}],
+        "nom": "Dupont",
+    }
+    mock_llm_instance.call_llm_with_json_schema.return_value = (mock_result, LlmUsage())
+    with patch(
+        "src.backend.text_analysis.llm_registry.LlmOpenAI",
+        return_value=mock_llm_instance,
+    ):
+        yield mock_llm_instance
@@ -0,0 +1,247 @@
+"""Tests unitaires pour les backends du cache des analyses."""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.backend.text_analysis.analysis_cache import (
+    CACHE_KEY_VERSION,
+    AnalysisCacheConfig,
+    JsonFilesAnalysisCache,
+    SqliteAnalysisCache,
+    TieredAnalysisCache,
+    build_analysis_cache,
+    build_cache_key,
+    import_json_files,
+)
+
+ANALYSIS_RESULT = {"scorings": [{"intention_id": "asile", "score": 9}], "hash_code": "abcdef"}
+
+
+@pytest.fixture()
+def sqlite_cache(tmp_path):
+    analysis_cache = SqliteAnalysisCache(str(tmp_path / "cache" / "analysis_cache.sqlite3"))
+    yield analysis_cache
+    analysis_cache.close()
+
+
+class TestSqliteAnalysisCache:
+    """Tests pour SqliteAnalysisCache."""
+
+    def test_get_put(self, sqlite_cache) -> None:
+        assert sqlite_cache.get("app", "fr", "abcdef") is None
+
+        sqlite_cache.put("app", "fr", "abcdef", ANALYSIS_RESULT)
+
+        assert sqlite_cache.get("app", "fr", "abcdef") == ANALYSIS_RESULT
+        assert sqlite_cache.get("app", "en", "abcdef") is None
+        assert sqlite_cache.get("other_app", "fr", "abcdef") is None
+
+    def test_replace(self, sqlite_cache) -> None:
+        sqlite_cache.put("app", "fr", "abcdef", ANALYSIS_RESULT)
+        sqlite_cache.put("app", "fr", "abcdef", {"scorings": []})
+
+        assert sqlite_cache.get("app", "fr", "abcdef") == {"scorings": []}
+        assert sqlite_cache.count() == 1
+
+    def test_persistence(self, sqlite_cache) -> None:
+        sqlite_cache.put("app", "fr", "abcdef", ANALYSIS_RESULT)
+        sqlite_cache.close()
+
+        reopened = SqliteAnalysisCache(sqlite_cache.filename)
+        try:
+            assert reopened.get("app", "fr", "abcdef") == ANALYSIS_RESULT
+        finally:
+            reopened.close()
+
+    def test_ttl(self, sqlite_cache) -> None:
+        sqlite_cache.ttl = 60
+        with patch("src.backend.text_analysis.analysis_cache.time.time", return_value=1000.0):
+            sqlite_cache.put("app", "fr", "abcdef", ANALYSIS_RESULT)
+        with patch("src.backend.text_analysis.analysis_cache.time.time", return_value=1059.0):
+            assert sqlite_cache.get("app", "fr", "abcdef") == ANALYSIS_RESULT
+        with patch("src.backend.text_analysis.analysis_cache.time.time", return_value=1061.0):
+            assert sqlite_cache.get("app", "fr", "abcdef") is None
+        assert sqlite_cache.count() == 0
+
+    def test_max_age(self, sqlite_cache) -> None:
+        """Test qu'une entrée plus vieille que max_age n'est pas servie, sans être supprimée."""
+        sqlite_cache.put("app", "fr", "abcdef", ANALYSIS_RESULT, created_at=1000.0)
+        with patch("src.backend.text_analysis.analysis_cache.time.time", return_value=1061.0):
+            assert sqlite_cache.get("app", "fr", "abcdef", max_age=60) is None
+            assert sqlite_cache.get("app", "fr", "abcdef", max_age=120) == ANALYSIS_RESULT
+        assert sqlite_cache.count() == 1
+
+    def test_lru_eviction(self, sqlite_cache) -> None:
+        """Test que les entrées les moins récemment utilisées sont évincées au-delà de max_entries."""
+        sqlite_cache.max_entries = 2
+        with patch("src.backend.text_analysis.analysis_cache.time.time") as mock_time:
+            mock_time.return_value = 1.0
+            sqlite_cache.put("app", "fr", "aaaaaa", ANALYSIS_RESULT)
+            mock_time.return_value = 2.0
+            sqlite_cache.put("app", "fr", "bbbbbb", ANALYSIS_RESULT)
+            mock_time.return_value = 3.0
+            sqlite_cache.get("app", "fr", "aaaaaa")
+            mock_time.return_value = 4.0
+            sqlite_cache.put("app", "fr", "cccccc", ANALYSIS_RESULT)
+
+        assert sqlite_cache.count() == 2
+        assert sqlite_cache.get("app", "fr", "bbbbbb") is None
+        assert sqlite_cache.get("app", "fr", "aaaaaa") is not None
+        assert sqlite_cache.get("app", "fr", "cccccc") is not None
+
+    def test_eviction_without_count(self, sqlite_cache) -> None:
+        """Test que l'éviction suit le nombre d'entrées sans compter la table à chaque écriture."""
+        sqlite_cache.put("app", "fr", "aaaaaa", ANALYSIS_RESULT)
+        sqlite_cache.close()
+        reopened = SqliteAnalysisCache(sqlite_cache.filename, max_entries=2)
+        statements: list[str] = []
+        reopened._connection.set_trace_callback(statements.append)
+        try:
+            for cache_key in ("bbbbbb", "bbbbbb", "cccccc", "dddddd"):
+                reopened.put("app", "fr", cache_key, ANALYSIS_RESULT)
+            assert not [statement for statement in statements if "COUNT(*)" in statement]
+            assert reopened.count() == 2
+            assert reopened.get("app", "fr", "dddddd") is not None
+        finally:
+            reopened.close()
+
+    def test_wal_mode(self, sqlite_cache) -> None:
+        (journal_mode,) = sqlite_cache._connection.execute("PRAGMA journal_mode").fetchone()
+        assert journal_mode == "wal"
+
+
+class TestJsonFilesAnalysisCache:
+    """Tests pour JsonFilesAnalysisCache (ancien format, un fichier par entrée)."""
+
+    def test_get_put(self, tmp_path) -> None:
+        analysis_cache = JsonFilesAnalysisCache(str(tmp_path))
+
+        analysis_cache.put("app", "fr", "abcdef", ANALYSIS_RESULT)
+
+        assert os.listdir(tmp_path / "cache") == ["cache_app_fr_abcdef.json"]
+        assert analysis_cache.get("app", "fr", "abcdef") == ANALYSIS_RESULT
+        assert analysis_cache.get("app", "fr", "zzzzzz") is None
+
+
+class TestTieredAnalysisCache:
+    """Tests pour TieredAnalysisCache (niveau LRU en mémoire devant le cache persistant)."""
+
+    @pytest.fixture()
+    def tiered_cache(self, sqlite_cache):
+        return TieredAnalysisCache(sqlite_cache, max_entries=2, max_bytes=10_000)
+
+    def test_tiers(self, tiered_cache, sqlite_cache) -> None:
+        """Test que le niveau mémoire est rempli à l'écriture et à la lecture du niveau persistant."""
+        tiered_cache.put("app", "fr", "aaaaaa", ANALYSIS_RESULT)
+        sqlite_cache.put("app", "fr", "bbbbbb", ANALYSIS_RESULT)
+
+        assert tiered_cache.get("app", "fr", "aaaaaa") == ANALYSIS_RESULT
+        assert tiered_cache.get("app", "fr", "bbbbbb") == ANALYSIS_RESULT
+        assert tiered_cache.get("app", "fr", "bbbbbb") == ANALYSIS_RESULT
+        assert tiered_cache.get("app", "fr", "cccccc") is None
+
+        memory, persistent = tiered_cache.get_statistics()
+        assert (memory["tier"], memory["hits"], memory["misses"], memory["entries"]) == (
+            "memory",
+            2,
+            2,
+            2,
+        )
+        assert (persistent["tier"], persistent["hits"], persistent["misses"]) == ("sqlite", 1, 1)
+        assert persistent["hit_rate"] == 0.5
+
+    def test_copies(self, tiered_cache) -> None:
+        """Test que modifier un résultat servi ne modifie pas celui du cache."""
+        analysis_result = {"scorings": []}
+        tiered_cache.put("app", "fr", "aaaaaa", analysis_result)
+        analysis_result["scorings"].append("changed")
+        tiered_cache.get("app", "fr", "aaaaaa")["scorings"].append("changed")
+
+        assert tiered_cache.get("app", "fr", "aaaaaa") == {"scorings": []}
+
+    def test_lru_caps(self, tiered_cache) -> None:
+        """Test que le niveau mémoire est borné en entrées et en octets."""
+        for cache_key in ("aaaaaa", "bbbbbb", "cccccc"):
+            tiered_cache.put("app", "fr", cache_key, ANALYSIS_RESULT)
+        tiered_cache.put("app", "fr", "dddddd", {"text": "é" * 6_000})
+
+        memory, _persistent = tiered_cache.get_statistics()
+        assert memory["entries"] == 2
+        assert memory["bytes"] == len(json.dumps(ANALYSIS_RESULT).encode()) * 2
+        # Toujours servi par le niveau persistant
+        assert tiered_cache.get("app", "fr", "aaaaaa") == ANALYSIS_RESULT
+        assert tiered_cache.get_statistics()[1]["hits"] == 1
+
+    def test_max_age_and_ttl(self, tiered_cache, sqlite_cache) -> None:
+        tiered_cache.ttl = sqlite_cache.ttl = 120
+        tiered_cache.put("app", "fr", "aaaaaa", ANALYSIS_RESULT, created_at=1000.0)
+        with patch("src.backend.text_analysis.analysis_cache.time.time", return_value=1061.0):
+            assert tiered_cache.get("app", "fr", "aaaaaa", max_age=60) is None
+            assert tiered_cache.get("app", "fr", "aaaaaa") == ANALYSIS_RESULT
+        with patch("src.backend.text_analysis.analysis_cache.time.time", return_value=1121.0):
+            assert tiered_cache.get("app", "fr", "aaaaaa") is None
+
+        assert tiered_cache.get_statistics()[0]["entries"] == 0
+
+    def test_invalidate(self, tiered_cache) -> None:
+        tiered_cache.put("app", "fr", "aaaaaa", ANALYSIS_RESULT)
+        tiered_cache.put("other_app", "fr", "aaaaaa", ANALYSIS_RESULT)
+
+        tiered_cache.invalidate("app")
+
+        memory, _persistent = tiered_cache.get_statistics()
+        assert (memory["entries"], memory["bytes"]) == (1, len(json.dumps(ANALYSIS_RESULT).encode()))
+        assert tiered_cache.get("app", "fr", "aaaaaa") == ANALYSIS_RESULT
+
+
+class TestBuildAndMigrate:
+    """Tests pour build_analysis_cache() et import_json_files()."""
+
+    def test_build(self, tmp_path) -> None:
+        json_files = build_analysis_cache(str(tmp_path), AnalysisCacheConfig(backend="json_files"))
+        sqlite = build_analysis_cache(str(tmp_path), AnalysisCacheConfig(ttl=3600))
+
+        assert isinstance(json_files.persistent, JsonFilesAnalysisCache)
+        assert isinstance(sqlite.persistent, SqliteAnalysisCache)
+        assert sqlite.persistent.ttl == 3600
+        assert sqlite.persistent.max_entries == 100_000
+        assert sqlite.ttl == 3600
+        assert sqlite.max_entries == 1_000
+        sqlite.close()
+
+    def test_import_json_files(self, tmp_path, sqlite_cache) -> None:
+        cache_directory = tmp_path / "json"
+        cache_directory.mkdir()
+        # Les clés peuvent contenir "_" et "-", comme les identifiants d'app
+        for file_name in ("cache_AISA_fi_v2.A_Crct.json", "cache_my_app_en_v2.pQ-Y4v.json"):
+            (cache_directory / file_name).write_text(json.dumps(ANALYSIS_RESULT), encoding="utf-8")
+        (cache_directory / "cache_app_fr_v2.broken.json").write_text("{", encoding="utf-8")
+        # Ancien code de hachage, plus servi
+        (cache_directory / "cache_app_fr_abcdef.json").write_text("{}", encoding="utf-8")
+        (cache_directory / "notes.txt").write_text("", encoding="utf-8")
+
+        imported = import_json_files(str(cache_directory), sqlite_cache)
+
+        # Le fichier illisible n'est pas rendu, pour ne pas être supprimé par la migration
+        assert [os.path.basename(path) for path in imported] == [
+            "cache_AISA_fi_v2.A_Crct.json",
+            "cache_my_app_en_v2.pQ-Y4v.json",
+        ]
+        assert sqlite_cache.get("AISA", "fi", "v2.A_Crct") == ANALYSIS_RESULT
+        assert sqlite_cache.get("my_app", "en", "v2.pQ-Y4v") == ANALYSIS_RESULT
+
+
+class TestBuildCacheKey:
+    """Tests pour build_cache_key()."""
+
+    def test_build_cache_key(self) -> None:
+        cache_key = build_cache_key({"text": "Bonjour", "model": "m", "temperature": 0})
+
+        assert cache_key.startswith(f"v{CACHE_KEY_VERSION}.")
+        assert len(cache_key) == len(f"v{CACHE_KEY_VERSION}.") + 43
+        # L'ordre des clés du contenu n'a pas d'importance
+        assert cache_key == build_cache_key({"temperature": 0, "model": "m", "text": "Bonjour"})
+        assert cache_key != build_cache_key({"text": "Bonjour", "model": "m", "temperature": 1})
@@ -0,0 +1,94 @@
+"""Tests unitaires pour les scores de santé des llm_configs et la chaîne de failover."""
+
+from unittest.mock import patch
+
+import pytest
+
+from src.backend.backend.server_config import FailoverChain, ServerConfig
+from src.backend.text_analysis.failover import HealthScore, HealthScores
+from src.backend.text_analysis.llm import LlmConfig
+
+
+class TestHealthScore:
+    """Tests pour HealthScore."""
+
+    def test_failures_make_unhealthy(self) -> None:
+        health_score = HealthScore("scaleway1")
+        with patch("time.monotonic", return_value=0.0):
+            health_score.updated_at = 0.0
+            for _ in range(3):
+                health_score.record_failure()
+            assert health_score.get_health() == pytest.approx(0.512)
+            health_score.record_failure()
+            assert not health_score.is_healthy()
+
+    def test_health_recovers_over_time(self) -> None:
+        health_score = HealthScore("scaleway1")
+        with patch("time.monotonic", return_value=0.0):
+            health_score.updated_at = 0.0
+            for _ in range(10):
+                health_score.record_failure()
+            assert not health_score.is_healthy()
+        with patch("time.monotonic", return_value=120.0):
+            assert health_score.is_healthy()
+
+    def test_latency(self) -> None:
+        health_score = HealthScore("openai1")
+        health_score.record_success(1.0)
+        health_score.record_success(2.0)
+
+        assert health_score.get_state()["latency"] == pytest.approx(1.2)
+        assert health_score.get_state()["successes"] == 2
+
+
+class TestHealthScoresRoute:
+    """Tests pour HealthScores.route()."""
+
+    def test_chain_order_when_healthy(self) -> None:
+        assert HealthScores().route(["a", "b", "c"], "a") == ["a", "b", "c"]
+
+    def test_starts_at_requested_entry(self) -> None:
+        """Test que seules l'entrée demandée et les suivantes sont essayées."""
+        health_scores = HealthScores()
+        for _ in range(5):
+            health_scores.get("b").record_failure()
+
+        assert health_scores.route(["a", "b", "c"], "b") == ["c", "b"]
+
+    def test_requested_entry_outside_chain(self) -> None:
+        with pytest.raises(ValueError, match="not in the failover chain"):
+            HealthScores().route(["a", "b"], "c")
+
+    def test_unhealthy_entries_last(self) -> None:
+        health_scores = HealthScores()
+        for _ in range(5):
+            health_scores.get("a").record_failure()
+        for _ in range(10):
+            health_scores.get("b").record_failure()
+
+        assert health_scores.route(["a", "b", "c"], "a") == ["c", "a", "b"]
+
+
+class TestServerConfigFailoverChain:
+    """Tests pour ServerConfig.get_failover_chain()."""
+
+    @pytest.fixture()
+    def server_config(self, sample_llm_config):
+        return ServerConfig(
+            llm_configs=[
+                sample_llm_config,
+                sample_llm_config.model_copy(update={"id": "backup"}),
+            ],
+            failover_chains=[
+                FailoverChain(app_id="app1", llm_config_ids=["test_config", "backup"]),
+                FailoverChain(app_id="app2", llm_config_ids=["test_config", "unknown"]),
+            ],
+        )
+
+    def test_get_failover_chain(self, server_config) -> None:
+        assert server_config.get_failover_chain("app1") == ["test_config", "backup"]
+        assert server_config.get_failover_chain("app3") == []
+
+    def test_unknown_llm_config(self, server_config) -> None:
+        with pytest.raises(ValueError, match="unknown"):
+            server_config.get_failover_chain("app2")
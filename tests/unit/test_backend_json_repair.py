@@ -0,0 +1,102 @@
+"""Tests unitaires pour la réparation locale du JSON retourné par les LLM."""
+
+import json
+
+import pytest
+
+from src.backend.text_analysis.base_models import Feature
+from src.backend.text_analysis.json_repair import LlmValidationError, validate_json
+from src.backend.text_analysis.text_analyzer import create_analysis_models
+
+
+@pytest.fixture()
+def analysis_model():
+    """Fixture pour un AnalysisResult avec un champ entier et un champ à surligner."""
+    return create_analysis_models(
+        "fr",
+        [
+            Feature(
+                id="age",
+                label="Âge",
+                type="int",
+                description="Âge",
+                highlight_fragments=False,
+            ),
+            Feature(
+                id="nom",
+                label="Nom",
+                type="str",
+                description="Nom",
+                highlight_fragments=True,
+            ),
+        ],
+    )
+
+
+def scoring(intention_id, score):
+    return {"intention_id": intention_id, "score": score, "justification": "Parce que"}
+
+
+class TestValidateJson:
+    """Tests pour validate_json()."""
+
+    def test_valid_json_unchanged(self, analysis_model) -> None:
+        """Test qu'un JSON valide est validé tel quel."""
+        content = json.dumps({"scorings": [scoring("i1", 8)], "age": 30})
+
+        result = validate_json(analysis_model, content)
+
+        assert result.age == 30
+
+    def test_code_fences_and_trailing_commas(self, analysis_model) -> None:
+        """Test que les balises de code et les virgules finales sont retirées."""
+        content = '```json\n{"scorings": [{"intention_id": "i1", "score": 8, "justification": "x"},],}\n```'
+
+        result = validate_json(analysis_model, content)
+
+        assert result.scorings[0].score == 8
+
+    def test_type_coercion(self, analysis_model) -> None:
+        """Test la conversion des types : score décimal ou texte, nom numérique, liste en chaîne."""
+        content = json.dumps(
+            {
+                "scorings": [scoring("i1", 7.6), scoring("i2", "3/10")],
+                "nom": 42,
+                "fragments_nom": {"list": "Dupont"},
+            },
+        )
+
+        result = validate_json(analysis_model, content)
+
+        assert [s.score for s in result.scorings] == [8, 3]
+        assert result.nom == "42"
+        assert result.fragments_nom.list == ["Dupont"]
+
+    def test_partial_result_salvaged(self, analysis_model) -> None:
+        """Test qu'un champ invalide est abandonné sans perdre les scorings valides."""
+        content = json.dumps(
+            {
+                "scorings": [scoring("i1", 9), {"intention_id": "i2", "score": "élevé"}],
+                "age": "inconnu",
+                "nom": "Dupont",
+            },
+        )
+
+        result = validate_json(analysis_model, content)
+
+        assert [s.intention_id for s in result.scorings] == ["i1"]
+        assert result.age is None
+        assert result.nom == "Dupont"
+
+    def test_unrepairable(self, analysis_model) -> None:
+        """Test que LlmValidationError conserve la réponse et les erreurs."""
+        with pytest.raises(LlmValidationError) as exc_info:
+            validate_json(analysis_model, '{"age": 30}')
+
+        assert exc_info.value.content == '{"age": 30}'
+        assert "scorings" in exc_info.value.errors
+
+    def test_invalid_json(self, analysis_model) -> None:
+        """Test qu'un texte non JSON lève LlmValidationError."""
+        with pytest.raises(LlmValidationError, match="invalid JSON format"):
+            validate_json(analysis_model, "Je ne sais pas")
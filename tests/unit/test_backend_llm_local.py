@@ -0,0 +1,120 @@
+"""Tests unitaires pour le classifieur d'intentions local (llm: "local")."""
+
+import asyncio
+import os
+
+import pytest
+
+from src.backend.text_analysis.llm import LlmConfig, LlmConfigurationError
+from src.backend.text_analysis.llm_local import (
+    IntentClassifier,
+    LlmLocal,
+    load_examples,
+    normalize_text,
+)
+from src.backend.text_analysis.llm_registry import build_llm
+from src.backend.text_analysis.text_analyzer import create_analysis_models
+
+EXAMPLES = [
+    ("asile", "Je souhaite déposer une demande d'asile en France."),
+    ("asile", "Comment faire une demande de protection au titre de l'asile ?"),
+    ("asile", "Je suis réfugié et je veux demander l'asile."),
+    ("renouvellement", "Mon titre de séjour expire, je dois le renouveler."),
+    ("renouvellement", "Comment renouveler ma carte de séjour qui arrive à expiration ?"),
+    ("renouvellement", "Le renouvellement de mon titre de séjour est urgent."),
+]
+
+
+@pytest.fixture()
+def examples_filename(tmp_path):
+    filename = tmp_path / "examples.csv"
+    lines = ["id,split,text"]
+    lines += [f'{intention_id},train,"{text}"' for intention_id, text in EXAMPLES]
+    lines.append('asile,test,"Je voudrais demander l\'asile."')
+    filename.write_text("\n".join(lines), encoding="utf-8")
+    return str(filename)
+
+
+def make_llm_config(examples_filename: str | None) -> LlmConfig:
+    return LlmConfig(
+        id="local1",
+        llm="local",
+        model="char-ngram-tfidf",
+        response_format_type="pydantic_model",
+        prompt_format="text",
+        temperature=0,
+        examples_filename=examples_filename,
+    )
+
+
+class TestIntentClassifier:
+    """Tests pour IntentClassifier."""
+
+    def test_normalize_text(self) -> None:
+        assert normalize_text("  Séjour\n  ÉTUDIANT ") == "sejour etudiant"
+
+    def test_load_examples(self, examples_filename) -> None:
+        assert len(load_examples(examples_filename)) == 6
+        assert load_examples(examples_filename, "test") == [
+            ("asile", "Je voudrais demander l'asile."),
+        ]
+
+    def test_predict(self) -> None:
+        classifier = IntentClassifier(EXAMPLES)
+
+        assert classifier.predict("Je veux demander l'asile politique") == "asile"
+        assert classifier.predict("Ma carte de séjour expire bientôt") == "renouvellement"
+
+    def test_scores(self) -> None:
+        scores = {
+            intention_id: score
+            for intention_id, score, _similarity in IntentClassifier(EXAMPLES).score(
+                "Je veux renouveler mon titre de séjour",
+            )
+        }
+
+        assert set(scores) == {"asile", "renouvellement"}
+        assert scores["renouvellement"] > scores["asile"]
+        assert all(0 <= score <= 10 for score in scores.values())
+
+    def test_no_examples(self) -> None:
+        with pytest.raises(LlmConfigurationError):
+            IntentClassifier([])
+
+    @pytest.mark.skipif(
+        not os.path.exists("misc/non_llm/intentions_examples_1.csv"),
+        reason="Exemples étiquetés absents",
+    )
+    def test_accuracy_on_labelled_examples(self) -> None:
+        filename = "misc/non_llm/intentions_examples_1.csv"
+        classifier = IntentClassifier(load_examples(filename))
+        test_examples = load_examples(filename, "test")
+
+        correct = sum(classifier.predict(text) == intention_id for intention_id, text in test_examples)
+        assert correct / len(test_examples) >= 0.9
+
+
+class TestLlmLocal:
+    """Tests pour LlmLocal."""
+
+    def test_analysis_result_shape(self, examples_filename) -> None:
+        """Test que la réponse a la forme de celle des LLM, sans champs extraits."""
+        llm = build_llm(make_llm_config(examples_filename))
+        model = create_analysis_models("fr", [])
+
+        result, usage = llm.call_llm_with_pydantic_model(model, "prompt ignoré", "Demande d'asile")
+        result_async, _usage = asyncio.run(
+            llm.call_llm_with_json_schema_async(model, "prompt ignoré", "Demande d'asile"),
+        )
+
+        assert isinstance(llm, LlmLocal)
+        assert isinstance(result, model)
+        assert {scoring.intention_id for scoring in result.scorings} == {"asile", "renouvellement"}
+        assert result_async == result
+        assert usage.prompt_tokens is None
+
+    def test_missing_examples(self, tmp_path) -> None:
+        with pytest.raises(LlmConfigurationError):
+            LlmLocal(make_llm_config(None))
+        with pytest.raises(LlmConfigurationError):
+            LlmLocal(make_llm_config(str(tmp_path / "absent.csv")))
@@ -0,0 +1,52 @@
+"""Tests unitaires pour le response_format json_schema des API compatibles OpenAI."""
+
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.backend.text_analysis.base_models import Feature
+from src.backend.text_analysis.llm_openai import json_schema_response_format
+from src.backend.text_analysis.text_analyzer import create_analysis_models
+
+
+class TestJsonSchemaResponseFormat:
+    """Tests pour json_schema_response_format()."""
+
+    def test_strict_analysis_schema(self) -> None:
+        """Test que tous les objets du schéma sont stricts, y compris les modèles imbriqués."""
+        analysis_model = create_analysis_models(
+            "fr",
+            [
+                Feature(
+                    id="nom",
+                    label="Nom",
+                    type="str",
+                    description="Nom",
+                    highlight_fragments=True,
+                ),
+            ],
+            "short",
+        )
+
+        response_format = json_schema_response_format(analysis_model)
+
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["name"] == "AnalysisResult"
+        assert response_format["json_schema"]["strict"] is True
+        schema = response_format["json_schema"]["schema"]
+        assert schema["additionalProperties"] is False
+        assert set(schema["required"]) == set(schema["properties"])
+        for sub_schema in schema["$defs"].values():
+            assert sub_schema["additionalProperties"] is False
+
+    def test_optional_fields_required(self) -> None:
+        """Test que les champs facultatifs sont requis et sans valeur par défaut None."""
+
+        class Result(BaseModel):
+            nom: str
+            age: Optional[int] = None
+
+        schema = json_schema_response_format(Result)["json_schema"]["schema"]
+
+        assert schema["required"] == ["nom", "age"]
+        assert "default" not in schema["properties"]["age"]
@@ -0,0 +1,206 @@
+"""Tests unitaires pour LlmRegistry
+Focus : réutilisation des clients LLM entre les analyses.
+"""
+
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.backend.text_analysis.base_models import Definition
+from src.backend.text_analysis.llm import LlmConfig, LlmConfigurationError
+from src.backend.text_analysis.llm_registry import LlmRegistry
+
+
+def make_mock_llm(llm_config):
+    llm = Mock()
+    llm.llm_config = llm_config
+    return llm
+
+
+class TestLlmRegistry:
+    """Tests pour LlmRegistry.get() et close()."""
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_get_reuses_instance(self, mock_llm_class, sample_llm_config) -> None:
+        """Test que le même Llm est renvoyé pour une même configuration."""
+        mock_llm_class.side_effect = make_mock_llm
+        registry = LlmRegistry()
+
+        llm1 = registry.get(sample_llm_config)
+        llm2 = registry.get(sample_llm_config)
+
+        assert llm1 is llm2
+        mock_llm_class.assert_called_once_with(sample_llm_config)
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_get_rebuilds_on_config_change(
+        self,
+        mock_llm_class,
+        sample_llm_config,
+    ) -> None:
+        """Test qu'un changement de configuration (même id) reconstruit le client."""
+        mock_llm_class.side_effect = make_mock_llm
+        registry = LlmRegistry()
+
+        llm1 = registry.get(sample_llm_config)
+        changed_config = sample_llm_config.model_copy(update={"timeout": 5.0})
+        llm2 = registry.get(changed_config)
+
+        assert llm1 is not llm2
+        llm1.close.assert_called_once()
+        assert mock_llm_class.call_count == 2
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_close_releases_clients(self, mock_llm_class, sample_llm_config) -> None:
+        """Test que close() ferme tous les clients."""
+        mock_llm_class.side_effect = make_mock_llm
+        registry = LlmRegistry()
+
+        llm = registry.get(sample_llm_config)
+        registry.close()
+
+        llm.close.assert_called_once()
+        assert registry.get(sample_llm_config) is not llm
+
+    def test_pool_options_from_config(self) -> None:
+        """Test que les limites du pool HTTP proviennent de la configuration."""
+        llm_config = LlmConfig(
+            id="ollama_test",
+            llm="ollama",
+            model="llama2",
+            response_format_type="json_object",
+            prompt_format="markdown",
+            temperature=0.7,
+            max_connections=4,
+            timeout=12.0,
+        )
+        registry = LlmRegistry()
+
+        llm = registry.get(llm_config)
+        options = llm.http_client_options()
+
+        assert options["limits"].max_connections == 4
+        assert options["timeout"].read == 12.0
+        registry.close()
+
+    @pytest.mark.parametrize("llm", ["openai", "scaleway"])
+    def test_no_sdk_retries(self, llm, sample_llm_config) -> None:
+        """Test que les clients du SDK OpenAI ne refont pas eux-mêmes les appels (retry_policy s'en charge)."""
+        environ = {"OPENAI_API_KEY": "test", "SCW_PROJECT_ID": "project", "SCW_SECRET_KEY": "test"}
+        with patch.dict(os.environ, environ):
+            llm_instance = LlmRegistry().get(sample_llm_config.model_copy(update={"llm": llm}))
+
+        assert llm_instance.client.max_retries == 0
+        assert llm_instance.async_client.max_retries == 0
+        llm_instance.close()
+
+    def test_ollama_close(self, sample_llm_config) -> None:
+        """Test que close() ferme le pool httpx d'Ollama, et tolère un SDK qui n'en expose plus."""
+        llm = LlmRegistry().get(sample_llm_config.model_copy(update={"llm": "ollama"}))
+        http_client = llm.client._client
+
+        llm.close_client()
+        assert http_client.is_closed
+
+        llm.client = Mock(spec=[])
+        llm.close_client()
+
+    def test_unsupported_llm(self) -> None:
+        """Test que ValueError est levée pour un LLM non supporté."""
+        llm_config = Mock()
+        llm_config.id = "test_config"
+        llm_config.llm = "unsupported"
+
+        with pytest.raises(ValueError, match="Unsupported LLM"):
+            LlmRegistry().get(llm_config)
+
+
+class TestJsonSchemaResponseFormat:
+    """Tests pour response_format_type="json_schema" (sortie contrainte par le schéma)."""
+
+    def make_llm_config(self, llm, response_format_type):
+        return LlmConfig(
+            id=f"{llm}_test",
+            llm=llm,
+            model="model",
+            response_format_type=response_format_type,
+            prompt_format="markdown",
+            temperature=0.5,
+        )
+
+    def test_openai_strict_json_schema(self) -> None:
+        """Test que la requête OpenAI demande un json_schema strict."""
+        llm_config = self.make_llm_config("openai", "json_schema")
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test"}):
+            llm = LlmRegistry().get(llm_config)
+
+        request = llm.json_schema_request(Definition, "prompt", "texte")
+
+        response_format = request["response_format"]
+        assert response_format["type"] == "json_schema"
+        assert response_format["json_schema"]["strict"] is True
+        assert response_format["json_schema"]["schema"]["additionalProperties"] is False
+
+    def test_ollama_format_is_top_level(self) -> None:
+        """Test que format est passé à Ollama hors des options, avec le schéma en mode json_schema."""
+        registry = LlmRegistry()
+        json_object_llm = registry.get(self.make_llm_config("ollama", "json_object"))
+        json_schema_llm = registry.get(
+            self.make_llm_config("ollama", "json_schema").model_copy(
+                update={"id": "ollama_schema"},
+            ),
+        )
+
+        json_object_request = json_object_llm.json_schema_request(
+            Definition,
+            "prompt",
+            "texte",
+        )
+        json_schema_request = json_schema_llm.json_schema_request(
+            Definition,
+            "prompt",
+            "texte",
+        )
+
+        assert json_object_request["format"] == "json"
+        assert "format" not in json_object_request["options"]
+        assert json_schema_request["format"] == Definition.model_json_schema()
+        registry.close()
+
+
+class TestLlmRegistryHedging:
+    """Tests pour le délai et le llm_config de secours des requêtes doublées."""
+
+    def test_hedge_delay_before_enough_latencies(self, sample_llm_config) -> None:
+        llm_config = sample_llm_config.model_copy(
+            update={"hedge_percentile": 90, "hedge_delay": 7.0},
+        )
+        registry = LlmRegistry()
+        registry.record_latency(llm_config, 1.0)
+
+        assert registry.get_hedge_delay(llm_config) == 7.0
+
+    def test_hedge_delay_percentile(self, sample_llm_config) -> None:
+        llm_config = sample_llm_config.model_copy(update={"hedge_percentile": 90})
+        registry = LlmRegistry()
+        for seconds in range(1, 101):
+            registry.record_latency(llm_config, float(seconds))
+
+        assert registry.get_hedge_delay(llm_config) == 91.0
+
+    def test_hedge_llm_config(self, sample_llm_config) -> None:
+        backup = sample_llm_config.model_copy(update={"id": "backup"})
+        registry = LlmRegistry({"backup": backup})
+
+        assert registry.get_hedge_llm_config(sample_llm_config) is sample_llm_config
+        assert (
+            registry.get_hedge_llm_config(
+                sample_llm_config.model_copy(update={"hedge_llm_config_id": "backup"}),
+            )
+            is backup
+        )
+        with pytest.raises(LlmConfigurationError):
+            registry.get_hedge_llm_config(
+                sample_llm_config.model_copy(update={"hedge_llm_config_id": "unknown"}),
+            )
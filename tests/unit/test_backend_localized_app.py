@@ -3,13 +3,17 @@ Objectif : 90%+ de couverture
 Focus : Mécanisme de retry et fallback.
 """
 
-from unittest.mock import Mock, patch
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 from src.backend.backend.localized_app import LocalizedApp
 from src.backend.text_analysis.base_models import FIELD_NAME_SCORINGS
-from src.backend.text_analysis.llm import LlmConfig
+from src.backend.text_analysis.failover import HealthScores
+from src.backend.text_analysis.json_repair import LlmValidationError
+from src.backend.text_analysis.llm import LlmConfig, LlmConfigurationError
+from src.backend.text_analysis.retry_policy import CircuitBreakers
 from src.common.constants import (
     KEY_ANALYSIS_RESULT,
     KEY_HIGHLIGHTED_TEXT_AND_FEATURES,
@@ -17,6 +21,7 @@ from src.common.constants import (
     KEY_PROMPT,
     KEY_STATISTICS,
 )
+from src.common.server_api import AnalyzeBatchItem
 
 
 class TestLocalizedAppFallback:
@@ -123,6 +128,10 @@ class TestLocalizedAppAnalyzeRetry:
         config.llm = "openai"
         config.model = "gpt-4"
         config.prompt_format = "markdown"
+        config.max_attempts = 3
+        config.retry_initial_delay = 1.0
+        config.retry_max_delay = 8.0
+        config.retry_deadline = 60.0
         return config
 
     @patch("time.sleep")  # Mock sleep pour accélérer les tests
@@ -141,6 +150,7 @@ class TestLocalizedAppAnalyzeRetry:
             app.text_analyzer = mock_text_analyzer
             app.parent_app = Mock()
             app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
 
             result = app.analyze(
                 app_id="test_app",
@@ -172,6 +182,7 @@ class TestLocalizedAppAnalyzeRetry:
             app.text_analyzer = mock_text_analyzer
             app.parent_app = Mock()
             app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
 
             result = app.analyze(
                 app_id="test_app",
@@ -201,6 +212,7 @@ class TestLocalizedAppAnalyzeRetry:
             app.text_analyzer = mock_text_analyzer
             app.parent_app = Mock()
             app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
 
             result = app.analyze(
                 app_id="test_app",
@@ -225,8 +237,12 @@ class TestLocalizedAppAnalyzeRetry:
             assert "Error Message" in analysis_result[KEY_STATISTICS]
 
     @patch("time.sleep")
-    def test_analyze_retry_delay_2_seconds(self, mock_sleep, mock_llm_config) -> None:
-        """Test que le délai entre retries est de 2 secondes."""
+    def test_analyze_retry_exponential_backoff_with_jitter(
+        self,
+        mock_sleep,
+        mock_llm_config,
+    ) -> None:
+        """Test que le délai entre retries est aléatoire et borné par un backoff exponentiel."""
         mock_result = {
             KEY_ANALYSIS_RESULT: {FIELD_NAME_SCORINGS: [], KEY_STATISTICS: {}},
         }
@@ -242,6 +258,7 @@ class TestLocalizedAppAnalyzeRetry:
             app.text_analyzer = mock_text_analyzer
             app.parent_app = Mock()
             app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
 
             app.analyze(
                 app_id="test_app",
@@ -252,10 +269,107 @@ class TestLocalizedAppAnalyzeRetry:
                 llm_config_id="test_config",
             )
 
-            # Vérifier que sleep a été appelé avec 2.0
+            # 1re attente dans [0, 1s], 2e dans [0, 2s]
             assert mock_sleep.call_count == 2
-            for call in mock_sleep.call_args_list:
-                assert call[0][0] == 2.0
+            first_delay, second_delay = (call[0][0] for call in mock_sleep.call_args_list)
+            assert 0 <= first_delay <= 1.0
+            assert 0 <= second_delay <= 2.0
+
+    @patch("time.sleep")
+    def test_analyze_no_retry_on_configuration_error(
+        self,
+        mock_sleep,
+        mock_llm_config,
+    ) -> None:
+        """Test qu'une erreur de configuration n'est pas retentée."""
+        mock_text_analyzer = Mock()
+        mock_text_analyzer.analyze.side_effect = LlmConfigurationError(
+            "OPENAI_API_KEY environment variable is not set",
+        )
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = LocalizedApp(None, None, None, None)
+            app.text_analyzer = mock_text_analyzer
+            app.parent_app = Mock()
+            app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
+
+            result = app.analyze(
+                app_id="test_app",
+                locale="fr",
+                field_values={},
+                text="Test text",
+                read_from_cache=False,
+                llm_config_id="test_config",
+            )
+
+            assert mock_text_analyzer.analyze.call_count == 1
+            assert mock_sleep.call_count == 0
+            assert "LlmConfigurationError" in result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]["Error code"]
+
+    @patch("time.sleep")
+    def test_analyze_fails_fast_when_circuit_open(
+        self,
+        mock_sleep,
+        mock_llm_config,
+    ) -> None:
+        """Test que le disjoncteur ouvert renvoie le fallback sans appeler le LLM."""
+        mock_text_analyzer = Mock()
+        circuit_breakers = CircuitBreakers()
+        circuit_breaker = circuit_breakers.get("openai")
+        for _ in range(circuit_breaker.failure_threshold):
+            circuit_breaker.record_failure()
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = LocalizedApp(None, None, None, None)
+            app.text_analyzer = mock_text_analyzer
+            app.parent_app = Mock()
+            app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
+            app.parent_app.circuit_breakers = circuit_breakers
+
+            result = app.analyze(
+                app_id="test_app",
+                locale="fr",
+                field_values={},
+                text="Test text",
+                read_from_cache=False,
+                llm_config_id="test_config",
+            )
+
+            mock_text_analyzer.analyze.assert_not_called()
+            assert "CircuitBreakerOpenError" in result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]["Error code"]
+
+    @patch("time.sleep")
+    def test_validation_errors_do_not_trip_circuit_breaker(
+        self,
+        mock_sleep,
+        mock_llm_config,
+    ) -> None:
+        """Test qu'une réponse invalide du LLM est retentée sans compter comme une panne du fournisseur."""
+        mock_text_analyzer = Mock()
+        mock_text_analyzer.analyze.side_effect = LlmValidationError("invalid", "{}", "errors")
+        circuit_breakers = CircuitBreakers()
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = LocalizedApp(None, None, None, None)
+            app.text_analyzer = mock_text_analyzer
+            app.parent_app = Mock()
+            app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
+            app.parent_app.circuit_breakers = circuit_breakers
+
+            app.analyze(
+                app_id="test_app",
+                locale="fr",
+                field_values={},
+                text="Test text",
+                read_from_cache=False,
+                llm_config_id="test_config",
+            )
+
+            assert mock_text_analyzer.analyze.call_count == 3
+            assert circuit_breakers.get("openai").consecutive_failures == 0
 
     @patch("time.sleep")
     def test_analyze_different_exception_types(
@@ -276,6 +390,7 @@ class TestLocalizedAppAnalyzeRetry:
             app.text_analyzer = mock_text_analyzer
             app.parent_app = Mock()
             app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
 
             result = app.analyze(
                 app_id="test_app",
@@ -299,3 +414,353 @@ class TestLocalizedAppAnalyzeRetry:
             assert "Error code" in analysis_result[KEY_STATISTICS]
             # Vérifier que le dernier type d'erreur est dans le code d'erreur
             assert "RuntimeError" in analysis_result[KEY_STATISTICS]["Error code"]
+
+
+class TestLocalizedAppAnalyzeAsyncRetry:
+    """Tests pour le mécanisme de retry dans analyze_async()."""
+
+    @pytest.fixture()
+    def mock_llm_config(self):
+        """Fixture pour LlmConfig."""
+        config = Mock(spec=LlmConfig)
+        config.id = "test_config"
+        config.llm = "openai"
+        config.model = "gpt-4"
+        config.prompt_format = "markdown"
+        config.max_attempts = 3
+        config.retry_initial_delay = 1.0
+        config.retry_max_delay = 8.0
+        config.retry_deadline = 60.0
+        return config
+
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    def test_analyze_async_retry_on_error(self, mock_sleep, mock_llm_config) -> None:
+        """Test que analyze_async() réessaie sans bloquer après une erreur."""
+        mock_result = {
+            KEY_ANALYSIS_RESULT: {FIELD_NAME_SCORINGS: [], KEY_STATISTICS: {}},
+        }
+        mock_text_analyzer = Mock()
+        mock_text_analyzer.analyze_async = AsyncMock(
+            side_effect=[ValueError("First error"), mock_result],
+        )
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = LocalizedApp(None, None, None, None)
+            app.text_analyzer = mock_text_analyzer
+            app.parent_app = Mock()
+            app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
+
+            result = asyncio.run(
+                app.analyze_async(
+                    app_id="test_app",
+                    locale="fr",
+                    field_values={},
+                    text="Test text",
+                    read_from_cache=False,
+                    llm_config_id="test_config",
+                ),
+            )
+
+            assert result == mock_result
+            assert mock_text_analyzer.analyze_async.await_count == 2
+            mock_sleep.assert_awaited_once()
+            assert 0 <= mock_sleep.await_args.args[0] <= 1.0
+
+    @patch("asyncio.sleep", new_callable=AsyncMock)
+    def test_analyze_async_returns_fallback_after_3_failures(
+        self,
+        mock_sleep,
+        mock_llm_config,
+    ) -> None:
+        """Test que analyze_async() retourne fallback après 3 échecs."""
+        mock_text_analyzer = Mock()
+        mock_text_analyzer.analyze_async = AsyncMock(
+            side_effect=ValueError("Persistent error"),
+        )
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = LocalizedApp(None, None, None, None)
+            app.text_analyzer = mock_text_analyzer
+            app.parent_app = Mock()
+            app.parent_app.llm_configs = {"test_config": mock_llm_config}
+            app.parent_app.failover_chain = []
+
+            result = asyncio.run(
+                app.analyze_async(
+                    app_id="test_app",
+                    locale="fr",
+                    field_values={},
+                    text="Test text",
+                    read_from_cache=False,
+                    llm_config_id="test_config",
+                ),
+            )
+
+            assert mock_text_analyzer.analyze_async.await_count == 3
+            assert mock_sleep.await_count == 2
+            analysis_result = result[KEY_ANALYSIS_RESULT]
+            assert analysis_result[FIELD_NAME_SCORINGS][0]["intention_id"] == "other"
+            assert "Error code" in analysis_result[KEY_STATISTICS]
+
+
+class TestLocalizedAppAnalyzeBatch:
+    """Tests pour analyze_batch() : concurrence bornée et erreurs par texte."""
+
+    def make_app(self, analyze_async, max_concurrency):
+        llm_config = Mock(spec=LlmConfig)
+        llm_config.id = "test_config"
+        llm_config.max_concurrency = max_concurrency
+        llm_config.pack_size = 1
+        app = LocalizedApp(None, None, None, None)
+        app.analyze_async = analyze_async
+        app.text_analyzer = Mock()
+        app.text_analyzer.can_pack.return_value = False
+        app.parent_app = Mock()
+        app.parent_app.llm_configs = {"test_config": llm_config}
+        app.parent_app.failover_chain = []
+        app.parent_app.llm_registry.get_semaphore = lambda config: asyncio.Semaphore(
+            config.max_concurrency,
+        )
+        return app
+
+    def collect(self, app, items):
+        async def run():
+            return [
+                item_result
+                async for item_result in app.analyze_batch(
+                    app_id="test_app",
+                    locale="fr",
+                    items=items,
+                    read_from_cache=False,
+                    llm_config_id="test_config",
+                )
+            ]
+
+        return asyncio.run(run())
+
+    def test_analyze_batch_completion_order_and_errors(self) -> None:
+        """Test que les résultats arrivent dans l'ordre de complétion et qu'une erreur reste locale."""
+        delays = {"lent": 0.05, "rapide": 0.0}
+
+        async def analyze_async(app_id, locale, field_values, text, *args):
+            if text == "erreur":
+                msg = "Texte invalide"
+                raise ValueError(msg)
+            await asyncio.sleep(delays[text])
+            return {"text": text}
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze_async, max_concurrency=3)
+            items = [
+                AnalyzeBatchItem(text="lent"),
+                AnalyzeBatchItem(text="erreur"),
+                AnalyzeBatchItem(text="rapide"),
+            ]
+
+            results = self.collect(app, items)
+
+        assert [result["index"] for result in results] == [1, 2, 0]
+        assert results[0]["error"]["error_type"] == "ValueError"
+        assert results[1]["result"] == {"text": "rapide"}
+        assert results[2]["result"] == {"text": "lent"}
+
+    def test_analyze_batch_respects_max_concurrency(self) -> None:
+        """Test que le nombre d'analyses simultanées ne dépasse pas max_concurrency."""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def analyze_async(*args):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {}
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze_async, max_concurrency=2)
+            results = self.collect(app, [AnalyzeBatchItem(text="t")] * 6)
+
+        assert len(results) == 6
+        assert max_in_flight == 2
+
+    def test_analyze_batch_packed_falls_back_per_text(self) -> None:
+        """Test que les textes absents de la réponse groupée sont analysés un par un."""
+        analyze_async = AsyncMock(return_value={"seul": True})
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze_async, max_concurrency=2)
+            app.text_analyzer.can_pack.return_value = True
+            app.text_analyzer.plan_packs.return_value = [[0, 1]]
+            app.text_analyzer.analyze_packed_async = AsyncMock(
+                return_value=[{"groupe": True}, None],
+            )
+
+            results = self.collect(
+                app,
+                [AnalyzeBatchItem(text="a"), AnalyzeBatchItem(text="b")],
+            )
+
+        assert results == [
+            {"index": 0, "result": {"groupe": True}},
+            {"index": 1, "result": {"seul": True}},
+        ]
+        analyze_async.assert_awaited_once()
+
+    def test_analyze_batch_packed_misses_run_concurrently(self) -> None:
+        """Test que les textes absents de la réponse groupée sont analysés en parallèle."""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def analyze_async(*args):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return {"seul": True}
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze_async, max_concurrency=2)
+            app.text_analyzer.can_pack.return_value = True
+            app.text_analyzer.plan_packs.return_value = [[0, 1, 2]]
+            app.text_analyzer.analyze_packed_async = AsyncMock(
+                return_value=[None, None, None],
+            )
+
+            results = self.collect(app, [AnalyzeBatchItem(text="t")] * 3)
+
+        assert sorted(result["index"] for result in results) == [0, 1, 2]
+        assert max_in_flight == 2
+
+    def test_analyze_batch_no_packing_in_failover_chain(self) -> None:
+        """Test que les textes ne sont pas groupés pour un llm_config de la chaîne de failover."""
+        analyze_async = AsyncMock(return_value={"seul": True})
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze_async, max_concurrency=2)
+            app.parent_app.failover_chain = ["test_config"]
+            app.text_analyzer.can_pack.return_value = True
+
+            results = self.collect(
+                app,
+                [AnalyzeBatchItem(text="a"), AnalyzeBatchItem(text="b")],
+            )
+
+        assert len(results) == 2
+        app.text_analyzer.plan_packs.assert_not_called()
+        assert analyze_async.await_count == 2
+
+
+class TestLocalizedAppFailover:
+    """Tests pour la chaîne de failover entre llm_configs."""
+
+    @staticmethod
+    def make_llm_config(llm_config_id: str, llm: str) -> LlmConfig:
+        return LlmConfig(
+            id=llm_config_id,
+            llm=llm,
+            model="model",
+            response_format_type="json_object",
+            prompt_format="markdown",
+            temperature=0,
+            max_attempts=1,
+        )
+
+    def make_app(self, analyze) -> LocalizedApp:
+        app = LocalizedApp(None, None, None, None)
+        app.text_analyzer = Mock()
+        app.text_analyzer.analyze.side_effect = analyze
+        app.parent_app = Mock()
+        app.parent_app.llm_configs = {
+            "scaleway1": self.make_llm_config("scaleway1", "scaleway"),
+            "openai1": self.make_llm_config("openai1", "openai"),
+        }
+        app.parent_app.failover_chain = ["scaleway1", "openai1"]
+        app.parent_app.circuit_breakers = CircuitBreakers()
+        app.parent_app.health_scores = HealthScores()
+        return app
+
+    @staticmethod
+    def served(llm_config_id: str) -> dict:
+        return {
+            KEY_ANALYSIS_RESULT: {
+                FIELD_NAME_SCORINGS: [],
+                KEY_STATISTICS: {"LLM config": llm_config_id},
+            },
+        }
+
+    def analyze(self, app: LocalizedApp, llm_config_id: str = "scaleway1") -> dict:
+        return app.analyze(
+            app_id="test_app",
+            locale="fr",
+            field_values={},
+            text="Test text",
+            read_from_cache=False,
+            llm_config_id=llm_config_id,
+        )
+
+    def test_failover_to_next_entry(self) -> None:
+        """Test que l'entrée suivante de la chaîne sert la requête quand la première échoue."""
+
+        def analyze(llm_config, **kwargs):
+            if llm_config.id == "scaleway1":
+                msg = "Service unavailable"
+                raise ValueError(msg)
+            return self.served(llm_config.id)
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze)
+            result = self.analyze(app)
+
+        statistics = result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]
+        assert statistics["LLM config"] == "openai1"
+        assert statistics["Failover from"] == "scaleway1"
+
+    def test_unhealthy_entry_skipped(self) -> None:
+        """Test que les requêtes vont directement à la première entrée en bonne santé."""
+        analyze = Mock(side_effect=lambda llm_config, **kwargs: self.served(llm_config.id))
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze)
+            for _ in range(5):
+                app.parent_app.health_scores.get("scaleway1").record_failure()
+            result = self.analyze(app)
+
+        assert result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]["LLM config"] == "openai1"
+        assert analyze.call_count == 1
+
+    def test_fallback_when_whole_chain_fails(self) -> None:
+        """Test que la réponse minimale n'est retournée qu'après l'échec de toute la chaîne."""
+        analyze = Mock(side_effect=ValueError("Service unavailable"))
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze)
+            result = self.analyze(app)
+
+        assert analyze.call_count == 2
+        assert "Error code" in result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]
+
+    def test_failover_from_requested_entry(self) -> None:
+        """Test que les entrées de la chaîne avant le llm_config demandé ne sont pas essayées."""
+        analyze = Mock(side_effect=ValueError("Service unavailable"))
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze)
+            self.analyze(app, "openai1")
+
+        assert analyze.call_count == 1
+        assert analyze.call_args.kwargs["llm_config"].id == "openai1"
+
+    def test_llm_config_outside_chain(self) -> None:
+        """Test qu'un llm_config hors de la chaîne n'a pas de failover."""
+        analyze = Mock(side_effect=ValueError("Service unavailable"))
+
+        with patch.object(LocalizedApp, "__init__", lambda self, *args, **kwargs: None):
+            app = self.make_app(analyze)
+            app.parent_app.failover_chain = ["openai1"]
+            result = self.analyze(app)
+
+        assert analyze.call_count == 1
+        assert result[KEY_ANALYSIS_RESULT][KEY_STATISTICS]["LLM config"] == "scaleway1"
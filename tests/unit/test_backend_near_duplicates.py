@@ -0,0 +1,58 @@
+"""Tests unitaires pour la détection des textes quasi identiques (MinHash et LSH)."""
+
+from src.backend.text_analysis.near_duplicates import (
+    NearDuplicateIndex,
+    get_shingles,
+    get_signature,
+    get_similarity,
+)
+
+TEXT = (
+    "Bonjour, je souhaite renouveler mon titre de séjour qui expire le 15 mars. "
+    "Pouvez-vous m'indiquer les pièces à fournir ? Cordialement, Jean Dupont"
+)
+
+
+class TestSignature:
+    """Tests pour get_shingles(), get_signature() et get_similarity()."""
+
+    def test_quoted_lines_ignored(self) -> None:
+        assert get_shingles(TEXT + "\n> Message précédent\n>> Encore avant") == get_shingles(TEXT)
+        # Un texte entièrement cité est gardé tel quel
+        assert "> tou" in get_shingles("> Tout est cité")
+
+    def test_short_text(self) -> None:
+        assert get_shingles(" Oui ") == {"oui"}
+
+    def test_similarity(self) -> None:
+        signature = get_signature(TEXT)
+
+        assert get_similarity(signature, get_signature(TEXT.upper())) == 1.0
+        assert get_similarity(signature, get_signature(TEXT.replace("Jean", "J."))) > 0.8
+        assert get_similarity(signature, get_signature("Je demande l'asile politique.")) < 0.2
+
+
+class TestNearDuplicateIndex:
+    """Tests pour NearDuplicateIndex."""
+
+    def test_find(self) -> None:
+        index = NearDuplicateIndex()
+        index.add("context", "key1", get_signature(TEXT))
+        index.add("context", "key2", get_signature("Je demande l'asile politique."))
+        index.add("other_context", "key3", get_signature(TEXT))
+
+        found = index.find("context", get_signature(TEXT.replace("Jean", "J.")), 0.7)
+
+        assert [cache_key for _similarity, cache_key in found] == ["key1"]
+        assert index.find("context", get_signature(TEXT), 1.0)[0] == (1.0, "key1")
+
+    def test_max_entries(self) -> None:
+        index = NearDuplicateIndex(max_entries=2)
+        for i in range(3):
+            index.add("context", f"key{i}", get_signature(f"{TEXT} {i}"))
+        index.add("context", "key1", get_signature(f"{TEXT} 1"))
+
+        assert len(index) == 2
+        found = index.find("context", get_signature(f"{TEXT} 0"), 0.5)
+        assert sorted(cache_key for _similarity, cache_key in found) == ["key1", "key2"]
+        assert all(index._buckets.values())
@@ -0,0 +1,193 @@
+"""Tests unitaires pour le limiteur de débit côté client des appels aux LLM."""
+
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.backend.backend.app import App
+from src.backend.text_analysis.analysis_cache import JsonFilesAnalysisCache
+from src.backend.text_analysis.llm import LlmUsage
+from src.backend.text_analysis.llm_registry import LlmRegistry
+from src.backend.text_analysis.rate_limiter import (
+    LlmLimiters,
+    RateLimiter,
+    RateLimitQueueFullError,
+)
+from src.backend.text_analysis.text_analyzer import TextAnalyzer
+from src.common.constants import KEY_ANALYSIS_RESULT, KEY_STATISTICS
+
+
+class TestRateLimiter:
+    """Tests pour RateLimiter.acquire() et acquire_async()."""
+
+    @patch("time.sleep")
+    def test_requests_budget_fifo(self, mock_sleep) -> None:
+        """Test que les appels au-delà du budget attendent, chacun derrière le précédent."""
+        with patch("time.monotonic", return_value=0.0):
+            rate_limiter = RateLimiter(requests_per_minute=2, tokens_per_minute=None, max_queue_size=10)
+            waits = [rate_limiter.acquire(100) for _ in range(4)]
+
+        assert waits == [0.0, 0.0, pytest.approx(30.0), pytest.approx(60.0)]
+        assert mock_sleep.call_count == 2
+        assert rate_limiter.queue_size == 0
+
+    @patch("time.sleep")
+    def test_tokens_budget(self, mock_sleep) -> None:
+        """Test que le budget de tokens estimés est respecté, et qu'un appel trop gros n'attend pas indéfiniment."""
+        with patch("time.monotonic", return_value=0.0):
+            rate_limiter = RateLimiter(requests_per_minute=None, tokens_per_minute=600, max_queue_size=10)
+            assert rate_limiter.acquire(500) == 0.0
+            assert rate_limiter.acquire(200) == pytest.approx(10.0)
+            assert rate_limiter.acquire(10_000) == pytest.approx(70.0)
+
+    @patch("time.sleep")
+    def test_refill(self, mock_sleep) -> None:
+        """Test que le budget se reconstitue avec le temps."""
+        with patch("time.monotonic", return_value=0.0):
+            rate_limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=None, max_queue_size=10)
+            assert rate_limiter.acquire(1) == 0.0
+        with patch("time.monotonic", return_value=60.0):
+            assert rate_limiter.acquire(1) == 0.0
+        mock_sleep.assert_not_called()
+
+    def test_queue_full(self) -> None:
+        """Test qu'un appel est refusé quand la file d'attente est pleine."""
+        rate_limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=None, max_queue_size=1)
+        rate_limiter.queue_size = 1
+
+        with pytest.raises(RateLimitQueueFullError):
+            rate_limiter.acquire(1)
+
+    def test_acquire_async_leaves_queue(self) -> None:
+        """Test que l'attente asynchrone libère sa place dans la file, même annulée."""
+        rate_limiter = RateLimiter(requests_per_minute=1, tokens_per_minute=None, max_queue_size=10)
+
+        async def run() -> None:
+            assert await rate_limiter.acquire_async(1) == 0.0
+            task = asyncio.create_task(rate_limiter.acquire_async(1))
+            await asyncio.sleep(0)
+            assert rate_limiter.queue_size == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert rate_limiter.queue_size == 0
+
+
+class TestLlmRegistryRateLimiter:
+    """Tests pour LlmRegistry.get_rate_limiter()."""
+
+    def test_no_limits(self, sample_llm_config) -> None:
+        assert LlmRegistry().get_rate_limiter(sample_llm_config) is None
+
+    def test_shared_per_llm_config(self, sample_llm_config) -> None:
+        registry = LlmRegistry()
+        llm_config = sample_llm_config.model_copy(update={"requests_per_minute": 60})
+
+        rate_limiter = registry.get_rate_limiter(llm_config)
+        assert rate_limiter is not None
+        assert registry.get_rate_limiter(llm_config) is rate_limiter
+        assert (
+            registry.get_rate_limiter(llm_config.model_copy(update={"requests_per_minute": 30}))
+            is not rate_limiter
+        )
+
+
+class TestLlmLimiters:
+    """Tests pour LlmLimiters, partagés par les apps du serveur."""
+
+    @patch("time.sleep")
+    def test_shared_by_apps(self, mock_sleep, tmp_path) -> None:
+        """Test que deux apps utilisant la même llm_config consomment un seul budget."""
+        llm_limiters = LlmLimiters()
+        app_def = Mock(locales="fr", decision_engine_configs=[])
+        with patch(
+            "src.backend.backend.app.load_app_def_from_workbook",
+            return_value=app_def,
+        ), patch("src.backend.backend.app.LocalizedApp"):
+            apps = [
+                App(
+                    "runtime",
+                    app_id,
+                    analysis_cache=JsonFilesAnalysisCache(str(tmp_path)),
+                    llm_limiters=llm_limiters,
+                )
+                for app_id in ("app1", "app2")
+            ]
+        llm_config = next(iter(apps[0].llm_configs.values())).model_copy(
+            update={"requests_per_minute": 1},
+        )
+
+        with patch("time.monotonic", return_value=0.0):
+            waits = [app.llm_registry.get_rate_limiter(llm_config).acquire(1) for app in apps]
+
+        assert apps[0].llm_registry is not apps[1].llm_registry
+        assert waits == [0.0, pytest.approx(60.0)]
+
+
+    def test_semaphore_shared_by_registries(self, sample_llm_config) -> None:
+        """Test que max_concurrency borne les appels de toutes les apps ensemble."""
+        llm_limiters = LlmLimiters()
+        registries = [LlmRegistry(llm_limiters=llm_limiters) for _ in range(2)]
+
+        semaphore = registries[0].get_semaphore(sample_llm_config)
+
+        assert registries[1].get_semaphore(sample_llm_config) is semaphore
+        assert LlmRegistry().get_semaphore(sample_llm_config) is not semaphore
+
+
+class TestTextAnalyzerQueueWait:
+    """Tests du temps d'attente dans la file reporté dans les statistiques."""
+
+    @patch("time.sleep")
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_queue_wait_in_statistics(
+        self,
+        mock_llm_class,
+        mock_sleep,
+        sample_case_model,
+        sample_text_analysis_config,
+        sample_llm_config,
+        temp_runtime_directory,
+    ) -> None:
+        analyzer = TextAnalyzer(
+            runtime_directory=temp_runtime_directory,
+            app_id="test_app",
+            locale="fr",
+            case_model=sample_case_model,
+            text_analysis_config=sample_text_analysis_config,
+        )
+        llm_config = sample_llm_config.model_copy(update={"requests_per_minute": 1})
+        mock_result = Mock()
+        mock_result.model_dump.side_effect = lambda **kwargs: {"scorings": [], "nom": None}
+        mock_llm_class.return_value.call_llm_with_json_schema.side_effect = lambda *args: (
+            mock_result,
+            LlmUsage(),
+        )
+
+        with patch("time.monotonic", return_value=0.0):
+            analyzer.llm_registry.get_rate_limiter(llm_config)
+            results = [
+                analyzer.analyze(
+                    locale="fr",
+                    llm_config=llm_config,
+                    field_values={},
+                    text=f"Texte {i}",
+                    read_from_cache=False,
+                )
+                for i in range(2)
+            ]
+
+        first, second = (result[KEY_ANALYSIS_RESULT][KEY_STATISTICS] for result in results)
+        assert first["Queue wait time"] == "0.00s"
+        assert second["Queue wait time"] == "60.00s"
+        assert second["Response time"] == "0.00s"
+        mock_sleep.assert_called_once()
+
+    def test_split_keeps_queue_wait(self) -> None:
+        """Test que chaque texte d'un appel groupé a attendu tout le temps de l'appel."""
+        usages = LlmUsage(prompt_tokens=10, queue_wait=2.0).split(2)
+
+        assert [usage.queue_wait for usage in usages] == [2.0, 2.0]
@@ -0,0 +1,141 @@
+"""Tests unitaires pour la politique de retry : classification des erreurs, backoff et disjoncteur."""
+
+from unittest.mock import Mock, patch
+
+import httpx
+import openai
+
+from src.backend.text_analysis.json_repair import LlmValidationError
+from src.backend.text_analysis.llm import LlmConfigurationError
+from src.backend.text_analysis.retry_policy import (
+    CircuitBreaker,
+    CircuitBreakerOpenError,
+    CircuitBreakers,
+    get_retry_after,
+    get_retry_delay,
+    is_provider_failure,
+    is_transient,
+)
+
+
+def make_status_error(status_code: int, headers: dict[str, str] | None = None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def make_llm_config() -> Mock:
+    llm_config = Mock()
+    llm_config.retry_initial_delay = 1.0
+    llm_config.retry_max_delay = 8.0
+    return llm_config
+
+
+class TestIsTransient:
+    """Tests de la classification des erreurs."""
+
+    def test_configuration_error_is_not_transient(self) -> None:
+        assert not is_transient(LlmConfigurationError("OPENAI_API_KEY environment variable is not set"))
+
+    def test_circuit_open_is_not_transient(self) -> None:
+        assert not is_transient(CircuitBreakerOpenError("open"))
+
+    def test_authentication_error_is_not_transient(self) -> None:
+        assert not is_transient(make_status_error(401))
+        assert not is_transient(make_status_error(400))
+
+    def test_rate_limit_and_server_errors_are_transient(self) -> None:
+        assert is_transient(make_status_error(429))
+        assert is_transient(make_status_error(503))
+        assert is_transient(make_status_error(529))
+
+    def test_validation_error_is_transient(self) -> None:
+        assert is_transient(LlmValidationError("invalid", "{}", "errors"))
+
+    def test_wrapped_error_is_classified_by_its_cause(self) -> None:
+        try:
+            try:
+                raise make_status_error(401)
+            except openai.APIStatusError as e:
+                msg = "OpenAI API error"
+                raise ValueError(msg) from e
+        except ValueError as e:
+            assert not is_transient(e)
+
+    def test_unknown_error_is_transient(self) -> None:
+        assert is_transient(ValueError("Connection reset"))
+
+    def test_provider_failures(self) -> None:
+        """Test que seules les erreurs transitoires du fournisseur comptent pour le disjoncteur."""
+        assert is_provider_failure(make_status_error(503))
+        assert is_provider_failure(ValueError("Connection reset"))
+        assert not is_provider_failure(make_status_error(401))
+        assert not is_provider_failure(LlmValidationError("invalid", "{}", "errors"))
+
+
+class TestRetryDelay:
+    """Tests du calcul du délai avant une nouvelle tentative."""
+
+    def test_retry_after_seconds(self) -> None:
+        assert get_retry_after(make_status_error(429, {"Retry-After": "7"})) == 7.0
+
+    def test_retry_after_is_honored(self) -> None:
+        error = make_status_error(429, {"Retry-After": "3"})
+        assert get_retry_delay(make_llm_config(), 1, error) == 3.0
+
+    def test_retry_after_absent(self) -> None:
+        assert get_retry_after(make_status_error(503)) is None
+        assert get_retry_after(ValueError("error")) is None
+
+    def test_backoff_is_jittered_and_capped(self) -> None:
+        llm_config = make_llm_config()
+        with patch("random.uniform", side_effect=lambda a, b: b) as mock_uniform:
+            assert get_retry_delay(llm_config, 1, ValueError()) == 1.0
+            assert get_retry_delay(llm_config, 3, ValueError()) == 4.0
+            assert get_retry_delay(llm_config, 10, ValueError()) == 8.0
+        assert all(call.args[0] == 0 for call in mock_uniform.call_args_list)
+
+
+class TestCircuitBreaker:
+    """Tests du disjoncteur par fournisseur."""
+
+    def test_opens_after_threshold(self) -> None:
+        circuit_breaker = CircuitBreaker("openai", failure_threshold=3)
+        for _ in range(2):
+            circuit_breaker.record_failure()
+        assert circuit_breaker.allow_request()
+        circuit_breaker.record_failure()
+        assert not circuit_breaker.allow_request()
+        assert circuit_breaker.get_state()["state"] == "open"
+        assert circuit_breaker.get_state()["times_opened"] == 1
+
+    def test_success_resets_failures(self) -> None:
+        circuit_breaker = CircuitBreaker("openai", failure_threshold=2)
+        circuit_breaker.record_failure()
+        circuit_breaker.record_success()
+        circuit_breaker.record_failure()
+        assert circuit_breaker.allow_request()
+
+    def test_half_open_trial_call(self) -> None:
+        circuit_breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30.0)
+        with patch("time.monotonic", return_value=100.0):
+            circuit_breaker.record_failure()
+        with patch("time.monotonic", return_value=131.0):
+            assert circuit_breaker.allow_request()
+            assert circuit_breaker.get_state()["state"] == "half_open"
+            # Un seul appel d'essai à la fois
+            assert not circuit_breaker.allow_request()
+            circuit_breaker.record_failure()
+            assert circuit_breaker.get_state()["state"] == "open"
+        with patch("time.monotonic", return_value=162.0):
+            assert circuit_breaker.allow_request()
+            circuit_breaker.record_success()
+        assert circuit_breaker.get_state()["state"] == "closed"
+        assert circuit_breaker.get_state()["times_opened"] == 2
+
+    def test_circuit_breakers_per_provider(self) -> None:
+        circuit_breakers = CircuitBreakers()
+        assert circuit_breakers.get("openai") is circuit_breakers.get("openai")
+        assert circuit_breakers.get("openai") is not circuit_breakers.get("ollama")
+        providers = [state["provider"] for state in circuit_breakers.get_states()]
+        assert providers == ["ollama", "openai"]
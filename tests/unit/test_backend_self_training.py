@@ -0,0 +1,253 @@
+"""Tests unitaires pour l'auto-apprentissage du pré-routeur local."""
+
+import asyncio
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.backend.text_analysis.base_models import Intention
+from src.backend.text_analysis.llm import LlmConfig, LlmUsage
+from src.backend.text_analysis.llm_local import LlmLocal
+from src.backend.text_analysis.self_training import (
+    MAX_EXAMPLE_TEXT_LENGTH,
+    SelfTrainer,
+    get_previous_filename,
+    get_split,
+    load_collected_examples,
+    record_example,
+)
+from src.backend.text_analysis.text_analyzer import TextAnalyzer
+
+SEED_EXAMPLES = [
+    ("asile", "Je souhaite déposer une demande d'asile."),
+    ("renouvellement", "Je dois renouveler mon titre de séjour."),
+]
+
+
+def make_texts(count: int) -> list[tuple[str, str]]:
+    """Textes variés des deux intentions, comme s'ils avaient été étiquetés par le LLM."""
+    texts = []
+    for i in range(count):
+        texts.append(("asile", f"Bonjour, je voudrais demander l'asile politique, dossier {i}."))
+        texts.append(
+            ("renouvellement", f"Ma carte de séjour expire, comment la renouveler ? Réf {i}"),
+        )
+    return texts
+
+
+@pytest.fixture()
+def analyzer(sample_case_model, sample_text_analysis_config, temp_runtime_directory, tmp_path):
+    examples_filename = tmp_path / "examples.csv"
+    examples_filename.write_text(
+        "id,split,text\n" + "".join(f'{i},train,"{t}"\n' for i, t in SEED_EXAMPLES),
+        encoding="utf-8",
+    )
+    text_analysis_config = sample_text_analysis_config.model_copy(
+        update={
+            "intentions": [
+                Intention(id=intention_id, label=intention_id, description=intention_id)
+                for intention_id in ("asile", "renouvellement")
+            ],
+            "pre_router_llm_config_id": "local1",
+            "self_training": True,
+        },
+    )
+    analyzer = TextAnalyzer(
+        runtime_directory=temp_runtime_directory,
+        app_id="test_app",
+        locale="fr",
+        case_model=sample_case_model,
+        text_analysis_config=text_analysis_config,
+    )
+    analyzer.llm_registry.llm_configs = {
+        "local1": LlmConfig(
+            id="local1",
+            llm="local",
+            model="char-ngram-tfidf",
+            response_format_type="pydantic_model",
+            prompt_format="text",
+            temperature=0,
+            examples_filename=str(examples_filename),
+        ),
+    }
+    return analyzer
+
+
+class TestCollectedExamples:
+    """Tests pour la collecte des exemples étiquetés."""
+
+    def test_record_and_load(self, tmp_path) -> None:
+        filename = str(tmp_path / "self_training" / "examples.csv")
+        texts = make_texts(50)
+        for intention_id, text in texts:
+            record_example(filename, intention_id, text)
+        # Un texte réétiqueté garde sa dernière étiquette
+        record_example(filename, "autre", texts[0][1])
+
+        train = load_collected_examples(filename, "train")
+        holdout = load_collected_examples(filename, "test")
+
+        assert len(train) + len(holdout) == len(texts)
+        assert 0 < len(holdout) < len(train)
+        assert all(get_split(text) == "test" for _intention_id, text in holdout)
+        assert ("autre", texts[0][1]) in train + holdout
+
+    def test_text_with_separators(self, tmp_path) -> None:
+        filename = str(tmp_path / "examples.csv")
+        text = 'Bonjour, "urgent"\nsur deux lignes'
+        record_example(filename, "asile", text)
+
+        assert load_collected_examples(filename, get_split(text)) == [("asile", text)]
+
+    def test_rotation(self, tmp_path) -> None:
+        """Test qu'au plus deux fois max_examples textes sont gardés, les plus anciens supprimés."""
+        filename = str(tmp_path / "examples.csv")
+        texts = [text for _intention_id, text in make_texts(5)]
+        for text in texts:
+            record_example(filename, "asile", text, max_examples=4)
+
+        assert os.path.exists(get_previous_filename(filename))
+        collected = {
+            text
+            for split in ("train", "test")
+            for _intention_id, text in load_collected_examples(filename, split)
+        }
+        assert collected == set(texts[4:])
+
+    def test_text_truncated(self, tmp_path) -> None:
+        filename = str(tmp_path / "examples.csv")
+        text = "x" * (MAX_EXAMPLE_TEXT_LENGTH + 100)
+        record_example(filename, "asile", text)
+
+        truncated = text[:MAX_EXAMPLE_TEXT_LENGTH]
+        assert load_collected_examples(filename, get_split(truncated)) == [("asile", truncated)]
+
+
+class TestTextAnalyzerSelfTraining:
+    """Tests pour la collecte par TextAnalyzer des intentions sûres du LLM."""
+
+    @pytest.mark.parametrize(("scores", "collected"), [((9, 1), True), ((9, 9), False), ((6, 1), False)])
+    def test_collect(self, analyzer, sample_llm_config, scores, collected) -> None:
+        def call_llm(llm_config, system_prompt, text, response_model=None):
+            return analyzer.analysis_response_model.model_validate(
+                {
+                    "scorings": [
+                        {"intention_id": intention_id, "score": score, "justification": ""}
+                        for intention_id, score in zip(("asile", "renouvellement"), scores)
+                    ],
+                },
+            ), LlmUsage()
+
+        analyzer.text_analysis_config.pre_router_llm_config_id = None
+        with patch.object(analyzer, "_call_llm", side_effect=call_llm):
+            analyzer.analyze(
+                locale="fr",
+                llm_config=sample_llm_config,
+                field_values={},
+                text="Je demande l'asile",
+                read_from_cache=False,
+            )
+
+        filename = analyzer.get_self_training_filename()
+        if collected:
+            assert load_collected_examples(filename, get_split("Je demande l'asile")) == [
+                ("asile", "Je demande l'asile"),
+            ]
+        else:
+            assert not os.path.exists(filename)
+
+    def test_collect_async(self, analyzer, sample_llm_config) -> None:
+        """Test que l'analyse asynchrone écrit l'exemple hors de la boucle d'événements."""
+
+        async def call_llm(llm_config, system_prompt, text, response_model=None):
+            return analyzer.analysis_response_model.model_validate(
+                {
+                    "scorings": [
+                        {"intention_id": "asile", "score": 9, "justification": ""},
+                        {"intention_id": "renouvellement", "score": 1, "justification": ""},
+                    ],
+                },
+            ), LlmUsage()
+
+        analyzer.text_analysis_config.pre_router_llm_config_id = None
+        to_thread = asyncio.to_thread
+        with (
+            patch.object(analyzer, "_call_llm_once_async", side_effect=call_llm),
+            patch(
+                "src.backend.text_analysis.text_analyzer.asyncio.to_thread",
+                side_effect=to_thread,
+            ) as mock_to_thread,
+        ):
+            asyncio.run(
+                analyzer.analyze_async(
+                    locale="fr",
+                    llm_config=sample_llm_config,
+                    field_values={},
+                    text="Je demande l'asile",
+                    read_from_cache=False,
+                ),
+            )
+
+        assert analyzer._record_self_training_example in [
+            call.args[0] for call in mock_to_thread.call_args_list
+        ]
+        assert load_collected_examples(
+            analyzer.get_self_training_filename(),
+            get_split("Je demande l'asile"),
+        ) == [("asile", "Je demande l'asile")]
+
+
+class TestSelfTrainer:
+    """Tests pour SelfTrainer."""
+
+    @staticmethod
+    def collect(analyzer, count: int) -> None:
+        for intention_id, text in make_texts(count):
+            record_example(analyzer.get_self_training_filename(), intention_id, text)
+
+    def test_swap(self, analyzer) -> None:
+        self.collect(analyzer, 100)
+
+        (report,) = SelfTrainer(lambda: [analyzer]).run()
+
+        assert report["swapped"] is True
+        assert report["accuracy"] >= 0.9
+        assert report["accuracy"] >= report["current_accuracy"]
+        llm = analyzer.get_llm(analyzer.llm_registry.llm_configs["local1"])
+        assert llm is analyzer.pre_router_llm
+        assert isinstance(llm, LlmLocal)
+
+    def test_no_swap_below_min_accuracy(self, analyzer) -> None:
+        analyzer.text_analysis_config.self_training_min_accuracy = 1.01
+        self.collect(analyzer, 100)
+
+        (report,) = SelfTrainer(lambda: [analyzer]).run()
+
+        assert report["swapped"] is False
+        assert analyzer.pre_router_llm is None
+
+    def test_not_enough_holdout_examples(self, analyzer) -> None:
+        self.collect(analyzer, 5)
+
+        (report,) = SelfTrainer(lambda: [analyzer]).run()
+
+        assert report["swapped"] is False
+        assert "accuracy" not in report
+
+    def test_self_training_disabled(self, analyzer) -> None:
+        analyzer.text_analysis_config.self_training = False
+
+        assert SelfTrainer(lambda: [analyzer]).run() == []
+
+    def test_schedule(self) -> None:
+        ran = threading.Event()
+        self_trainer = SelfTrainer(list)
+
+        with patch.object(self_trainer, "run", side_effect=ran.set):
+            self_trainer.schedule(0.01)
+            assert ran.wait(5)
+            self_trainer.schedule(None)
+
+        assert self_trainer.interval is None
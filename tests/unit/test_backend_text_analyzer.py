@@ -2,18 +2,34 @@
 Objectif : 90%+ de couverture.
 """
 
+import asyncio
 import json
 import os
-from unittest.mock import Mock, patch
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
-from src.backend.text_analysis.base_models import FIELD_NAME_SCORINGS, Feature
-from src.backend.text_analysis.llm import LlmConfig
-from src.backend.text_analysis.text_analyzer import TextAnalyzer, create_analysis_models
+from src.backend.backend.paths import get_cache_file_path
+from src.backend.backend.usage_statistics import UsageStatistics
+from src.backend.text_analysis.analysis_cache import CACHE_KEY_VERSION
+from src.backend.text_analysis.base_models import (
+    FIELD_NAME_SCORINGS,
+    Feature,
+    Intention,
+)
+from src.backend.text_analysis.json_repair import LlmValidationError
+from src.backend.text_analysis.llm import LlmConfig, LlmUsage
+from src.backend.text_analysis.text_analyzer import (
+    TextAnalyzer,
+    create_analysis_models,
+)
 from src.common.case_model import CaseField, CaseModel
 from src.common.constants import (
     KEY_ANALYSIS_RESULT,
+    KEY_CACHE_KEY,
     KEY_HASH_CODE,
     KEY_HIGHLIGHTED_TEXT_AND_FEATURES,
     KEY_MARKDOWN_TABLE,
@@ -21,6 +37,11 @@ from src.common.constants import (
     KEY_STATISTICS,
 )
 
+INTENTIONS = [
+    Intention(id=f"intention{i}", label=f"Intention {i}", description=f"Description {i}")
+    for i in range(1, 4)
+]
+
 
 class TestCreateAnalysisModels:
     """Tests pour create_analysis_models()."""
@@ -189,23 +210,7 @@ class TestTextAnalyzerInit:
 class TestTextAnalyzerAnalyze:
     """Tests pour analyze() et _analyze()."""
 
-    @pytest.fixture()
-    def analyzer(
-        self,
-        sample_case_model,
-        sample_text_analysis_config,
-        temp_runtime_directory,
-    ):
-        """Fixture pour TextAnalyzer."""
-        return TextAnalyzer(
-            runtime_directory=temp_runtime_directory,
-            app_id="test_app",
-            locale="fr",
-            case_model=sample_case_model,
-            text_analysis_config=sample_text_analysis_config,
-        )
-
-    @patch("src.backend.text_analysis.text_analyzer.LlmOpenAI")
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
     def test_analyze_with_json_schema(
         self,
         mock_llm_class,
@@ -217,7 +222,7 @@ class TestTextAnalyzerAnalyze:
             "src.backend.text_analysis.text_analyzer.short_hash",
             return_value="test_hash",
         ), patch(
-            "src.backend.text_analysis.text_analyzer.get_cache_file_path",
+            "src.backend.text_analysis.analysis_cache.get_cache_file_path",
         ) as mock_get_cache:
             mock_get_cache.return_value = "/tmp/cache.json"
 
@@ -234,7 +239,10 @@ class TestTextAnalyzerAnalyze:
                 ],
                 "nom": "Dupont",
             }
-            mock_llm_instance.call_llm_with_json_schema.return_value = mock_result
+            mock_llm_instance.call_llm_with_json_schema.return_value = (
+                mock_result,
+                LlmUsage(),
+            )
             mock_llm_class.return_value = mock_llm_instance
 
             # Test
@@ -256,7 +264,7 @@ class TestTextAnalyzerAnalyze:
             assert FIELD_NAME_SCORINGS in analysis_result
             assert KEY_STATISTICS in analysis_result
 
-    @patch("src.backend.text_analysis.text_analyzer.LlmOpenAI")
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
     def test_analyze_with_pydantic_model(self, mock_llm_class, analyzer) -> None:
         """Test analyze() avec response_format_type='pydantic_model'."""
         mock_llm_config = LlmConfig(
@@ -272,7 +280,7 @@ class TestTextAnalyzerAnalyze:
             "src.backend.text_analysis.text_analyzer.short_hash",
             return_value="test_hash",
         ), patch(
-            "src.backend.text_analysis.text_analyzer.get_cache_file_path",
+            "src.backend.text_analysis.analysis_cache.get_cache_file_path",
         ) as mock_get_cache:
             mock_get_cache.return_value = "/tmp/cache.json"
 
@@ -288,7 +296,10 @@ class TestTextAnalyzerAnalyze:
                 ],
                 "nom": None,
             }
-            mock_llm_instance.call_llm_with_pydantic_model.return_value = mock_result
+            mock_llm_instance.call_llm_with_pydantic_model.return_value = (
+                mock_result,
+                LlmUsage(),
+            )
             mock_llm_class.return_value = mock_llm_instance
 
             result = analyzer.analyze(
@@ -303,7 +314,7 @@ class TestTextAnalyzerAnalyze:
             mock_llm_instance.call_llm_with_pydantic_model.assert_called_once()
 
     @patch("src.backend.text_analysis.text_analyzer.short_hash")
-    @patch("src.backend.text_analysis.text_analyzer.get_cache_file_path")
+    @patch("src.backend.text_analysis.analysis_cache.get_cache_file_path")
     def test_analyze_with_cache(
         self,
         mock_get_cache_path,
@@ -352,7 +363,7 @@ class TestTextAnalyzerAnalyze:
         assert analysis_result[FIELD_NAME_SCORINGS][0]["score"] == 10
 
     @patch("src.backend.text_analysis.text_analyzer.short_hash")
-    @patch("src.backend.text_analysis.text_analyzer.get_cache_file_path")
+    @patch("src.backend.text_analysis.analysis_cache.get_cache_file_path")
     def test_analyze_cache_missing_file(
         self,
         mock_get_cache_path,
@@ -372,12 +383,15 @@ class TestTextAnalyzerAnalyze:
         # Ne pas créer le fichier de cache
 
         with patch(
-            "src.backend.text_analysis.text_analyzer.LlmOpenAI",
+            "src.backend.text_analysis.llm_registry.LlmOpenAI",
         ) as mock_llm_class:
             mock_llm_instance = Mock()
             mock_result = Mock()
             mock_result.model_dump.return_value = {"scorings": [], "nom": None}
-            mock_llm_instance.call_llm_with_json_schema.return_value = mock_result
+            mock_llm_instance.call_llm_with_json_schema.return_value = (
+                mock_result,
+                LlmUsage(),
+            )
             mock_llm_class.return_value = mock_llm_instance
 
             analyzer.analyze(
@@ -410,7 +424,7 @@ class TestTextAnalyzerAnalyze:
                 read_from_cache=False,
             )
 
-    @patch("src.backend.text_analysis.text_analyzer.LlmOllama")
+    @patch("src.backend.text_analysis.llm_registry.LlmOllama")
     def test_analyze_with_ollama(self, mock_llm_class, analyzer) -> None:
         """Test avec LLM Ollama."""
         mock_llm_config = LlmConfig(
@@ -427,14 +441,17 @@ class TestTextAnalyzerAnalyze:
             "src.backend.text_analysis.text_analyzer.short_hash",
             return_value="test_hash",
         ), patch(
-            "src.backend.text_analysis.text_analyzer.get_cache_file_path",
+            "src.backend.text_analysis.analysis_cache.get_cache_file_path",
         ) as mock_get_cache:
             mock_get_cache.return_value = "/tmp/cache.json"
 
             mock_llm_instance = Mock()
             mock_result = Mock()
             mock_result.model_dump.return_value = {"scorings": [], "nom": None}
-            mock_llm_instance.call_llm_with_json_schema.return_value = mock_result
+            mock_llm_instance.call_llm_with_json_schema.return_value = (
+                mock_result,
+                LlmUsage(),
+            )
             mock_llm_class.return_value = mock_llm_instance
 
             result = analyzer.analyze(
@@ -448,7 +465,7 @@ class TestTextAnalyzerAnalyze:
             assert KEY_ANALYSIS_RESULT in result
             mock_llm_class.assert_called_once_with(mock_llm_config)
 
-    @patch("src.backend.text_analysis.text_analyzer.LlmScaleway")
+    @patch("src.backend.text_analysis.llm_registry.LlmScaleway")
     def test_analyze_with_scaleway(self, mock_llm_class, analyzer) -> None:
         """Test avec LLM Scaleway."""
         mock_llm_config = LlmConfig(
@@ -465,14 +482,17 @@ class TestTextAnalyzerAnalyze:
             "src.backend.text_analysis.text_analyzer.short_hash",
             return_value="test_hash",
         ), patch(
-            "src.backend.text_analysis.text_analyzer.get_cache_file_path",
+            "src.backend.text_analysis.analysis_cache.get_cache_file_path",
         ) as mock_get_cache:
             mock_get_cache.return_value = "/tmp/cache.json"
 
             mock_llm_instance = Mock()
             mock_result = Mock()
             mock_result.model_dump.return_value = {"scorings": [], "nom": None}
-            mock_llm_instance.call_llm_with_json_schema.return_value = mock_result
+            mock_llm_instance.call_llm_with_json_schema.return_value = (
+                mock_result,
+                LlmUsage(),
+            )
             mock_llm_class.return_value = mock_llm_instance
 
             result = analyzer.analyze(
@@ -486,7 +506,7 @@ class TestTextAnalyzerAnalyze:
             assert KEY_ANALYSIS_RESULT in result
             mock_llm_class.assert_called_once_with(mock_llm_config)
 
-    @patch("src.backend.text_analysis.text_analyzer.LlmOpenAI")
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
     def test_analyze_adds_intention_other(
         self,
         mock_llm_class,
@@ -498,7 +518,7 @@ class TestTextAnalyzerAnalyze:
             "src.backend.text_analysis.text_analyzer.short_hash",
             return_value="test_hash",
         ), patch(
-            "src.backend.text_analysis.text_analyzer.get_cache_file_path",
+            "src.backend.text_analysis.analysis_cache.get_cache_file_path",
         ) as mock_get_cache:
             mock_get_cache.return_value = "/tmp/cache.json"
 
@@ -514,7 +534,10 @@ class TestTextAnalyzerAnalyze:
                 ],
                 "nom": None,
             }
-            mock_llm_instance.call_llm_with_json_schema.return_value = mock_result
+            mock_llm_instance.call_llm_with_json_schema.return_value = (
+                mock_result,
+                LlmUsage(),
+            )
             mock_llm_class.return_value = mock_llm_instance
 
             result = analyzer.analyze(
@@ -540,24 +563,59 @@ class TestTextAnalyzerAnalyze:
             assert other_scoring.get("intention_label") == "AUTRE"  # En français
 
 
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_analyze_async_with_json_schema(
+        self,
+        mock_llm_class,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test analyze_async() : l'appel au LLM passe par la variante asynchrone."""
+        with patch(
+            "src.backend.text_analysis.text_analyzer.short_hash",
+            return_value="test_hash",
+        ), patch(
+            "src.backend.text_analysis.analysis_cache.get_cache_file_path",
+        ) as mock_get_cache:
+            mock_get_cache.return_value = "/tmp/cache.json"
+
+            mock_llm_instance = Mock()
+            mock_result = Mock()
+            mock_result.model_dump.return_value = {
+                "scorings": [
+                    {
+                        "intention_id": "intention1",
+                        "score": 8,
+                        "justification": "Test justification",
+                    },
+                ],
+                "nom": "Dupont",
+            }
+            mock_llm_instance.call_llm_with_json_schema_async = AsyncMock(
+                return_value=(mock_result, LlmUsage(cached_tokens=1024)),
+            )
+            mock_llm_class.return_value = mock_llm_instance
+
+            result = asyncio.run(
+                analyzer.analyze_async(
+                    locale="fr",
+                    llm_config=sample_llm_config,
+                    field_values={},
+                    text="Je m'appelle Dupont",
+                    read_from_cache=False,
+                ),
+            )
+
+            mock_llm_instance.call_llm_with_json_schema_async.assert_awaited_once()
+            mock_llm_instance.call_llm_with_json_schema.assert_not_called()
+            analysis_result = result[KEY_ANALYSIS_RESULT]
+            assert analysis_result[FIELD_NAME_SCORINGS][0]["intention_label"] == "Intention 1"
+            assert analysis_result[KEY_STATISTICS]["Cached tokens"] == 1024
+
+
 class TestTextAnalyzerBuildPrompt:
     """Tests pour build_localizedsystem_prompt_template()."""
 
-    @pytest.fixture()
-    def analyzer(
-        self,
-        sample_case_model,
-        sample_text_analysis_config,
-        temp_runtime_directory,
-    ):
-        return TextAnalyzer(
-            runtime_directory=temp_runtime_directory,
-            app_id="test_app",
-            locale="fr",
-            case_model=sample_case_model,
-            text_analysis_config=sample_text_analysis_config,
-        )
-
     def test_build_prompt_markdown(self, analyzer, sample_llm_config) -> None:
         """Test construction du prompt en markdown."""
         prompt = analyzer.build_localizedsystem_prompt_template(sample_llm_config)
@@ -599,3 +657,1216 @@ class TestTextAnalyzerBuildPrompt:
 
         # Le prompt doit mentionner les définitions
         assert "terme1" in prompt.lower() or "définition" in prompt.lower()
+
+
+class TestTextAnalyzerPromptTemplateCache:
+    """Tests pour get_localized_system_prompt_template() et warm_up()."""
+
+    def test_template_built_once(self, analyzer, sample_llm_config) -> None:
+        """Test que le template n'est construit qu'une fois par configuration."""
+        with patch.object(
+            analyzer,
+            "build_localizedsystem_prompt_template",
+            wraps=analyzer.build_localizedsystem_prompt_template,
+        ) as mock_build:
+            template1 = analyzer.get_localized_system_prompt_template(sample_llm_config)
+            template2 = analyzer.get_localized_system_prompt_template(sample_llm_config)
+
+            assert template1 is template2
+            mock_build.assert_called_once_with(sample_llm_config, ())
+
+    def test_warm_up_shares_templates(self, analyzer, sample_llm_config) -> None:
+        """Test que warm_up() compile un template par combinaison de réglages du prompt."""
+        same_prompt_config = sample_llm_config.model_copy(
+            update={"id": "other_config", "model": "gpt-4o-mini"},
+        )
+        text_config = sample_llm_config.model_copy(
+            update={"id": "text_config", "prompt_format": "text"},
+        )
+
+        analyzer.warm_up([sample_llm_config, same_prompt_config, text_config])
+
+        assert len(analyzer.localized_system_prompt_templates) == 2
+
+    def test_template_matches_build(self, analyzer, sample_llm_config) -> None:
+        """Test que le template en cache est identique au template construit."""
+        assert analyzer.get_localized_system_prompt_template(
+            sample_llm_config,
+        ) == analyzer.build_localizedsystem_prompt_template(sample_llm_config)
+
+
+@pytest.mark.parametrize(
+    "analyzer",
+    [{"system_prompt_prefix": "Demande reçue le {date_demande} par {canal}", "definitions": []}],
+    indirect=True,
+)
+class TestTextAnalyzerStaticPrefixLayout:
+    """Tests pour le prompt_layout "static_prefix"."""
+
+    @pytest.fixture()
+    def static_prefix_llm_config(self, sample_llm_config):
+        return sample_llm_config.model_copy(update={"prompt_layout": "static_prefix"})
+
+    def test_prefix_identical_across_cases(
+        self,
+        analyzer,
+        static_prefix_llm_config,
+    ) -> None:
+        """Test que le début du prompt ne dépend pas des valeurs du dossier."""
+        static_system_prompt, field_names = analyzer.get_static_system_prompt(
+            static_prefix_llm_config,
+        )
+        prompt1 = analyzer.build_static_prefix_system_prompt(
+            static_prefix_llm_config,
+            {"date_demande": "01/01/2025", "canal": "email"},
+        )
+        prompt2 = analyzer.build_static_prefix_system_prompt(
+            static_prefix_llm_config,
+            {"date_demande": "02/01/2025", "canal": "web"},
+        )
+
+        assert field_names == ["date_demande", "canal"]
+        assert "[date_demande]" in static_system_prompt
+        assert "01/01/2025" not in static_system_prompt
+        assert prompt1.startswith(static_system_prompt)
+        assert prompt2.startswith(static_system_prompt)
+        assert prompt1.endswith("- [canal]: email  \n")
+
+    def test_schema_braces_unescaped(self, analyzer, static_prefix_llm_config) -> None:
+        """Test que le schéma JSON du prompt statique n'a plus d'accolades doublées."""
+        static_system_prompt, _ = analyzer.get_static_system_prompt(
+            static_prefix_llm_config,
+        )
+
+        assert "{{" not in static_system_prompt
+        assert '"properties": {' in static_system_prompt
+
+
+@pytest.mark.parametrize(
+    "analyzer",
+    [{"system_prompt_prefix": "Demande reçue le {date_demande}", "definitions": []}],
+    indirect=True,
+)
+class TestTextAnalyzerCacheKey:
+    """Tests pour get_cache_key() et la lecture du cache par clé versionnée."""
+
+    def test_key_depends_on_what_the_result_depends_on(
+        self,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que la clé change avec le modèle, ses réglages et les champs utilisés."""
+        field_values = {"date_demande": "01/01/2025"}
+        cache_key = analyzer.get_cache_key(sample_llm_config, field_values, "Bonjour")
+
+        assert cache_key.startswith(f"v{CACHE_KEY_VERSION}.")
+        for update in (
+            {"model": "gpt-4o"},
+            {"temperature": 0},
+            {"response_format_type": "json_schema"},
+            {"prompt_format": "text"},
+        ):
+            other_llm_config = sample_llm_config.model_copy(update=update)
+            assert analyzer.get_cache_key(other_llm_config, field_values, "Bonjour") != cache_key
+        assert analyzer.get_cache_key(
+            sample_llm_config,
+            {"date_demande": "02/01/2025"},
+            "Bonjour",
+        ) != cache_key
+        assert analyzer.get_cache_key(sample_llm_config, field_values, "Au revoir") != cache_key
+
+    def test_key_depends_on_cascade(self, analyzer, sample_llm_config) -> None:
+        """Test que la clé change avec le mode cascade et ses réglages, qui décident du modèle servi."""
+        analyzer.llm_registry.llm_configs = {
+            "small": sample_llm_config.model_copy(update={"id": "small", "model": "gpt-4o-mini"}),
+        }
+        cache_keys = set()
+        for update in (
+            {},
+            {"cascade_llm_config_id": "small"},
+            {"cascade_llm_config_id": "small", "cascade_min_score": 9},
+            {"cascade_llm_config_id": "small", "cascade_min_margin": 1},
+        ):
+            analyzer.text_analysis_config = analyzer.text_analysis_config.model_copy(
+                update={"cascade_llm_config_id": None, "cascade_min_score": 7, "cascade_min_margin": 3}
+                | update,
+            )
+            cache_keys.add(analyzer.get_cache_key(sample_llm_config, {}, "Bonjour"))
+
+        assert len(cache_keys) == 4
+
+    def test_key_ignores_what_the_result_does_not_depend_on(
+        self,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que la clé ignore l'id de la config, les champs non utilisés, la casse et les blancs."""
+        field_values = {"date_demande": "01/01/2025"}
+        cache_key = analyzer.get_cache_key(sample_llm_config, field_values, "Bonjour\nMadame")
+
+        assert analyzer.get_cache_key(
+            sample_llm_config.model_copy(update={"id": "other_config"}),
+            {**field_values, "nom": "Dupont"},
+            "  BONJOUR \r\n\tMadame\n",
+        ) == cache_key
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_cache_round_trip(self, mock_llm_class, analyzer, sample_llm_config) -> None:
+        """Test qu'une analyse enregistrée sous sa clé est relue sans appeler le LLM."""
+        mock_llm_instance = Mock()
+        mock_result = Mock()
+        mock_result.model_dump.return_value = {
+            "scorings": [{"intention_id": "intention1", "score": 8, "justification": ""}],
+            "nom": "Dupont",
+        }
+        mock_llm_instance.call_llm_with_json_schema.return_value = (mock_result, LlmUsage())
+        mock_llm_class.return_value = mock_llm_instance
+        field_values = {"date_demande": "01/01/2025"}
+
+        analysis_result = analyzer.analyze(
+            "fr",
+            sample_llm_config,
+            field_values,
+            "Je m'appelle Dupont",
+            read_from_cache=True,
+        )[KEY_ANALYSIS_RESULT]
+        cache_key = analysis_result[KEY_CACHE_KEY]
+        assert cache_key == analyzer.get_cache_key(
+            sample_llm_config,
+            field_values,
+            "Je m'appelle Dupont",
+        )
+        assert len(analysis_result[KEY_HASH_CODE]) == 6
+        analyzer.analysis_cache.put("test_app", "fr", cache_key, analysis_result)
+
+        cached = analyzer.analyze(
+            "fr",
+            sample_llm_config,
+            {**field_values, "nom": "Dupont"},
+            "Je m'appelle Dupont",
+            read_from_cache=True,
+        )[KEY_ANALYSIS_RESULT]
+
+        assert cached[KEY_CACHE_KEY] == cache_key
+        mock_llm_instance.call_llm_with_json_schema.assert_called_once()
+
+
+@pytest.mark.parametrize("analyzer", [{"cache_write_through": True}], indirect=True)
+class TestTextAnalyzerWriteThrough:
+    """Tests pour l'écriture automatique des résultats dans le cache (cache_write_through)."""
+
+    @staticmethod
+    def analyze(analyzer, llm_config, read_from_cache: bool) -> dict:
+        return analyzer.analyze(
+            "fr",
+            llm_config,
+            {},
+            "Je m'appelle Dupont",
+            read_from_cache=read_from_cache,
+        )[KEY_ANALYSIS_RESULT]
+
+    @pytest.mark.parametrize(
+        ("write_through", "read_policy", "read_from_cache", "llm_calls"),
+        [
+            (False, "on_request", True, 2),
+            (True, "on_request", True, 1),
+            (True, "on_request", False, 2),
+            (True, "always", False, 1),
+        ],
+    )
+    def test_write_and_read_policy(
+        self,
+        analyzer,
+        sample_llm_config,
+        mock_llm_instance,
+        write_through,
+        read_policy,
+        read_from_cache,
+        llm_calls,
+    ) -> None:
+        """Test que le résultat est écrit si l'app le demande, et relu selon la politique de lecture."""
+        analyzer.text_analysis_config.cache_write_through = write_through
+        analyzer.text_analysis_config.cache_read_policy = read_policy
+
+        first = self.analyze(analyzer, sample_llm_config, read_from_cache=False)
+        second = self.analyze(analyzer, sample_llm_config, read_from_cache=read_from_cache)
+
+        assert mock_llm_instance.call_llm_with_json_schema.call_count == llm_calls
+        assert second[FIELD_NAME_SCORINGS] == first[FIELD_NAME_SCORINGS]
+
+    def test_ttl(self, analyzer, sample_llm_config, mock_llm_instance) -> None:
+        """Test qu'un résultat plus vieux que cache_ttl n'est plus servi, puis est remplacé."""
+        analyzer.text_analysis_config.cache_ttl = 60
+        cache_key = self.analyze(analyzer, sample_llm_config, read_from_cache=False)[KEY_CACHE_KEY]
+        cache_filename = get_cache_file_path(analyzer.runtime_directory, "test_app", "fr", cache_key)
+        os.utime(cache_filename, (time.time() - 120, time.time() - 120))
+
+        self.analyze(analyzer, sample_llm_config, read_from_cache=True)
+        self.analyze(analyzer, sample_llm_config, read_from_cache=True)
+
+        assert mock_llm_instance.call_llm_with_json_schema.call_count == 2
+
+    def test_write_failure(self, analyzer, sample_llm_config, mock_llm_instance) -> None:
+        """Test qu'une erreur d'écriture du cache ne fait pas échouer l'analyse."""
+        with patch.object(analyzer.analysis_cache, "put", side_effect=OSError("Disk full")):
+            analysis_result = self.analyze(analyzer, sample_llm_config, read_from_cache=False)
+
+        assert analysis_result[FIELD_NAME_SCORINGS][0]["score"] == 8
+
+
+class TestTextAnalyzerNearDuplicates:
+    """Tests pour le service du résultat en cache d'un texte quasi identique."""
+
+    TEXT = (
+        "Bonjour,\nJe souhaite renouveler mon titre de séjour qui expire le 15 mars. "
+        "Pouvez-vous m'indiquer les pièces à fournir et le délai de traitement ?\n"
+        "Cordialement,\nJean Dupont"
+    )
+    NEAR_DUPLICATE = (
+        "Bonjour Madame,\nJe souhaite renouveler mon titre de séjour qui expire le 15 mars. "
+        "Pouvez-vous m'indiquer les pièces à fournir et le délai de traitement ?\n"
+        "Cordialement,\nJ. Dupont\n> Votre demande a bien été reçue"
+    )
+
+    @pytest.fixture()
+    def analyzer(self, make_analyzer):
+        return make_analyzer(
+            usage_statistics=UsageStatistics(),
+            cache_write_through=True,
+            near_duplicate_threshold=0.7,
+        )
+
+    def test_near_hit(self, analyzer, sample_llm_config, mock_llm_instance) -> None:
+        """Test qu'un texte quasi identique reçoit le résultat en cache, signalé dans les statistiques."""
+        first = analyzer.analyze("fr", sample_llm_config, {}, self.TEXT, read_from_cache=True)[
+            KEY_ANALYSIS_RESULT
+        ]
+        second = analyzer.analyze(
+            "fr",
+            sample_llm_config,
+            {},
+            self.NEAR_DUPLICATE,
+            read_from_cache=True,
+        )[KEY_ANALYSIS_RESULT]
+
+        mock_llm_instance.call_llm_with_json_schema.assert_called_once()
+        assert second[FIELD_NAME_SCORINGS] == first[FIELD_NAME_SCORINGS]
+        assert second[KEY_STATISTICS]["Near duplicate of"] == first[KEY_HASH_CODE]
+        assert float(second[KEY_STATISTICS]["Near duplicate similarity"]) >= 0.7
+        assert second[KEY_HASH_CODE] != first[KEY_HASH_CODE]
+        assert second[KEY_CACHE_KEY] is None
+        (usage_statistics,) = analyzer.usage_statistics.get_usage_statistics()
+        assert usage_statistics["near_duplicate_hits"] == 1
+
+    @pytest.mark.parametrize(
+        ("text", "field_values"),
+        [
+            ("Je voudrais déposer une demande d'asile, merci de me recontacter.", {}),
+            (NEAR_DUPLICATE, {"date_demande": "01/01/2025"}),
+        ],
+    )
+    def test_no_near_hit(
+        self,
+        analyzer,
+        sample_llm_config,
+        mock_llm_instance,
+        text,
+        field_values,
+    ) -> None:
+        """Test qu'un texte différent, ou analysé avec un autre prompt, n'est pas servi depuis le cache."""
+        analyzer.text_analysis_config.system_prompt_prefix = "Demande reçue le {date_demande}"
+        analyzer.analyze("fr", sample_llm_config, {}, self.TEXT, read_from_cache=True)
+        second = analyzer.analyze("fr", sample_llm_config, field_values, text, read_from_cache=True)
+
+        assert mock_llm_instance.call_llm_with_json_schema.call_count == 2
+        assert "Near duplicate of" not in second[KEY_ANALYSIS_RESULT][KEY_STATISTICS]
+
+    def test_not_cached(self, analyzer, sample_llm_config, mock_llm_instance) -> None:
+        """Test qu'un texte indexé dont le résultat n'est pas en cache est ignoré."""
+        analyzer.text_analysis_config.cache_write_through = False
+        analyzer.analyze("fr", sample_llm_config, {}, self.TEXT, read_from_cache=True)
+        analyzer.analyze("fr", sample_llm_config, {}, self.NEAR_DUPLICATE, read_from_cache=True)
+
+        assert mock_llm_instance.call_llm_with_json_schema.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "analyzer",
+    [{"system_prompt_prefix": "Demande reçue le {date_demande}"}],
+    indirect=True,
+)
+class TestTextAnalyzerPacking:
+    """Tests pour l'analyse groupée de plusieurs textes en un seul appel au LLM."""
+
+    @pytest.fixture()
+    def packing_llm_config(self, sample_llm_config):
+        return sample_llm_config.model_copy(update={"pack_size": 3})
+
+    def test_plan_packs_by_system_prompt_and_size(
+        self,
+        analyzer,
+        packing_llm_config,
+    ) -> None:
+        """Test que seuls les textes de même prompt système sont groupés, par pack_size au plus."""
+        texts = [({"date_demande": "01/01/2025"}, f"Texte {i}") for i in range(4)]
+        texts.append(({"date_demande": "02/01/2025"}, "Autre date"))
+
+        packs = analyzer.plan_packs(packing_llm_config, texts)
+
+        assert packs == [[0, 1, 2], [3], [4]]
+
+    def test_plan_packs_respects_token_budget(
+        self,
+        analyzer,
+        packing_llm_config,
+    ) -> None:
+        """Test qu'un texte qui ne tient pas dans le budget ouvre un nouveau groupe."""
+        system_prompt = analyzer.build_system_prompt(
+            packing_llm_config,
+            {"date_demande": "01/01/2025"},
+        )
+        llm_config = packing_llm_config.model_copy(
+            update={"max_pack_tokens": len(system_prompt) // 4 + 600},
+        )
+        texts = [({"date_demande": "01/01/2025"}, "x" * 1000) for _ in range(3)]
+
+        packs = analyzer.plan_packs(llm_config, texts)
+
+        assert packs == [[0], [1], [2]]
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_analyze_packed_splits_results(
+        self,
+        mock_llm_class,
+        analyzer,
+        packing_llm_config,
+    ) -> None:
+        """Test que la réponse groupée est répartie par texte, les textes omis valant None."""
+        packed_result = analyzer.packed_analysis_response_model.model_validate(
+            {
+                "results": [
+                    {
+                        "text_index": 1,
+                        "scorings": [
+                            {
+                                "intention_id": "intention1",
+                                "score": 3,
+                                "justification": "Deuxième",
+                            },
+                        ],
+                    },
+                    {
+                        "text_index": 0,
+                        "scorings": [
+                            {
+                                "intention_id": "intention1",
+                                "score": 9,
+                                "justification": "Premier",
+                            },
+                        ],
+                    },
+                ],
+            },
+        )
+        mock_llm_instance = Mock()
+        mock_llm_instance.call_llm_with_json_schema_async = AsyncMock(
+            return_value=(
+                packed_result,
+                LlmUsage(prompt_tokens=301, completion_tokens=90),
+            ),
+        )
+        mock_llm_class.return_value = mock_llm_instance
+        texts = [({"date_demande": "01/01/2025"}, f"Texte {i}") for i in range(3)]
+
+        results = asyncio.run(
+            analyzer.analyze_packed_async(
+                "fr",
+                packing_llm_config,
+                texts,
+                read_from_cache=False,
+            ),
+        )
+
+        mock_llm_instance.call_llm_with_json_schema_async.assert_awaited_once()
+        _model, system_prompt, text = (
+            mock_llm_instance.call_llm_with_json_schema_async.await_args.args
+        )
+        assert "text_index" in system_prompt
+        assert system_prompt.count(analyzer.localization.promptstring_return_only_json) == 1
+        assert "### Texte 2\nTexte 2" in text
+
+        assert results[2] is None
+        first = results[0][KEY_ANALYSIS_RESULT]
+        second = results[1][KEY_ANALYSIS_RESULT]
+        assert first[FIELD_NAME_SCORINGS][0]["justification"] == "Premier"
+        assert second[FIELD_NAME_SCORINGS][0]["justification"] == "Deuxième"
+        assert "text_index" not in first
+        assert first[KEY_STATISTICS]["Packed texts"] == 3
+        assert first[KEY_STATISTICS]["Prompt tokens"] == 101
+        assert first[KEY_HASH_CODE] != second[KEY_HASH_CODE]
+
+    @pytest.mark.parametrize(
+        "config_updates",
+        [{"analysis_mode": "parallel"}, {"cascade_llm_config_id": "petit"}],
+    )
+    def test_cannot_pack(
+        self,
+        analyzer,
+        packing_llm_config,
+        config_updates,
+    ) -> None:
+        """Test que les textes ne sont pas groupés en mode multi-appels ou en cascade."""
+        assert analyzer.can_pack(packing_llm_config) is True
+
+        for name, value in config_updates.items():
+            setattr(analyzer.text_analysis_config, name, value)
+        analyzer.llm_registry.llm_configs["petit"] = packing_llm_config.model_copy(
+            update={"id": "petit"},
+        )
+
+        assert analyzer.can_pack(packing_llm_config) is False
+
+
+class TestLlmUsageSplit:
+    """Tests pour LlmUsage.split()."""
+
+    def test_split_adds_up(self) -> None:
+        """Test que les parts additionnées redonnent l'usage total."""
+        usages = LlmUsage(prompt_tokens=10, completion_tokens=None, eval_duration=3.0).split(3)
+
+        assert [usage.prompt_tokens for usage in usages] == [4, 3, 3]
+        assert all(usage.completion_tokens is None for usage in usages)
+        assert sum(usage.eval_duration for usage in usages) == pytest.approx(3.0)
+
+
+@pytest.mark.parametrize(
+    "analyzer",
+    [{"intentions": INTENTIONS[:3], "top_k": 1, "justifications": "none"}],
+    indirect=True,
+)
+class TestTextAnalyzerSparseScoring:
+    """Tests pour le mode top_k / min_score et les justifications courtes ou absentes."""
+
+    def test_model_without_justification(self, analyzer) -> None:
+        """Test que le schéma ne demande pas de justification."""
+        schema = json.dumps(analyzer.analysis_response_model.model_json_schema())
+
+        assert "justification" not in schema
+
+    def test_prompt_asks_for_top_k(self, analyzer, sample_llm_config) -> None:
+        """Test que le prompt demande uniquement les k intentions les plus probables."""
+        template = analyzer.get_localized_system_prompt_template(sample_llm_config)
+
+        assert "Ne retourner que les 1 intentions les plus probables" in template
+        assert "Ne pas justifier les scores." in template
+
+    def test_join_completes_scorings(self, analyzer) -> None:
+        """Test que les intentions non notées sont ajoutées avec un score de 0."""
+        analysis_result = {
+            FIELD_NAME_SCORINGS: [{"intention_id": "intention2", "score": 9}],
+        }
+
+        analyzer._join_intentions(analysis_result)
+
+        scorings = {
+            scoring["intention_id"]: scoring
+            for scoring in analysis_result[FIELD_NAME_SCORINGS]
+        }
+        assert set(scorings) == {"intention1", "intention2", "intention3", "other"}
+        assert scorings["intention2"]["score"] == 9
+        assert scorings["intention2"]["justification"] == ""
+        assert scorings["intention1"]["score"] == 0
+        assert scorings["intention1"]["intention_label"] == "Intention 1"
+
+
+class TestTextAnalyzerTwoPhase:
+    """Tests pour le mode d'analyse "two_phase"."""
+
+    @pytest.fixture()
+    def analyzer(self, make_analyzer, sample_case_field):
+        case_fields = [sample_case_field]
+        for i, field_id in [(2, "montant"), (3, "ville")]:
+            case_fields.append(
+                sample_case_field.model_copy(
+                    update={"id": field_id, "intention_ids": [f"intention{i}"]},
+                ),
+            )
+        return make_analyzer(
+            case_model=CaseModel(case_fields=case_fields),
+            intentions=INTENTIONS[:3],
+            analysis_mode="two_phase",
+        )
+
+    def test_part_features(self, analyzer) -> None:
+        """Test que chaque intention n'extrait que ses propres champs."""
+        assert analyzer.get_part_features(("intentions",)) == []
+        assert [f.id for f in analyzer.get_part_features(("features", "intention2"))] == [
+            "montant",
+        ]
+        model = analyzer.get_part_response_model(("features", "intention2"))
+        assert "scorings" not in model.model_fields
+        assert set(model.model_fields) == {"montant"}
+
+    def test_phase_two_prompt_has_no_intentions(self, analyzer, sample_llm_config) -> None:
+        """Test que le prompt de la phase deux ne demande pas de scorer les intentions."""
+        template = analyzer.get_localized_system_prompt_template(
+            sample_llm_config,
+            ("features", "intention1"),
+        )
+
+        assert "Description 1" not in template
+        assert "nom" in template
+        assert "montant" not in template
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_analyze_async_two_phase(
+        self,
+        mock_llm_class,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que la phase deux ne porte que sur les 2 meilleures intentions et que les résultats sont fusionnés."""
+        values = {"nom": "Dupont", "montant": "12", "ville": "Paris"}
+
+        async def call_llm(response_model, system_prompt, text):
+            if "scorings" in response_model.model_fields:
+                data = {
+                    "scorings": [
+                        {"intention_id": "intention1", "score": 8, "justification": ""},
+                        {"intention_id": "intention2", "score": 5, "justification": ""},
+                        {"intention_id": "intention3", "score": 0, "justification": ""},
+                    ],
+                }
+            else:
+                data = {name: values[name] for name in response_model.model_fields}
+            return response_model.model_validate(data), LlmUsage(prompt_tokens=10)
+
+        mock_llm_instance = Mock()
+        mock_llm_instance.call_llm_with_json_schema_async = AsyncMock(
+            side_effect=call_llm,
+        )
+        mock_llm_class.return_value = mock_llm_instance
+
+        result = asyncio.run(
+            analyzer.analyze_async(
+                locale="fr",
+                llm_config=sample_llm_config,
+                field_values={},
+                text="Je m'appelle Dupont",
+                read_from_cache=False,
+            ),
+        )
+
+        analysis_result = result[KEY_ANALYSIS_RESULT]
+        assert mock_llm_instance.call_llm_with_json_schema_async.await_count == 3
+        assert analysis_result["nom"] == "Dupont"
+        assert analysis_result["montant"] == "12"
+        assert analysis_result["ville"] is None
+        assert analysis_result[KEY_STATISTICS]["LLM calls"] == 3
+        assert analysis_result[KEY_STATISTICS]["Prompt tokens"] == 30
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_analyze_two_phase(
+        self,
+        mock_llm_class,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que les extractions de la phase deux partent en même temps en synchrone."""
+        values = {"nom": "Dupont", "montant": "12", "ville": "Paris"}
+        lock = threading.Lock()
+        in_flight = 0
+        max_in_flight = 0
+
+        def call_llm(response_model, system_prompt, text):
+            nonlocal in_flight, max_in_flight
+            if "scorings" in response_model.model_fields:
+                data = {
+                    "scorings": [
+                        {"intention_id": "intention1", "score": 8, "justification": ""},
+                        {"intention_id": "intention2", "score": 5, "justification": ""},
+                        {"intention_id": "intention3", "score": 0, "justification": ""},
+                    ],
+                }
+            else:
+                with lock:
+                    in_flight += 1
+                    max_in_flight = max(max_in_flight, in_flight)
+                time.sleep(0.05)
+                with lock:
+                    in_flight -= 1
+                data = {name: values[name] for name in response_model.model_fields}
+            return response_model.model_validate(data), LlmUsage(prompt_tokens=10)
+
+        mock_llm_instance = Mock()
+        mock_llm_instance.call_llm_with_json_schema.side_effect = call_llm
+        mock_llm_class.return_value = mock_llm_instance
+
+        result = analyzer.analyze(
+            locale="fr",
+            llm_config=sample_llm_config,
+            field_values={},
+            text="Je m'appelle Dupont",
+            read_from_cache=False,
+        )
+
+        analysis_result = result[KEY_ANALYSIS_RESULT]
+        assert max_in_flight == 2
+        assert analysis_result["nom"] == "Dupont"
+        assert analysis_result["montant"] == "12"
+        assert analysis_result["ville"] is None
+        assert analysis_result[KEY_STATISTICS]["LLM calls"] == 3
+
+
+@pytest.mark.parametrize("analyzer", [{"analysis_mode": "parallel"}], indirect=True)
+class TestTextAnalyzerParallelMode:
+    """Tests pour le mode d'analyse "parallel"."""
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_analyze_async_parallel(
+        self,
+        mock_llm_class,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que scoring et extraction partent en même temps et sont fusionnés."""
+        in_flight = 0
+        max_in_flight = 0
+
+        async def call_llm(response_model, system_prompt, text):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if "scorings" in response_model.model_fields:
+                assert "nom" not in response_model.model_fields
+                data = {
+                    "scorings": [
+                        {"intention_id": "intention1", "score": 7, "justification": "Ok"},
+                    ],
+                }
+            else:
+                data = {"nom": "Dupont"}
+            return response_model.model_validate(data), LlmUsage(completion_tokens=5)
+
+        mock_llm_instance = Mock()
+        mock_llm_instance.call_llm_with_json_schema_async = AsyncMock(
+            side_effect=call_llm,
+        )
+        mock_llm_class.return_value = mock_llm_instance
+
+        result = asyncio.run(
+            analyzer.analyze_async(
+                locale="fr",
+                llm_config=sample_llm_config,
+                field_values={},
+                text="Je m'appelle Dupont",
+                read_from_cache=False,
+            ),
+        )
+
+        analysis_result = result[KEY_ANALYSIS_RESULT]
+        assert max_in_flight == 2
+        assert analysis_result["nom"] == "Dupont"
+        assert analysis_result[FIELD_NAME_SCORINGS][0]["score"] == 7
+        assert analysis_result[KEY_STATISTICS]["LLM calls"] == 2
+        assert analysis_result[KEY_STATISTICS]["Completion tokens"] == 10
+        assert "Dupont" in result[KEY_HIGHLIGHTED_TEXT_AND_FEATURES]
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_analyze_parallel(
+        self,
+        mock_llm_class,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que scoring et extraction partent aussi en même temps en synchrone."""
+        lock = threading.Lock()
+        in_flight = 0
+        max_in_flight = 0
+
+        def call_llm(response_model, system_prompt, text):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight -= 1
+            if "scorings" in response_model.model_fields:
+                data = {
+                    "scorings": [
+                        {"intention_id": "intention1", "score": 7, "justification": "Ok"},
+                    ],
+                }
+            else:
+                data = {"nom": "Dupont"}
+            return response_model.model_validate(data), LlmUsage(completion_tokens=5)
+
+        mock_llm_instance = Mock()
+        mock_llm_instance.call_llm_with_json_schema.side_effect = call_llm
+        mock_llm_class.return_value = mock_llm_instance
+
+        result = analyzer.analyze(
+            locale="fr",
+            llm_config=sample_llm_config,
+            field_values={},
+            text="Je m'appelle Dupont",
+            read_from_cache=False,
+        )
+
+        analysis_result = result[KEY_ANALYSIS_RESULT]
+        assert max_in_flight == 2
+        assert analysis_result["nom"] == "Dupont"
+        assert analysis_result[FIELD_NAME_SCORINGS][0]["score"] == 7
+        assert analysis_result[KEY_STATISTICS]["LLM calls"] == 2
+
+
+class TestTextAnalyzerRepairTurn:
+    """Tests pour la réparation par un court échange de suivi avec le LLM."""
+
+    @patch("src.backend.text_analysis.llm_registry.LlmOpenAI")
+    def test_follow_up_turn_on_validation_error(
+        self,
+        mock_llm_class,
+        analyzer,
+        sample_llm_config,
+    ) -> None:
+        """Test que seules la réponse invalide et les erreurs sont renvoyées au LLM."""
+        repaired = analyzer.analysis_response_model.model_validate(
+            {
+                "scorings": [
+                    {"intention_id": "intention1", "score": 5, "justification": "Ok"},
+                ],
+            },
+        )
+        mock_llm_instance = Mock()
+        mock_llm_instance.call_llm_with_json_schema.side_effect = [
+            LlmValidationError("invalid", '{"nom": "Dupont"}', "scorings: Field required"),
+            (repaired, LlmUsage()),
+        ]
+        mock_llm_class.return_value = mock_llm_instance
+
+        result, _usage = analyzer._call_llm(
+            sample_llm_config,
+            "prompt système complet",
+            "texte à analyser",
+        )
+
+        assert result is repaired
+        _model, system_prompt, text = (
+            mock_llm_instance.call_llm_with_json_schema.call_args.args
+        )
+        assert system_prompt == analyzer.localization.promptstring_repair_json
+        assert '{"nom": "Dupont"}' in text
+        assert "scorings: Field required" in text
+        assert "texte à analyser" not in text
+
+
+class TestTextAnalyzerHedging:
+    """Tests pour les requêtes doublées (hedging) de _call_llm_async()."""
+
+    @pytest.fixture()
+    def hedged_llm_configs(self, sample_llm_config):
+        llm_config = sample_llm_config.model_copy(
+            update={
+                "hedge_percentile": 95,
+                "hedge_delay": 0.01,
+                "hedge_llm_config_id": "backup",
+            },
+        )
+        return llm_config, sample_llm_config.model_copy(update={"id": "backup"})
+
+    @staticmethod
+    def fake_calls(delays: dict[str, float], errors: tuple[str, ...] = ()):
+        """:return: Un faux _call_llm_once_async() dont la durée dépend du llm_config"""
+        cancelled: list[str] = []
+
+        async def call(llm_config, system_prompt, text, response_model):
+            try:
+                await asyncio.sleep(delays[llm_config.id])
+            except asyncio.CancelledError:
+                cancelled.append(llm_config.id)
+                raise
+            if llm_config.id in errors:
+                msg = f"Erreur {llm_config.id}"
+                raise ValueError(msg)
+            return llm_config.id, LlmUsage()
+
+        return call, cancelled
+
+    def test_fast_call_not_hedged(self, analyzer, hedged_llm_configs) -> None:
+        """Test qu'un appel rapide n'est pas doublé."""
+        llm_config, backup = hedged_llm_configs
+        analyzer.llm_registry.llm_configs = {"backup": backup}
+        call, _cancelled = self.fake_calls({"test_config": 0, "backup": 0})
+
+        with patch.object(analyzer, "_call_llm_once_async", side_effect=call):
+            result, usage, served_llm_config = asyncio.run(
+                analyzer._call_llm_async(llm_config, "prompt", "texte"),
+            )
+
+        assert result == "test_config"
+        assert served_llm_config is llm_config
+        assert (usage.hedges_fired, usage.hedges_won) == (0, 0)
+
+    def test_slow_call_hedged(self, analyzer, hedged_llm_configs) -> None:
+        """Test que l'appel de secours gagne contre un appel lent, qui est annulé."""
+        llm_config, backup = hedged_llm_configs
+        analyzer.llm_registry.llm_configs = {"backup": backup}
+        call, cancelled = self.fake_calls({"test_config": 5, "backup": 0})
+
+        with patch.object(analyzer, "_call_llm_once_async", side_effect=call):
+            result, usage, served_llm_config = asyncio.run(
+                analyzer._call_llm_async(llm_config, "prompt", "texte"),
+            )
+
+        assert result == "backup"
+        assert served_llm_config is backup
+        assert (usage.hedges_fired, usage.hedges_won) == (1, 1)
+        assert cancelled == ["test_config"]
+        # L'appel lent annulé compte dans les latences, au moins pour le temps écoulé
+        (latency,) = analyzer.llm_registry._latencies["test_config"]
+        assert latency >= llm_config.hedge_delay
+        assert len(analyzer.llm_registry._latencies["backup"]) == 1
+
+    def test_failed_hedge_waits_for_first_call(self, analyzer, hedged_llm_configs) -> None:
+        """Test qu'un appel de secours en erreur laisse gagner le premier appel."""
+        llm_config, backup = hedged_llm_configs
+        analyzer.llm_registry.llm_configs = {"backup": backup}
+        call, _cancelled = self.fake_calls(
+            {"test_config": 0.05, "backup": 0},
+            errors=("backup",),
+        )
+
+        with patch.object(analyzer, "_call_llm_once_async", side_effect=call):
+            result, usage, served_llm_config = asyncio.run(
+                analyzer._call_llm_async(llm_config, "prompt", "texte"),
+            )
+
+        assert result == "test_config"
+        assert served_llm_config is llm_config
+        assert (usage.hedges_fired, usage.hedges_won) == (1, 0)
+
+    def test_both_calls_fail(self, analyzer, hedged_llm_configs) -> None:
+        """Test que l'erreur du premier appel est propagée si les deux appels échouent."""
+        llm_config, backup = hedged_llm_configs
+        analyzer.llm_registry.llm_configs = {"backup": backup}
+        call, _cancelled = self.fake_calls(
+            {"test_config": 0.05, "backup": 0},
+            errors=("test_config", "backup"),
+        )
+
+        with patch.object(
+            analyzer,
+            "_call_llm_once_async",
+            side_effect=call,
+        ), pytest.raises(ValueError, match="Erreur test_config"):
+            asyncio.run(analyzer._call_llm_async(llm_config, "prompt", "texte"))
+
+        # Les appels en erreur comptent aussi dans les latences
+        assert len(analyzer.llm_registry._latencies["test_config"]) == 1
+        assert len(analyzer.llm_registry._latencies["backup"]) == 1
+
+    def test_hedge_on_alternate_wins_analysis(self, analyzer, hedged_llm_configs) -> None:
+        """Test qu'une analyse servie par le llm_config de secours lui est attribuée et cachée sous sa clé."""
+        llm_config, backup = hedged_llm_configs
+        backup = backup.model_copy(update={"model": "modele-secours"})
+        analyzer.llm_registry.llm_configs = {"backup": backup}
+        analyzer.usage_statistics = UsageStatistics()
+        analyzer.text_analysis_config.cache_write_through = True
+
+        async def call(call_llm_config, system_prompt, text, response_model):
+            await asyncio.sleep(5 if call_llm_config.id == "test_config" else 0)
+            return analyzer.analysis_response_model.model_validate(
+                {
+                    "scorings": [
+                        {"intention_id": "intention1", "score": 7, "justification": "Ok"},
+                    ],
+                },
+            ), LlmUsage(prompt_tokens=10)
+
+        with patch.object(analyzer, "_call_llm_once_async", side_effect=call):
+            _system_prompt, analysis_result = asyncio.run(
+                analyzer._analyze_async(llm_config, {}, "texte", read_from_cache=False),
+            )
+
+        assert analysis_result[KEY_STATISTICS]["LLM config"] == "backup"
+        assert analysis_result[KEY_STATISTICS]["LLM Model"] == "modele-secours"
+        assert [
+            entry["llm_config_id"]
+            for entry in analyzer.usage_statistics.get_usage_statistics()
+        ] == ["backup"]
+        backup_cache_key = analyzer.get_cache_key(backup, {}, "texte")
+        assert analysis_result[KEY_CACHE_KEY] == backup_cache_key
+        assert backup_cache_key != analyzer.get_cache_key(llm_config, {}, "texte")
+        assert analyzer.analysis_cache.get("test_app", "fr", backup_cache_key) is not None
+
+    def test_parts_hedged_on_same_llm_config(self, analyzer, hedged_llm_configs) -> None:
+        """Test que les appels d'une analyse en plusieurs appels ne sont doublés que sur leur llm_config."""
+        llm_config, backup = hedged_llm_configs
+        analyzer.llm_registry.llm_configs = {"backup": backup}
+        called: list[str] = []
+        call, _cancelled = self.fake_calls({"test_config": 0.05, "backup": 0})
+
+        async def recorded_call(call_llm_config, system_prompt, text, response_model):
+            called.append(call_llm_config.id)
+            return await call(call_llm_config, system_prompt, text, response_model)
+
+        with patch.object(analyzer, "_call_llm_once_async", side_effect=recorded_call):
+            results = asyncio.run(
+                analyzer._call_llm_parts_async(
+                    llm_config,
+                    {},
+                    "texte",
+                    analyzer.get_analysis_parts(),
+                ),
+            )
+
+        assert [result for result, _usage in results] == ["test_config"] * len(results)
+        # Doublés, mais sur test_config
+        assert called == ["test_config"] * 2 * len(results)
+
+    def test_hedges_in_statistics(self, analyzer, sample_llm_config) -> None:
+        """Test que les requêtes doublées sont reportées dans les statistiques."""
+        analysis_result = analyzer._build_analysis_result(
+            sample_llm_config,
+            analyzer.analysis_response_model.model_validate({"scorings": []}),
+            LlmUsage(hedges_fired=1, hedges_won=1),
+            timedelta(seconds=1),
+            "hash",
+        )
+
+        assert analysis_result[KEY_STATISTICS]["Hedges fired"] == 1
+        assert analysis_result[KEY_STATISTICS]["Hedges won"] == 1
+
+
+class TestTextAnalyzerCascade:
+    """Tests pour le mode cascade : petit modèle d'abord, escalade vers le llm_config demandé."""
+
+    @pytest.fixture()
+    def analyzer(self, make_analyzer):
+        return make_analyzer(
+            usage_statistics=UsageStatistics(),
+            intentions=INTENTIONS[:2],
+            cascade_llm_config_id="small",
+        )
+
+    @staticmethod
+    def analyze(analyzer, sample_llm_config, small_scores):
+        """Analyse un texte, le petit modèle répondant avec small_scores (None : réponse invalide)."""
+        analyzer.llm_registry.llm_configs = {
+            "small": sample_llm_config.model_copy(update={"id": "small"}),
+        }
+
+        def call_llm(llm_config, system_prompt, text, response_model=None):
+            if llm_config.id == "small" and small_scores is None:
+                msg = "LLM returned invalid format"
+                raise ValueError(msg)
+            scores = small_scores if llm_config.id == "small" else (9, 1)
+            return analyzer.analysis_response_model.model_validate(
+                {
+                    "scorings": [
+                        {"intention_id": f"intention{i}", "score": score, "justification": ""}
+                        for i, score in enumerate(scores, 1)
+                    ],
+                    "nom": llm_config.id,
+                },
+            ), LlmUsage()
+
+        with patch.object(analyzer, "_call_llm", side_effect=call_llm) as mock_call_llm:
+            result = analyzer.analyze(
+                locale="fr",
+                llm_config=sample_llm_config,
+                field_values={},
+                text="Texte",
+                read_from_cache=False,
+            )
+        return result[KEY_ANALYSIS_RESULT], mock_call_llm.call_count
+
+    def test_confident_small_model_served(self, analyzer, sample_llm_config) -> None:
+        analysis_result, calls = self.analyze(analyzer, sample_llm_config, (8, 2))
+
+        assert calls == 1
+        assert analysis_result["nom"] == "small"
+        assert analysis_result[KEY_STATISTICS]["LLM config"] == "small"
+        assert analysis_result[KEY_STATISTICS]["Cascade"] == "Not escalated"
+
+    @pytest.mark.parametrize(
+        ("small_scores", "reason"),
+        [((5, 0), "Low score"), ((8, 6), "Small margin"), (None, "Invalid response")],
+    )
+    def test_escalation(self, analyzer, sample_llm_config, small_scores, reason) -> None:
+        analysis_result, calls = self.analyze(analyzer, sample_llm_config, small_scores)
+
+        assert calls == 2
+        assert analysis_result["nom"] == "test_config"
+        assert analysis_result[KEY_STATISTICS]["LLM config"] == "test_config"
+        assert analysis_result[KEY_STATISTICS]["Cascade"] == f"Escalated ({reason})"
+
+    def test_escalation_rate(self, analyzer, sample_llm_config) -> None:
+        self.analyze(analyzer, sample_llm_config, (8, 2))
+        self.analyze(analyzer, sample_llm_config, (5, 0))
+
+        usage_statistics = {
+            entry["llm_config_id"]: entry
+            for entry in analyzer.usage_statistics.get_usage_statistics()
+        }
+        assert usage_statistics["test_config"]["escalation_rate"] == 0.5
+        # Le petit modèle a fait les deux analyses, le grand une seule
+        assert usage_statistics["small"]["analyses"] == 2
+        assert usage_statistics["test_config"]["analyses"] == 1
+
+
+class TestTextAnalyzerPreRouter:
+    """Tests pour le pré-routeur : le LLM n'est pas appelé pour les intentions sûres sans champs."""
+
+    @pytest.fixture()
+    def analyzer(self, make_analyzer, sample_llm_config):
+        analyzer = make_analyzer(
+            usage_statistics=UsageStatistics(),
+            # intention1 a le champ "nom" à extraire, intention3 n'a pas de seuil
+            intentions=[
+                intention.model_copy(update={"pre_router_min_score": min_score})
+                for intention, min_score in zip(INTENTIONS, (8, 8, None))
+            ],
+            pre_router_llm_config_id="pre",
+        )
+        analyzer.llm_registry.llm_configs = {
+            "pre": sample_llm_config.model_copy(update={"id": "pre"}),
+        }
+        return analyzer
+
+    @staticmethod
+    def analyze(analyzer, sample_llm_config, pre_router_scores, llm_scores=(0, 9, 0)):
+        """Analyse un texte, le pré-routeur répondant avec pre_router_scores (None : réponse invalide)."""
+
+        def call_llm(llm_config, system_prompt, text, response_model=None):
+            if llm_config.id == "pre" and pre_router_scores is None:
+                msg = "LLM returned invalid format"
+                raise ValueError(msg)
+            scores = pre_router_scores if llm_config.id == "pre" else llm_scores
+            return analyzer.analysis_response_model.model_validate(
+                {
+                    "scorings": [
+                        {"intention_id": f"intention{i}", "score": score, "justification": ""}
+                        for i, score in enumerate(scores, 1)
+                    ],
+                    "nom": llm_config.id,
+                },
+            ), LlmUsage()
+
+        shadow_threads = []
+        start_shadow_analysis = analyzer._start_shadow_analysis
+
+        def start_and_keep_shadow_analysis(*args):
+            shadow_threads.append(start_shadow_analysis(*args))
+
+        with (
+            patch.object(analyzer, "_call_llm", side_effect=call_llm) as mock_call_llm,
+            patch.object(
+                analyzer,
+                "_start_shadow_analysis",
+                side_effect=start_and_keep_shadow_analysis,
+            ),
+        ):
+            result = analyzer.analyze(
+                locale="fr",
+                llm_config=sample_llm_config,
+                field_values={},
+                text="Texte",
+                read_from_cache=False,
+            )
+            for thread in shadow_threads:
+                thread.join()
+        return result[KEY_ANALYSIS_RESULT], mock_call_llm.call_count
+
+    def test_bypass(self, analyzer, sample_llm_config) -> None:
+        analysis_result, calls = self.analyze(analyzer, sample_llm_config, (0, 9, 1))
+
+        assert calls == 1
+        assert analysis_result["nom"] == "pre"
+        assert analysis_result[KEY_STATISTICS]["LLM config"] == "pre"
+        assert analysis_result[KEY_STATISTICS]["Pre-router"] == "Bypassed"
+
+    @pytest.mark.parametrize(
+        ("pre_router_scores", "reason"),
+        [
+            ((9, 0, 0), "Fields to extract"),
+            ((0, 7, 0), "Low score"),
+            ((0, 0, 9), "Intention not pre-routed"),
+            (None, "Invalid response"),
+        ],
+    )
+    def test_forwarded(self, analyzer, sample_llm_config, pre_router_scores, reason) -> None:
+        analysis_result, calls = self.analyze(analyzer, sample_llm_config, pre_router_scores)
+
+        assert calls == 2
+        assert analysis_result["nom"] == "test_config"
+        assert analysis_result[KEY_STATISTICS]["LLM config"] == "test_config"
+        assert analysis_result[KEY_STATISTICS]["Pre-router"] == f"Forwarded ({reason})"
+
+    @pytest.mark.parametrize(
+        ("pre_router_scores", "expected_nom"),
+        [((0, 9, 1), "pre"), ((0, 7, 0), "test_config")],
+    )
+    def test_analyze_async(
+        self,
+        analyzer,
+        sample_llm_config,
+        pre_router_scores,
+        expected_nom,
+    ) -> None:
+        """Test que le pré-routeur est appelé sans bloquer la boucle d'événements en asynchrone."""
+
+        async def call_llm(llm_config, system_prompt, text, response_model=None):
+            scores = pre_router_scores if llm_config.id == "pre" else (0, 9, 0)
+            return analyzer.analysis_response_model.model_validate(
+                {
+                    "scorings": [
+                        {"intention_id": f"intention{i}", "score": score, "justification": ""}
+                        for i, score in enumerate(scores, 1)
+                    ],
+                    "nom": llm_config.id,
+                },
+            ), LlmUsage()
+
+        with (
+            patch.object(analyzer, "_call_llm") as mock_call_llm,
+            patch.object(analyzer, "_call_llm_once_async", side_effect=call_llm),
+        ):
+            result = asyncio.run(
+                analyzer.analyze_async(
+                    locale="fr",
+                    llm_config=sample_llm_config,
+                    field_values={},
+                    text="Texte",
+                    read_from_cache=False,
+                ),
+            )
+
+        mock_call_llm.assert_not_called()
+        assert result[KEY_ANALYSIS_RESULT]["nom"] == expected_nom
+
+    def test_no_pre_router_for_itself(self, analyzer, sample_llm_config) -> None:
+        """Test qu'une analyse demandée sur le pré-routeur lui-même n'est pas pré-routée."""
+        assert analyzer.get_pre_router_llm_config(analyzer.llm_registry.llm_configs["pre"]) is None
+
+    def test_bypass_rate_and_shadow_agreement(self, analyzer, sample_llm_config) -> None:
+        analyzer.text_analysis_config.pre_router_shadow_rate = 1.0
+
+        self.analyze(analyzer, sample_llm_config, (0, 9, 1), llm_scores=(0, 9, 0))
+        self.analyze(analyzer, sample_llm_config, (0, 9, 1), llm_scores=(0, 0, 9))
+        self.analyze(analyzer, sample_llm_config, (0, 7, 1))
+
+        usage_statistics = {
+            entry["llm_config_id"]: entry
+            for entry in analyzer.usage_statistics.get_usage_statistics()
+        }
+        assert usage_statistics["test_config"]["bypass_rate"] == pytest.approx(2 / 3)
+        assert usage_statistics["test_config"]["shadow_analyses"] == 2
+        assert usage_statistics["test_config"]["shadow_agreement_rate"] == 0.5
+        # Les analyses fantômes sont comptées avec le LLM, en plus de l'analyse transmise
+        assert usage_statistics["test_config"]["analyses"] == 3
+        assert usage_statistics["pre"]["analyses"] == 3
@@ -0,0 +1,50 @@
+"""Tests unitaires pour TrustedServicesServer."""
+
+from unittest.mock import Mock
+
+import pytest
+
+from src.backend.backend.trusted_services_server import AppsGeneration
+
+
+class TestAppsGeneration:
+    """Tests pour la fermeture différée des apps remplacées par reload_apps()."""
+
+    @pytest.fixture()
+    def generation(self):
+        return AppsGeneration({"app1": Mock(), "app2": Mock()}, Mock())
+
+    def test_closed_when_retired_without_requests(self, generation) -> None:
+        generation.retire(close_analysis_cache=True)
+
+        for app in generation.apps.values():
+            app.close.assert_called_once()
+        generation.analysis_cache.close.assert_called_once()
+
+    def test_closed_after_last_request(self, generation) -> None:
+        """Test qu'une requête en cours garde ses apps et son cache ouverts jusqu'à sa fin."""
+        generation.acquire()
+        generation.acquire()
+        generation.retire(close_analysis_cache=True)
+        generation.release()
+
+        generation.apps["app1"].close.assert_not_called()
+        generation.analysis_cache.close.assert_not_called()
+
+        generation.release()
+
+        generation.apps["app1"].close.assert_called_once()
+        generation.analysis_cache.close.assert_called_once()
+
+    def test_shared_analysis_cache_kept_open(self, generation) -> None:
+        """Test que le cache repris par la génération suivante n'est pas fermé."""
+        generation.retire(close_analysis_cache=False)
+
+        generation.apps["app1"].close.assert_called_once()
+        generation.analysis_cache.close.assert_not_called()
+
+    def test_not_closed_before_retired(self, generation) -> None:
+        generation.acquire()
+        generation.release()
+
+        generation.apps["app1"].close.assert_not_called()
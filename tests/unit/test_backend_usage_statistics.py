@@ -0,0 +1,89 @@
+"""Tests unitaires pour UsageStatistics et LlmCost
+Focus : agrégation de la consommation de tokens et calcul du coût.
+"""
+
+import pytest
+
+from src.backend.backend.server_config import ServerConfig
+from src.backend.backend.usage_statistics import LlmCost, UsageStatistics
+from src.backend.text_analysis.llm import LlmUsage
+
+
+class TestLlmCost:
+    """Tests pour LlmCost.compute_cost()."""
+
+    def test_compute_cost_with_cached_tokens(self) -> None:
+        """Test que les tokens en cache sont facturés au tarif réduit."""
+        llm_cost = LlmCost(
+            model="gpt-4",
+            prompt_cost_per_million=2.0,
+            cached_prompt_cost_per_million=1.0,
+            completion_cost_per_million=8.0,
+        )
+        usage = LlmUsage(prompt_tokens=3000, cached_tokens=1000, completion_tokens=500)
+
+        assert llm_cost.compute_cost(usage) == pytest.approx(0.009)
+
+    def test_compute_cost_without_usage(self) -> None:
+        """Test qu'un usage non renseigné coûte 0."""
+        llm_cost = LlmCost(
+            model="gpt-4",
+            prompt_cost_per_million=2.0,
+            completion_cost_per_million=8.0,
+        )
+
+        assert llm_cost.compute_cost(LlmUsage()) == 0.0
+
+
+class TestUsageStatistics:
+    """Tests pour UsageStatistics.record() et get_usage_statistics()."""
+
+    def test_record_aggregates_per_app_locale_llm_config(
+        self,
+        sample_llm_config,
+    ) -> None:
+        """Test que les appels sont cumulés par (app, locale, llm_config)."""
+        usage_statistics = UsageStatistics(
+            [
+                LlmCost(
+                    model=sample_llm_config.model,
+                    prompt_cost_per_million=1.0,
+                    completion_cost_per_million=1.0,
+                ),
+            ],
+        )
+        usage = LlmUsage(prompt_tokens=1000, completion_tokens=100, cached_tokens=0)
+
+        cost = usage_statistics.record("app1", "fr", sample_llm_config, usage, 1.0)
+        usage_statistics.record("app1", "fr", sample_llm_config, usage, 3.0)
+        usage_statistics.record("app2", "en", sample_llm_config, usage, 2.0)
+
+        assert cost == pytest.approx(0.0011)
+        entries = usage_statistics.get_usage_statistics("app1")
+        assert len(entries) == 1
+        assert entries[0]["analyses"] == 2
+        assert entries[0]["prompt_tokens"] == 2000
+        assert entries[0]["average_response_time"] == pytest.approx(2.0)
+        assert entries[0]["cost"] == pytest.approx(0.0022)
+        assert len(usage_statistics.get_usage_statistics()) == 2
+
+    def test_record_unknown_model_has_no_cost(self, sample_llm_config) -> None:
+        """Test qu'un modèle absent de la table des coûts n'a pas de coût."""
+        usage_statistics = UsageStatistics()
+
+        cost = usage_statistics.record(
+            "app1",
+            "fr",
+            sample_llm_config,
+            LlmUsage(prompt_tokens=10, completion_tokens=5),
+            0.5,
+        )
+
+        assert cost is None
+        assert usage_statistics.get_usage_statistics()[0]["completion_tokens"] == 5
+
+    def test_server_config_cost_table_is_optional(self) -> None:
+        """Test que llm_costs est optionnel dans config_server.yaml."""
+        server_config = ServerConfig(llm_configs=[])
+
+        assert server_config.llm_costs == []